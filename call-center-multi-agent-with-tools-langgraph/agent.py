@@ -1,6 +1,9 @@
 # agent.py
+from typing import Literal
+from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import StructuredTool
 from langgraph.prebuilt import create_react_agent
 
 from llm_config import llm
@@ -21,28 +24,60 @@ def create_agent(llm: ChatOpenAI, tools: list, system_message: str):
     return agent
 
 # --- Agent Definitions ---
-product_detail_agent = create_agent(
-    llm,
-    tools=product_detail_tools,
-    system_message="You are an expert in product specifications and origins. Use your tools to answer questions about product details like dimensions, materials, and where it's made. Be concise in your responses."
-)
-
-pricing_agent = create_agent(
-    llm,
-    tools=pricing_tools,
-    system_message="You are a pricing and promotions specialist. Use your tools to answer questions about product prices and available discounts."
-)
-
-warranty_agent = create_agent(
-    llm,
-    tools=warranty_tools,
-    system_message="You are a warranty support agent. Use your tools to answer questions about warranty policies and how to file a claim. If you need an invoice ID to file a claim, you must ask the user for it."
-)
+# Agent name -> (tools, system message)
+agent_specs = {
+    "ProductDetailAgent": (
+        product_detail_tools,
+        "You are an expert in product specifications and origins. Use your tools to answer questions about product details like dimensions, materials, and where it's made. Be concise in your responses."
+    ),
+    "PricingAgent": (
+        pricing_tools,
+        "You are a pricing and promotions specialist. Use your tools to answer questions about product prices and available discounts."
+    ),
+    "WarrantyAgent": (
+        warranty_tools,
+        "You are a warranty support agent. Use your tools to answer questions about warranty policies and how to file a claim. If you need an invoice ID to file a claim, you must ask the user for it."
+    ),
+}
+
+# --- Handoffs ---
+# Used when config.TERMINATION_POLICY is "signal": an agent that receives a question outside its
+# specialty calls this tool instead of answering, and the graph routes the question to the target.
+HANDOFF_TOOL_NAME = "transfer_to_agent"
+
+def create_handoff_tool(agent_name: str) -> StructuredTool:
+    """A tool that ends the agent's turn and names the agent that should answer instead."""
+    targets = tuple(name for name in agent_specs if name != agent_name)
+
+    class Handoff(BaseModel):
+        agent: Literal[targets] = Field(..., description="The specialist agent that should answer the question.")
+
+    def transfer_to_agent(agent: str) -> str:
+        return f"Transferring the question to {agent}."
+
+    return StructuredTool.from_function(
+        transfer_to_agent,
+        name=HANDOFF_TOOL_NAME,
+        description=(
+            "Hand the user's question to another specialist when it is outside your own area: "
+            "ProductDetailAgent (dimensions, materials, origin), PricingAgent (prices, discounts) "
+            "or WarrantyAgent (warranty policy, claims)."
+        ),
+        args_schema=Handoff,
+        # Stop the agent right after the call; the graph takes it from here.
+        return_direct=True,
+    )
+
+def create_agents(handoff: bool = False) -> dict:
+    """Creates one agent per spec; with handoff, each agent can also transfer the question."""
+    agents = {}
+    for agent_name, (tools, system_message) in agent_specs.items():
+        if handoff:
+            tools = tools + [create_handoff_tool(agent_name)]
+            system_message += f" If the question belongs to another specialist, call {HANDOFF_TOOL_NAME} instead of answering."
+        agents[agent_name] = create_agent(llm, tools=tools, system_message=system_message)
+    return agents
 
 # --- Agent Runnable Dictionary ---
 # This dictionary maps agent names to their runnable instances for the graph.
-agent_runnables = {
-    "ProductDetailAgent": product_detail_agent,
-    "PricingAgent": pricing_agent,
-    "WarrantyAgent": warranty_agent,
-}
\ No newline at end of file
+agent_runnables = create_agents()
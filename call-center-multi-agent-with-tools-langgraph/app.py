@@ -2,6 +2,7 @@
 import streamlit as st
 import requests
 import json
+import uuid
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -14,7 +15,28 @@ st.set_page_config(
 st.title("🛋️ Furniture Support Chatbot")
 st.caption("Your AI-powered assistant for product details, pricing, and warranty information.")
 
+# --- Server-Sent Events ---
+def iter_sse_events(response):
+    """Parses a Server-Sent Events response into (event, data) pairs as they arrive."""
+    event, data_lines = "message", []
+    # chunk_size=None yields data as soon as it arrives instead of waiting for a full buffer
+    for raw_line in response.iter_lines(chunk_size=None):
+        line = raw_line.decode("utf-8")
+        if not line:
+            if data_lines:
+                yield event, "\n".join(data_lines)
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            value = line[len("data:"):]
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+
 # --- Session State Initialization ---
+# A unique session id lets the backend remember earlier turns of this conversation
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
 # Initialize chat history in session state if it doesn't exist
 if "messages" not in st.session_state:
     st.session_state.messages = [
@@ -45,20 +67,20 @@ if prompt := st.chat_input("Ask a question about our products..."):
             api_url = "http://127.0.0.1:8000/chat"
             
             # Create the request payload
-            payload = {"query": prompt}
+            payload = {"query": prompt, "session_id": st.session_state.session_id}
             
             # Use requests to stream the response from the FastAPI backend
             with requests.post(api_url, json=payload, stream=True) as response:
                 response.raise_for_status()  # Raise an exception for bad status codes
                 
-                for line in response.iter_lines():
-                    if line:
-                        # SSE format is "data: {content}"
-                        decoded_line = line.decode('utf-8')
-                        if decoded_line.startswith('data: '):
-                            content = decoded_line[len('data: '):]
-                            full_response += content
-                            message_placeholder.markdown(full_response + "▌") # Add a blinking cursor effect
+                for event, data in iter_sse_events(response):
+                    if event == "token":
+                        full_response += data
+                        message_placeholder.markdown(full_response + "▌") # Add a blinking cursor effect
+                    elif event == "error":
+                        full_response += f"\n\n**Error:** {data}"
+                    elif event == "end":
+                        break
             
             message_placeholder.markdown(full_response)
             
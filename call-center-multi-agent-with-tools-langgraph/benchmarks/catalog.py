@@ -0,0 +1,139 @@
+# benchmarks/catalog.py
+"""
+Load time and lookup latency of the product catalog with a large synthetic
+assortment (100k SKUs by default), from both CSV and SQLite.
+
+Each query shape exercises a different lookup path: the exact name or SKU in a
+sentence, a partial name through the inverted index, a misspelled name through
+spelling correction, and a generic phrase that matches thousands of products.
+
+    python -m benchmarks.catalog --skus 100000 --lookups 2000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--skus", type=int, default=100_000)
+parser.add_argument("--lookups", type=int, default=2000, help="Lookups per query shape.")
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+from catalog import load_catalog
+
+STYLES = ["Nordic", "Grand", "Executive", "Urban", "Classic", "Modern", "Rustic", "Coastal", "Heritage", "Studio",
+          "Metro", "Alpine", "Harbor", "Summit", "Vintage", "Loft", "Canyon", "Prairie", "Royal", "Zen"]
+MATERIALS = ["Oak", "Walnut", "Maple", "Teak", "Leather", "Velvet", "Linen", "Steel", "Rattan", "Marble"]
+TYPES = ["Sofa", "Desk", "Chair", "Table", "Bed", "Dresser", "Bookcase", "Ottoman", "Bench", "Cabinet"]
+ORIGINS = ["handcrafted in Italy using premium leather", "made from sustainable American oak",
+           "assembled in Denmark from FSC-certified wood", "made in Vietnam from solid teak"]
+FIELDS = ["sku", "name", "aliases", "category", "width_cm", "depth_cm", "height_cm", "origin", "price",
+          "discount_pct", "discount_name", "warranty_years"]
+
+
+def synthetic_rows(count: int, rng: random.Random) -> list:
+    rows = []
+    for i in range(count):
+        kind = rng.choice(TYPES)
+        rows.append({
+            "sku": f"SKU-{i:07d}",
+            "name": f"{rng.choice(STYLES)} {rng.choice(MATERIALS)} {kind} {rng.choice('ABCDEFGHJK')}{rng.choice('LMNPRSTVXZ')}-{i}",
+            "aliases": "",
+            "category": kind.lower(),
+            "width_cm": rng.randint(40, 260),
+            "depth_cm": rng.randint(30, 120),
+            "height_cm": rng.randint(40, 220),
+            "origin": rng.choice(ORIGINS),
+            "price": rng.randint(50, 5000),
+            "discount_pct": rng.choice([0, 0, 0, 10, 15]),
+            "discount_name": "seasonal sale",
+            "warranty_years": rng.choice([1, 2, 5]),
+        })
+    return rows
+
+
+def write_csv(path: str, rows: list):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_sqlite(path: str, rows: list):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE products ({', '.join(FIELDS)})")
+    conn.executemany(f"INSERT INTO products VALUES ({', '.join('?' * len(FIELDS))})",
+                     [[row[field] for field in FIELDS] for row in rows])
+    conn.commit()
+    conn.close()
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def query_shapes(rows: list, rng: random.Random) -> dict:
+    """query shape -> list of (query, expected sku or None)"""
+    shapes = {"exact_name": [], "sku": [], "partial_name": [], "misspelled": [], "generic": []}
+    for _ in range(args.lookups):
+        row = rng.choice(rows)
+        style, material, kind, code = row["name"].split(" ")
+        number = code.split("-")[1]
+        shapes["exact_name"].append((f"How much is the {row['name']}?", row["sku"]))
+        shapes["sku"].append((f"Is {row['sku']} on sale?", row["sku"]))
+        shapes["partial_name"].append((f"What is the price of the {material} {kind} {number}?", row["sku"]))
+        shapes["misspelled"].append((f"How wide is the {misspell(style, rng)} {material} {kind} {number}?", row["sku"]))
+        shapes["generic"].append((f"How much is a {material.lower()} {kind.lower()}?", None))
+    return shapes
+
+
+def measure(catalog, queries: list) -> dict:
+    latencies = []
+    correct = 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        product = catalog.resolve(query)
+        latencies.append(time.perf_counter() - start)
+        correct += (product.sku if product else None) == expected
+    latencies.sort()
+    return {
+        "p50_us": round(1e6 * latencies[len(latencies) // 2], 1),
+        "p99_us": round(1e6 * latencies[int(len(latencies) * 0.99)], 1),
+        "mean_us": round(1e6 * statistics.fmean(latencies), 1),
+        "lookups_per_second": round(len(latencies) / sum(latencies)),
+        "correct": f"{correct}/{len(queries)}",
+    }
+
+
+def main():
+    rng = random.Random(args.seed)
+    rows = synthetic_rows(args.skus, rng)
+    report = {"skus": args.skus}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, db_path = os.path.join(tmp, "products.csv"), os.path.join(tmp, "products.sqlite")
+        write_csv(csv_path, rows)
+        write_sqlite(db_path, rows)
+
+        start = time.perf_counter()
+        load_catalog(db_path)
+        report["load_sqlite_seconds"] = round(time.perf_counter() - start, 2)
+        start = time.perf_counter()
+        catalog = load_catalog(csv_path)
+        report["load_csv_seconds"] = round(time.perf_counter() - start, 2)
+
+    report["index_tokens"] = len(catalog.postings)
+    report["lookups"] = {shape: measure(catalog, queries) for shape, queries in query_shapes(rows, rng).items()}
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
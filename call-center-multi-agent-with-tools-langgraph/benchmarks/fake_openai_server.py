@@ -0,0 +1,248 @@
+# benchmarks/fake_openai_server.py
+"""
+A local, OpenAI-compatible /v1/chat/completions and /v1/embeddings server for
+load tests.
+
+It answers with the same keyword rules as the stub LLM (structured outputs via
+response_format or forced tool calls, one tool call then a final answer for the
+ReAct agents) and counts the requests it served. Every completion waits
+--latency seconds before its first token, then produces output at
+--tokens-per-second (0: all at once); "stream": true requests receive the
+answer as chat.completion.chunk events, like the real API. With --rpm-limit,
+completions over that many requests per minute
+are refused with a 429 and a retry-after-ms header. Like the real API, the quota
+is enforced over short periods: at most rpm/60 completions per second.
+
+    python -m benchmarks.fake_openai_server --port 9000 --latency 0.5 --tokens-per-second 50
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:9000/v1.
+"""
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stub_llm import StubEmbeddings, estimate_tokens, fill_schema, pick_tool
+
+fake_api = FastAPI(title="Fake OpenAI API")
+settings = {"latency": 0.5, "tokens_per_second": 0.0, "rpm_limit": 0}
+stats = {
+    "requests": 0, "streamed_requests": 0, "embedding_requests": 0, "rate_limited": 0,
+    "in_flight": 0, "max_in_flight": 0, "prompt_tokens": 0, "completion_tokens": 0,
+}
+embedder = StubEmbeddings(latency=0.0)
+# Arrival times of the completions admitted within the last second (for --rpm-limit).
+admitted = deque()
+
+
+def message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def last_user_text(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message_text(message)
+    return ""
+
+
+def tool_call(function: dict, query: str) -> dict:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {"name": function["name"], "arguments": json.dumps(fill_schema(function.get("parameters", {}), query))},
+    }
+
+
+def build_reply(body: dict) -> dict:
+    """Returns the assistant message for a chat completion request."""
+    messages = body.get("messages", [])
+    query = last_user_text(messages)
+    tools = body.get("tools") or []
+    response_format = body.get("response_format") or {}
+    last_role = messages[-1].get("role") if messages else "user"
+
+    if response_format.get("type") == "json_schema":
+        content = json.dumps(fill_schema(response_format["json_schema"].get("schema", {}), query))
+        return {"role": "assistant", "content": content}
+    if tools and body.get("tool_choice") not in (None, "auto", "none") and len(tools) == 1:
+        return {"role": "assistant", "content": None, "tool_calls": [tool_call(tools[0]["function"], query)]}
+    if tools and last_role != "tool":
+        return {"role": "assistant", "content": None, "tool_calls": [tool_call(pick_tool(tools, query)["function"], query)]}
+    if last_role == "tool":
+        return {"role": "assistant", "content": message_text(messages[-1])}
+    return {"role": "assistant", "content": f"Summary: {message_text(messages[-1])[:200]}"}
+
+
+def usage_for(body: dict, reply: dict) -> dict:
+    prompt_tokens = estimate_tokens(json.dumps(body.get("messages", [])) + json.dumps(body.get("tools") or []))
+    completion_tokens = estimate_tokens((reply.get("content") or "") + json.dumps(reply.get("tool_calls") or []))
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def generation_seconds(tokens: int) -> float:
+    """Time to produce this many output tokens at the configured token rate."""
+    rate = settings["tokens_per_second"]
+    return tokens / rate if rate > 0 else 0.0
+
+
+def chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def stream_reply(body: dict, reply: dict, usage: dict):
+    """Yields the reply as server-sent chat.completion.chunk events, pacing the content by token rate."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    model = body.get("model", "gpt-4o")
+    try:
+        await asyncio.sleep(settings["latency"])
+        yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+        if reply.get("tool_calls"):
+            await asyncio.sleep(generation_seconds(usage["completion_tokens"]))
+            tool_calls = [{"index": i, **call} for i, call in enumerate(reply["tool_calls"])]
+            yield chunk(completion_id, model, {"tool_calls": tool_calls})
+        else:
+            for piece in re.findall(r"\S+\s*", reply.get("content") or ""):
+                await asyncio.sleep(generation_seconds(estimate_tokens(piece)))
+                yield chunk(completion_id, model, {"content": piece})
+        yield chunk(completion_id, model, {}, "tool_calls" if reply.get("tool_calls") else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": [], "usage": usage}
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+    finally:
+        stats["in_flight"] -= 1
+
+
+def rate_limited_response():
+    """A 429 if the request would exceed --rpm-limit, else None (and the request is counted)."""
+    if not settings["rpm_limit"]:
+        return None
+    now = time.monotonic()
+    while admitted and admitted[0] <= now - 1:
+        admitted.popleft()
+    if len(admitted) < max(1, settings["rpm_limit"] // 60):
+        admitted.append(now)
+        return None
+    stats["rate_limited"] += 1
+    retry_after = admitted[0] + 1 - now
+    return JSONResponse(
+        {"error": {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}},
+        status_code=429,
+        headers={"retry-after-ms": str(int(1000 * retry_after)), "retry-after": str(max(1, round(retry_after)))},
+    )
+
+
+@fake_api.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    refusal = rate_limited_response()
+    if refusal is not None:
+        return refusal
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    reply = build_reply(body)
+    usage = usage_for(body, reply)
+    stats["prompt_tokens"] += usage["prompt_tokens"]
+    stats["completion_tokens"] += usage["completion_tokens"]
+    if body.get("stream"):
+        stats["streamed_requests"] += 1
+        # stream_reply releases the in-flight slot once the last chunk is sent.
+        return StreamingResponse(stream_reply(body, reply, usage), media_type="text/event-stream")
+    try:
+        await asyncio.sleep(settings["latency"] + generation_seconds(usage["completion_tokens"]))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": reply,
+                "finish_reason": "tool_calls" if reply.get("tool_calls") else "stop",
+            }],
+            "usage": usage,
+        }
+    finally:
+        stats["in_flight"] -= 1
+
+
+@fake_api.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    stats["embedding_requests"] += 1
+    texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    if texts and not isinstance(texts[0], str):
+        # Token ids (the client pre-tokenizes by default); hash the ids like words.
+        texts = [" ".join(str(token) for token in text) for text in texts]
+    vectors = await embedder.aembed_documents(texts)
+    return {
+        "object": "list",
+        "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": sum(estimate_tokens(text) for text in texts), "total_tokens": 0},
+    }
+
+
+@fake_api.get("/stats")
+async def get_stats():
+    return stats
+
+
+# --- Subprocess Helpers (used by the load-test benchmarks) ---
+def server_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1) as response:
+        return json.load(response)
+
+
+def start_fake_server(port: int, latency: float, tokens_per_second: float = 0.0, rpm_limit: int = 0) -> subprocess.Popen:
+    """Starts the fake server in a subprocess and waits until it answers."""
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_openai_server",
+        "--port", str(port), "--latency", str(latency), "--tokens-per-second", str(tokens_per_second),
+        "--rpm-limit", str(rpm_limit),
+    ])
+    for _ in range(100):
+        try:
+            server_stats(port)
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Fake OpenAI server did not start.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to wait before the first token of each answer.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Output token rate (0: no generation time).")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Completions allowed per minute before 429s (0: no limit).")
+    args = parser.parse_args()
+    settings["latency"] = args.latency
+    settings["tokens_per_second"] = args.tokens_per_second
+    settings["rpm_limit"] = args.rpm_limit
+    uvicorn.run(fake_api, host=args.host, port=args.port, log_level="warning")
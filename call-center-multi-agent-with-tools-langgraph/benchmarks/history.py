@@ -0,0 +1,65 @@
+# benchmarks/history.py
+"""
+Prompt tokens per turn over a long session, with and without the history window.
+
+Plays a 30-turn conversation through the checkpointed graph with the offline stub
+LLM and records the prompt tokens every turn costs (all LLM calls of the turn).
+Without a window the cost grows with every turn; with one it stays flat.
+
+    python -m benchmarks.history --turns 30 --budget 600
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--turns", type=int, default=30)
+parser.add_argument("--budget", type=int, default=600, help="History token budget of the windowed modes.")
+args = parser.parse_args()
+
+from benchmarks.stub_llm import install_stub_llm, load_queries
+
+stub = install_stub_llm(latency=0.0)
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from graph import build_graph
+
+# On-topic, single questions so every turn reaches an agent.
+ON_TOPIC = [q for q in load_queries() if "?" in q and " and " not in q and q.count("?") == 1][:8]
+
+
+async def play(history_token_budget: int, history_mode: str) -> list:
+    app = build_graph(checkpointer=MemorySaver(), history_token_budget=history_token_budget, history_mode=history_mode)
+    config = {"recursion_limit": 15, "configurable": {"thread_id": "benchmark"}}
+    tokens_per_turn = []
+    for turn in range(args.turns):
+        before = stub.stats["prompt_tokens"]
+        await app.ainvoke({"messages": [HumanMessage(content=ON_TOPIC[turn % len(ON_TOPIC)])]}, config)
+        tokens_per_turn.append(stub.stats["prompt_tokens"] - before)
+    return tokens_per_turn
+
+
+async def main():
+    modes = {
+        "unbounded": (0, "trim"),
+        "trim": (args.budget, "trim"),
+        "summarize": (args.budget, "summarize"),
+    }
+    report = {"turns": args.turns, "budget": args.budget}
+    for name, (budget, mode) in modes.items():
+        tokens = await play(budget, mode)
+        report[name] = {
+            "first_5_avg": round(sum(tokens[:5]) / 5),
+            "last_5_avg": round(sum(tokens[-5:]) / 5),
+            "max": max(tokens),
+            "per_turn": tokens,
+        }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+# benchmarks/llm_client.py
+"""
+A burst of concurrent LLM calls through a plain ChatOpenAI client and through
+SharedChatOpenAI (llm_client.py), against the fake OpenAI server started with
+a requests-per-minute quota.
+
+The burst is the query corpus repeated --duplicates times, all sent at once,
+like many users asking the same questions together. The plain client sends
+every call and relies on the SDK's retries when the quota refuses it; the
+shared client coalesces identical calls and queues the rest for the quota.
+The last two runs turn coalescing off to show the queuing alone, once told the
+quota (--rpm-limit) and once learning it from 429s (quota 0).
+
+    python -m benchmarks.llm_client --rpm-limit 1200 --duplicates 5 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--rpm-limit", type=int, default=1200, help="Quota enforced by the fake server.")
+parser.add_argument("--duplicates", type=int, default=5, help="Times each corpus query is sent in the burst.")
+parser.add_argument("--latency", type=float, default=0.3, help="Fake server latency per LLM call in seconds.")
+parser.add_argument("--port", type=int, default=9030)
+args = parser.parse_args()
+
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+os.environ["OPENAI_API_KEY"] = "sk-fake-server"
+
+import openai
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from benchmarks.fake_openai_server import server_stats, start_fake_server
+from benchmarks.stub_llm import load_queries
+from llm_client import AdaptiveRateLimiter, SharedChatOpenAI, SingleFlight
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def burst(client, queries: list) -> dict:
+    before = server_stats(args.port)
+    latencies, errors = [], 0
+
+    async def ask(query: str):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await client.ainvoke([HumanMessage(content=query)])
+            latencies.append(time.perf_counter() - start)
+        except openai.APIError:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(query) for query in queries))
+    elapsed = time.perf_counter() - start
+    after = server_stats(args.port)
+    report = {
+        "calls": len(queries),
+        "errors": errors,
+        "wall_seconds": round(elapsed, 2),
+        "p50_ms": round(1000 * percentile(latencies, 0.5), 1) if latencies else None,
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 1) if latencies else None,
+        "requests_sent": after["requests"] - before["requests"],
+        "responses_429": after["rate_limited"] - before["rate_limited"],
+    }
+    if isinstance(client, SharedChatOpenAI):
+        report.update(client.stats_snapshot())
+    # Let the next client start with the quota's full window available.
+    await asyncio.sleep(1.5)
+    return report
+
+
+async def main():
+    queries = load_queries() * args.duplicates
+    clients = {
+        "plain": ChatOpenAI(model="gpt-4o", temperature=0),
+        "shared": SharedChatOpenAI(
+            model="gpt-4o", temperature=0, max_retries=0,
+            quota=AdaptiveRateLimiter(args.rpm_limit, 0), coalescer=SingleFlight(),
+        ),
+        # Without coalescing, every call of the burst has to fit the quota.
+        "shared_known_quota_only": SharedChatOpenAI(
+            model="gpt-4o", temperature=0, max_retries=0,
+            quota=AdaptiveRateLimiter(args.rpm_limit, 0),
+        ),
+        "shared_learned_quota_only": SharedChatOpenAI(
+            model="gpt-4o", temperature=0, max_retries=0,
+            quota=AdaptiveRateLimiter(0, 0),
+        ),
+    }
+    report = {"rpm_limit": args.rpm_limit, "latency": args.latency}
+    for name, client in clients.items():
+        report[name] = await burst(client, queries)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    server = start_fake_server(args.port, args.latency, rpm_limit=args.rpm_limit)
+    try:
+        asyncio.run(main())
+    finally:
+        server.terminate()
@@ -0,0 +1,78 @@
+# benchmarks/node_latency.py
+"""
+Which graph nodes dominate latency: per-node p50/p95 wall time, LLM calls and
+tokens, collected by the tracing layer while the query corpus runs through the
+graph concurrently.
+
+Runs offline against the stub LLM; --latency and --per-token shape the
+simulated model so guard calls (short outputs) and agent calls (long answers)
+cost what they would in production.
+
+    python -m benchmarks.node_latency --repeat 5 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import defaultdict
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--repeat", type=int, default=5, help="Number of passes over the query corpus.")
+parser.add_argument("--concurrency", type=int, default=10)
+parser.add_argument("--latency", type=float, default=0.3, help="Stub round-trip latency in seconds.")
+parser.add_argument("--per-token", type=float, default=0.01, help="Stub latency per output token in seconds.")
+parser.add_argument("--no-fast-path", action="store_true")
+args = parser.parse_args()
+
+# The per-node JSON log lines would drown the report.
+os.environ.setdefault("TRACE_LOG_ENABLED", "false")
+
+from benchmarks.stub_llm import install_stub_llm, load_queries
+
+stub = install_stub_llm(latency=args.latency, seconds_per_output_token=args.per_token)
+
+from langchain_core.messages import HumanMessage
+
+from graph import build_graph
+from tracing import trace_sinks
+
+traces = defaultdict(list)
+trace_sinks.append(lambda trace: traces[trace.node].append(trace))
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def main():
+    app = build_graph(fast_path=not args.no_fast_path)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def ask(query: str):
+        async with semaphore:
+            await app.ainvoke({"messages": [HumanMessage(content=query)]}, {"recursion_limit": 15})
+
+    await asyncio.gather(*(ask(query) for query in load_queries() * args.repeat))
+
+    total_seconds = sum(trace.duration_seconds for node_traces in traces.values() for trace in node_traces)
+    report = {}
+    for node, node_traces in sorted(traces.items(), key=lambda item: -sum(t.duration_seconds for t in item[1])):
+        durations = [trace.duration_seconds for trace in node_traces]
+        report[node] = {
+            "runs": len(node_traces),
+            "p50_ms": round(1000 * percentile(durations, 0.5), 1),
+            "p95_ms": round(1000 * percentile(durations, 0.95), 1),
+            "share_of_node_time": round(sum(durations) / total_seconds, 3),
+            "llm_calls_per_run": round(sum(trace.llm_calls for trace in node_traces) / len(node_traces), 2),
+            "prompt_tokens_per_run": round(sum(trace.prompt_tokens for trace in node_traces) / len(node_traces)),
+            "completion_tokens_per_run": round(sum(trace.completion_tokens for trace in node_traces) / len(node_traces)),
+            "tool_calls": sum(len(trace.tool_calls) for trace in node_traces),
+        }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
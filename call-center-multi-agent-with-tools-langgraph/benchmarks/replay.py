@@ -0,0 +1,178 @@
+# benchmarks/replay.py
+"""
+Replays the recorded query corpus against the real API (main:api under uvicorn)
+backed by the fake OpenAI server, and reports per-request latency as JSON.
+
+Both servers are started as subprocesses. Every request is a new session sent
+to /chat at a fixed concurrency; the stream is read to the end. Reported:
+
+  ttfb        - time to the first byte of the response (the session event)
+  ttft        - time to the first token event, i.e. the first answer text (what
+                the caller waits for; classifier decisions are never streamed)
+  total       - time until the stream ends
+  llm_calls   - completions served by the fake server per request (average)
+  classifier_leaks - responses whose token events contain classifier JSON; must
+                be 0, or ttft measures the leak rather than the answer
+
+p50/p95/p99 of each latency, plus errors, are written to stdout and, with
+--output, to a file so runs can be compared over time. App settings can be
+varied with --env, e.g. --env GUARD_MODE=sequential --env SEMANTIC_CACHE_ENABLED=false.
+
+    python -m benchmarks.replay --requests 200 --concurrency 20 --latency 0.3 --tokens-per-second 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_openai_server import server_stats, start_fake_server
+from benchmarks.stub_llm import has_classifier_output, load_queries
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--requests", type=int, default=200)
+parser.add_argument("--concurrency", type=int, default=20)
+parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency to the first token, in seconds.")
+parser.add_argument("--tokens-per-second", type=float, default=60.0, help="Fake LLM output token rate.")
+parser.add_argument("--corpus", default=None, help="JSONL file of {\"query\": ...} lines (default: benchmarks/queries.jsonl).")
+parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra environment for the app.")
+parser.add_argument("--output", default=None, help="Also write the JSON report to this file.")
+parser.add_argument("--app-log", default=None, help="Write the app's stdout/stderr to this file (default: discard).")
+parser.add_argument("--llm-port", type=int, default=9020)
+parser.add_argument("--app-port", type=int, default=8020)
+args = parser.parse_args()
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_app() -> subprocess.Popen:
+    """Starts main:api with uvicorn, pointed at the fake server, and waits until it answers."""
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENAI_API_KEY": "sk-fake-server",
+        "TRACE_LOG_ENABLED": "false",
+    }
+    env.update(item.split("=", 1) for item in args.env)
+    log = open(args.app_log, "w") if args.app_log else subprocess.DEVNULL
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:api", "--port", str(args.app_port), "--log-level", "warning"],
+        cwd=PROJECT_DIR, env=env, stdout=log, stderr=log,
+    )
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.app_port}/metrics", timeout=1).raise_for_status()
+            return app
+        except httpx.HTTPError:
+            if app.poll() is not None:
+                raise RuntimeError("The app exited during startup (see --app-log).")
+            time.sleep(0.1)
+    app.terminate()
+    raise RuntimeError("The app did not start.")
+
+
+async def replay_one(client: httpx.AsyncClient, query: str) -> dict:
+    start = time.perf_counter()
+    result = {"ttfb": None, "ttft": None, "total": None, "error": None, "leak": False}
+    tokens, event = [], None
+    try:
+        async with client.stream("POST", "/chat", json={"query": query}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                now = time.perf_counter() - start
+                if result["ttfb"] is None:
+                    result["ttfb"] = now
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                if line == "event: token" and result["ttft"] is None:
+                    result["ttft"] = now
+                elif line == "event: error":
+                    result["error"] = "error event"
+                elif event == "token" and line.startswith("data: "):
+                    tokens.append(line[len("data: "):])
+    except httpx.HTTPError as e:
+        result["error"] = repr(e)
+    result["total"] = time.perf_counter() - start
+    result["leak"] = has_classifier_output("".join(tokens))
+    return result
+
+
+def percentiles(values: list) -> dict:
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return {}
+
+    def at(q: float) -> float:
+        return round(1000 * values[min(len(values) - 1, int(len(values) * q))], 1)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+async def replay(queries: list) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", limits=limits, timeout=None) as client:
+
+        async def bounded(query: str) -> dict:
+            async with semaphore:
+                return await replay_one(client, query)
+
+        before = server_stats(args.llm_port)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded(queries[i % len(queries)]) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+        after = server_stats(args.llm_port)
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "requests_per_second": round(args.requests / elapsed, 2),
+        "ttfb": percentiles([result["ttfb"] for result in results]),
+        "ttft": percentiles([result["ttft"] for result in results]),
+        "total": percentiles([result["total"] for result in results]),
+        "llm_calls_per_request": round((after["requests"] - before["requests"]) / args.requests, 2),
+        "embedding_calls_per_request": round((after["embedding_requests"] - before["embedding_requests"]) / args.requests, 2),
+        "errors": sum(result["error"] is not None for result in results),
+        "classifier_leaks": sum(result["leak"] for result in results),
+    }
+
+
+def main():
+    queries = load_queries(args.corpus) if args.corpus else load_queries()
+    fake_server = start_fake_server(args.llm_port, args.latency, args.tokens_per_second)
+    try:
+        app = start_app()
+        try:
+            report = {
+                "commit": git_commit(),
+                "llm_latency": args.latency,
+                "tokens_per_second": args.tokens_per_second,
+                "env": dict(item.split("=", 1) for item in args.env),
+                **asyncio.run(replay(queries)),
+            }
+        finally:
+            app.terminate()
+            app.wait()
+    finally:
+        fake_server.terminate()
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
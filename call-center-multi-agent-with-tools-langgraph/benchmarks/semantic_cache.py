@@ -0,0 +1,120 @@
+# benchmarks/semantic_cache.py
+"""
+LLM calls and /chat latency on repeat-heavy traffic, with and without the
+semantic response cache.
+
+Builds a skewed stream of first-turn questions from the query corpus (a few
+questions account for most traffic, as in real call-center logs), each asked
+in a slightly different wording, and sends every one as a new session through
+the /chat endpoint in process. Runs offline with the stub LLM and the stub
+bag-of-words embeddings, which is why the default threshold is lower than the
+production one.
+
+Every response and every cached entry is also checked for classifier output
+(the structured JSON of the guard and routing chains): cached answers are
+replayed verbatim, so a leaked decision would be served again on every hit.
+The benchmark exits with status 1 if any is found.
+
+    python -m benchmarks.semantic_cache --requests 300 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--requests", type=int, default=300)
+parser.add_argument("--concurrency", type=int, default=8)
+parser.add_argument("--latency", type=float, default=0.3, help="Stub LLM round-trip latency in seconds.")
+parser.add_argument("--embedding-latency", type=float, default=0.05)
+parser.add_argument("--threshold", type=float, default=0.8)
+parser.add_argument("--no-fast-path", action="store_true", help="Disable the catalog fast path in both runs.")
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+from benchmarks.stub_llm import has_classifier_output, install_stub_llm, load_queries, token_text
+
+stub = install_stub_llm(latency=args.latency, embedding_latency=args.embedding_latency)
+
+import httpx
+
+import main
+from graph import build_graph
+from semantic_cache import SemanticCache
+
+WORDINGS = ["{q}", "{q}", "{lower}", "Hi, {q}", "{q} Thanks!", "Please help: {q}", "{bare}"]
+
+
+def traffic(rng: random.Random) -> list:
+    """A Zipf-like stream of reworded questions."""
+    queries = load_queries()
+    weights = [1 / (rank + 1) for rank in range(len(queries))]
+    stream = []
+    for query in rng.choices(queries, weights=weights, k=args.requests):
+        wording = rng.choice(WORDINGS)
+        stream.append(wording.format(q=query, lower=query.lower(), bare=query.rstrip("?!.")))
+    return stream
+
+
+async def run(stream: list, cached: bool) -> dict:
+    async with main.lifespan(main.api):
+        if args.no_fast_path:
+            checkpointer = main.api.state.graph.checkpointer
+            main.api.state.graph = build_graph(checkpointer=checkpointer, fast_path=False)
+        main.api.state.semantic_cache = SemanticCache(threshold=args.threshold) if cached else None
+        stub.reset_stats()
+        latencies, leaks = [], 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=main.api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+
+            async def ask(query: str):
+                nonlocal leaks
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/chat", json={"query": query})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                    leaks += has_classifier_output(token_text(response.text))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(ask(query) for query in stream))
+            elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        report = {
+            "llm_calls": stub.stats["calls"],
+            "prompt_tokens": stub.stats["prompt_tokens"],
+            "p50_ms": round(1000 * latencies[len(latencies) // 2]),
+            "p95_ms": round(1000 * latencies[int(len(latencies) * 0.95)]),
+            "requests_per_second": round(len(stream) / elapsed, 1),
+        }
+        if cached:
+            cache = main.api.state.semantic_cache
+            report["cache"] = cache.snapshot()
+            # A cached replay must be exactly the stored answer, and contain no classifier output.
+            report["bad_cache_entries"] = sum(
+                token_text("".join(entry.frames)) != entry.answer or has_classifier_output(entry.answer)
+                for entry in cache.entries.values()
+            )
+        report["responses_with_classifier_output"] = leaks
+        return report
+
+
+async def amain():
+    stream = traffic(random.Random(args.seed))
+    report = {"requests": args.requests, "distinct_wordings": len(set(stream))}
+    report["without_cache"] = await run(stream, cached=False)
+    report["with_cache"] = await run(stream, cached=True)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    runs = (report["without_cache"], report["with_cache"])
+    if any(run["responses_with_classifier_output"] for run in runs) or report["with_cache"]["bad_cache_entries"]:
+        sys.exit("Classifier output reached the token stream or the cache.")
+
+
+if __name__ == "__main__":
+    asyncio.run(amain())
@@ -0,0 +1,327 @@
+# benchmarks/stub_llm.py
+"""
+Offline stand-in for the gpt-4o model used by the call-center graph.
+
+The stub answers structured-output (classifier) calls with simple keyword rules,
+as JSON message content the way gpt-4o's default json_schema method does (so it
+streams like any other answer unless the chain is kept out of the stream),
+drives the ReAct agents through one tool call followed by a final answer, and
+simulates latency from a fixed round-trip time plus a per-output-token cost.
+Token counts are estimated from the prompt text so modes can be compared.
+
+Call install_stub_llm() BEFORE importing supervise, agent or graph, e.g.:
+
+    from benchmarks.stub_llm import install_stub_llm
+    stub = install_stub_llm(latency=0.3)
+    import graph
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.output_parsers import JsonOutputParser, PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_json_schema, convert_to_openai_tool
+from pydantic import BaseModel
+from pydantic import Field
+
+# Name of the agents' handoff tool (agent.HANDOFF_TOOL_NAME; not imported, so the stub can be
+# installed before any project module).
+HANDOFF_TOOL_NAME = "transfer_to_agent"
+
+# --- Keyword Rules ---
+PRODUCT_WORDS = (
+    "sofa", "desk", "chair", "table", "furniture", "product", "price", "cost", "how much", "discount",
+    "sale", "warranty", "claim", "invoice", "dimension", "size", "wide", "deep", "high", "material",
+    "made", "origin", "leather", "oak",
+)
+PRICING_WORDS = ("price", "cost", "how much", "discount", "sale", "promotion", "cheap", "expensive")
+WARRANTY_WORDS = ("warranty", "claim", "invoice", "repair", "defect", "broken", "guarantee")
+
+# Query words mapped onto the vocabulary used by the tool names and descriptions.
+TOOL_SYNONYMS = {
+    "how much": "price", "cost": "price", "expensive": "price", "cheap": "price",
+    "sale": "discounts", "promotion": "discounts", "discount": "discounts",
+    "big": "dimensions", "size": "dimensions", "wide": "dimensions", "deep": "dimensions", "high": "dimensions",
+    "made": "origin", "from": "origin", "material": "materials", "leather": "materials",
+    "claim": "form", "invoice": "form", "file": "form",
+}
+
+# Words that say nothing about which tool fits a query.
+FILLER_WORDS = {
+    "a", "an", "the", "of", "for", "to", "on", "in", "is", "are", "it", "its", "and", "or", "any", "there",
+    "my", "your", "our", "this", "that", "with", "what", "how", "do", "does", "get", "provides", "product",
+    "products", "specific", "details", "information",
+}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough to compare prompt sizes."""
+    return max(1, len(text) // 4)
+
+def last_human_text(messages: List[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return str(message.content)
+    return ""
+
+def count_questions(query: str) -> int:
+    query = query.lower()
+    marks = query.count("?")
+    joined = len(re.findall(r"\b(and|also)\b (what|how|where|is|can|do|does)\b", query))
+    return max(marks, 1) + joined
+
+def pick_option(options: List[str], query: str) -> str:
+    """Chooses one of a Literal field's options for the query."""
+    lowered = query.lower()
+    if "off_topic" in options:
+        return "on_topic" if any(word in lowered for word in PRODUCT_WORDS) else "off_topic"
+    if "multi_question" in options:
+        return "multi_question" if count_questions(query) > 1 else "single_question"
+    if any(option.endswith("Agent") for option in options):
+        # The supervisor's route, or a handoff target (which excludes the agent handing off).
+        route = pick_route(lowered)
+        return route if route in options else options[0]
+    return options[0]
+
+def pick_route(lowered: str) -> str:
+    if not any(word in lowered for word in PRODUCT_WORDS):
+        return "FINISH"
+    if any(word in lowered for word in WARRANTY_WORDS):
+        return "WarrantyAgent"
+    if any(word in lowered for word in PRICING_WORDS):
+        return "PricingAgent"
+    return "ProductDetailAgent"
+
+def fill_schema(parameters: Dict[str, Any], query: str) -> Dict[str, Any]:
+    """Produces arguments for a JSON schema: enum fields by rule, everything else from the query."""
+    args = {}
+    for name, prop in parameters.get("properties", {}).items():
+        if "enum" in prop:
+            args[name] = pick_option(list(prop["enum"]), query)
+        elif "invoice" in name:
+            match = re.search(r"\b[A-Z]*-?\d{3,}\b", query, flags=re.IGNORECASE)
+            args[name] = match.group(0) if match else ""
+        elif prop.get("type") in ("integer", "number"):
+            args[name] = 0
+        elif prop.get("type") == "boolean":
+            args[name] = False
+        else:
+            args[name] = query
+    return args
+
+def pick_tool(tools: List[Dict[str, Any]], query: str) -> Dict[str, Any]:
+    """
+    Picks the tool whose name and description share the most words with the query.
+    An agent with a handoff tool hands off when none of its other tools fits.
+    """
+    lowered = query.lower()
+    words = set(re.findall(r"[a-z]+", lowered))
+    words |= {target for source, target in TOOL_SYNONYMS.items() if source in lowered}
+
+    words -= FILLER_WORDS
+
+    def score(tool):
+        function = tool["function"]
+        vocabulary = set(re.findall(r"[a-z]+", (function["name"] + " " + function.get("description", "")).lower()))
+        return len(words & vocabulary)
+
+    handoffs = [tool for tool in tools if tool["function"]["name"] == HANDOFF_TOOL_NAME]
+    others = [tool for tool in tools if tool not in handoffs]
+    best = max(others, key=score) if others else None
+    if handoffs and (best is None or score(best) == 0):
+        return handoffs[0]
+    return best
+
+def prompt_text(messages: List[BaseMessage], tools: List[Dict[str, Any]],
+                response_format: Optional[Dict[str, Any]] = None) -> str:
+    """Everything the model is billed for reading: the messages, the tool definitions and the output schema."""
+    text = "".join(str(message.content) for message in messages)
+    return text + (json.dumps(tools) if tools else "") + (json.dumps(response_format) if response_format else "")
+
+
+class StubChatModel(BaseChatModel):
+    """A deterministic, offline chat model that mimics gpt-4o's behaviour in the call-center graph."""
+
+    latency: float = 0.3
+    seconds_per_output_token: float = 0.0
+    stats: Dict[str, int] = Field(default_factory=lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def bind_tools(self, tools, tool_choice: Optional[Any] = None, **kwargs):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def with_structured_output(self, schema, **kwargs):
+        """Structured output with the json_schema method: the schema goes in response_format, the answer is JSON content."""
+        json_schema = convert_to_json_schema(schema)
+        bound = self.bind(response_format={
+            "type": "json_schema",
+            "json_schema": {"name": json_schema.get("title", "output"), "schema": json_schema, "strict": True},
+        })
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            return bound | PydanticOutputParser(pydantic_object=schema)
+        return bound | JsonOutputParser()
+
+    def reset_stats(self):
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def _respond(self, messages: List[BaseMessage], tools: List[Dict[str, Any]], tool_choice: Any,
+                 response_format: Optional[Dict[str, Any]] = None) -> AIMessage:
+        query = last_human_text(messages)
+        if response_format and response_format.get("type") == "json_schema":
+            message = AIMessage(content=json.dumps(fill_schema(response_format["json_schema"].get("schema", {}), query)))
+        elif tools and tool_choice and len(tools) == 1:
+            # Structured output: with_structured_output forces the single schema "tool".
+            function = tools[0]["function"]
+            message = AIMessage(content="", tool_calls=[{
+                "name": function["name"],
+                "args": fill_schema(function.get("parameters", {}), query),
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }])
+        elif tools and not isinstance(messages[-1], ToolMessage):
+            function = pick_tool(tools, query)["function"]
+            message = AIMessage(content="", tool_calls=[{
+                "name": function["name"],
+                "args": fill_schema(function.get("parameters", {}), query),
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }])
+        elif isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content=str(messages[-1].content))
+        else:
+            message = AIMessage(content=f"Summary: {str(messages[-1].content)[:200]}")
+
+        input_tokens = estimate_tokens(prompt_text(messages, tools, response_format))
+        output_tokens = estimate_tokens(str(message.content) + json.dumps([call["args"] for call in message.tool_calls]))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        self.stats["calls"] += 1
+        self.stats["prompt_tokens"] += input_tokens
+        self.stats["completion_tokens"] += output_tokens
+        return message
+
+    def _result(self, message: AIMessage) -> ChatResult:
+        usage = message.usage_metadata
+        token_usage = {
+            "prompt_tokens": usage["input_tokens"],
+            "completion_tokens": usage["output_tokens"],
+            "total_tokens": usage["total_tokens"],
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": token_usage, "model_name": "stub"})
+
+    def _delay(self, message: AIMessage) -> float:
+        return self.latency + self.seconds_per_output_token * message.usage_metadata["output_tokens"]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._respond(messages, kwargs.get("tools") or [], kwargs.get("tool_choice"), kwargs.get("response_format"))
+        time.sleep(self._delay(message))
+        return self._result(message)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._respond(messages, kwargs.get("tools") or [], kwargs.get("tool_choice"), kwargs.get("response_format"))
+        await asyncio.sleep(self._delay(message))
+        return self._result(message)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Streams the answer word by word, so token streaming can be exercised offline."""
+        message = self._respond(messages, kwargs.get("tools") or [], kwargs.get("tool_choice"), kwargs.get("response_format"))
+        await asyncio.sleep(self.latency)
+        if message.tool_calls:
+            tool_call_chunks = [
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=tool_call_chunks))
+        else:
+            for piece in re.findall(r"\S+\s*", str(message.content)):
+                await asyncio.sleep(self.seconds_per_output_token * estimate_tokens(piece))
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Offline stand-in for the embedding model: a hashed bag of words. Questions that
+    share most of their words score high, but unlike a real model it knows no
+    synonyms, so benchmarks should use a lower similarity threshold.
+    """
+
+    def __init__(self, dimensions: int = 256, latency: float = 0.05):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        self.calls += 1
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.dimensions] += 1.0
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def install_stub_llm(embedding_latency: float = 0.05, **kwargs) -> StubChatModel:
+    """
+    Replaces llm_config.llm with a StubChatModel and llm_config.embeddings with
+    StubEmbeddings. Must run before supervise/agent/graph/semantic_cache are imported.
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    import llm_config
+
+    stub = StubChatModel(**kwargs)
+    llm_config.llm = stub
+    llm_config.embeddings = StubEmbeddings(latency=embedding_latency)
+    return stub
+
+
+def load_queries(path: str = os.path.join(os.path.dirname(__file__), "queries.jsonl")) -> List[str]:
+    """Loads the recorded query corpus used by the benchmarks."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+# --- /chat Responses ---
+# Field names of the classifier schemas (supervise.py) as they appear in their JSON output.
+CLASSIFIER_FIELDS = ('"decision"', '"query_type"', '"next"')
+
+
+def token_text(body: str) -> str:
+    """The text of the token events in a /chat response (or in cached frames)."""
+    text = []
+    for event in body.split("\n\n"):
+        lines = event.split("\n")
+        if lines[0] == "event: token":
+            text.append("\n".join(line[len("data: "):] for line in lines[1:]))
+    return "".join(text)
+
+
+def has_classifier_output(text: str) -> bool:
+    """Whether streamed text contains a classifier's structured decision."""
+    return any(field in text for field in CLASSIFIER_FIELDS)
@@ -0,0 +1,139 @@
+# benchmarks/termination.py
+"""
+LLM calls and graph hops per turn under each termination policy
+("supervisor", "direct", "signal"; see config.TERMINATION_POLICY).
+
+Runs the query corpus offline through the graph with the stub LLM. A hop is one
+node execution, as recorded by the tracing layer. With --misroute, that share
+of the supervisor's agent routes is deliberately sent to the wrong agent: the
+"supervisor" and "direct" policies answer anyway, while "signal" agents hand
+the question over to the right one.
+
+Before the runs, an agent that hands off in parallel with another tool call is
+checked: the handoff must leave no tool result without its call (the API rejects
+such a history). The benchmark exits with status 1 if it does.
+
+    python -m benchmarks.termination --repeat 3 --misroute 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--repeat", type=int, default=3, help="Number of passes over the query corpus.")
+parser.add_argument("--latency", type=float, default=0.05, help="Stub round-trip latency in seconds.")
+parser.add_argument("--misroute", type=float, default=0.0, help="Share of agent routes sent to a wrong agent.")
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+os.environ.setdefault("TRACE_LOG_ENABLED", "false")
+
+from benchmarks.stub_llm import install_stub_llm, load_queries
+
+stub = install_stub_llm(latency=args.latency)
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import graph
+from agent import agent_specs
+from config import TERMINATION_POLICIES
+from tracing import trace_sinks
+
+hops = Counter()
+trace_sinks.append(lambda trace: hops.update([trace.node]))
+
+
+class Misrouter:
+    """Wraps the supervisor chain and sends a share of its agent routes to another agent."""
+
+    def __init__(self, chain, rate: float, rng: random.Random):
+        self.chain = chain
+        self.rate = rate
+        self.rng = rng
+
+    async def ainvoke(self, inputs, config=None):
+        result = await self.chain.ainvoke(inputs, config)
+        if result.next in agent_specs and self.rng.random() < self.rate:
+            result.next = self.rng.choice([name for name in agent_specs if name != result.next])
+        return result
+
+
+async def run(policy: str) -> dict:
+    # Same misroutes for every policy.
+    graph.supervisor_chain = Misrouter(supervisor_chain, args.misroute, random.Random(args.seed))
+    # No fast path, so every catalog question reaches an agent.
+    app = graph.build_graph(fast_path=False, termination_policy=policy, history_token_budget=0)
+    stub.reset_stats()
+    hops.clear()
+    latencies = []
+    queries = load_queries() * args.repeat
+    for query in queries:
+        start = time.perf_counter()
+        await app.ainvoke({"messages": [HumanMessage(content=query)]}, {"recursion_limit": 15})
+        latencies.append(time.perf_counter() - start)
+    agent_runs = sum(hops[name] for name in agent_specs)
+    return {
+        "llm_calls_per_turn": round(stub.stats["calls"] / len(queries), 2),
+        "hops_per_turn": round(sum(hops.values()) / len(queries), 2),
+        "agent_runs": agent_runs,
+        "supervisor_runs": hops["supervisor"],
+        "p50_ms": round(1000 * statistics.median(latencies), 1),
+        "hops_by_node": dict(hops),
+    }
+
+
+class ParallelHandoffAgent:
+    """An agent whose first reply calls a catalog tool and the handoff tool in parallel."""
+
+    async def ainvoke(self, inputs, config=None):
+        calls = [
+            {"name": "get_price_details", "args": {"product_name": "sofa"}, "id": "call_lookup"},
+            {"name": graph.HANDOFF_TOOL_NAME, "args": {"agent": "WarrantyAgent"}, "id": "call_handoff"},
+        ]
+        return {"messages": [
+            *inputs["messages"],
+            AIMessage(content="", tool_calls=calls,
+                      additional_kwargs={"tool_calls": [{"id": call["id"], "type": "function"} for call in calls]}),
+            ToolMessage(content="$1,500", tool_call_id="call_lookup", name="get_price_details"),
+            ToolMessage(content="Handing off.", tool_call_id="call_handoff", name=graph.HANDOFF_TOOL_NAME),
+        ]}
+
+
+async def check_parallel_handoff() -> dict:
+    """Runs one handoff made in parallel with a lookup, and checks every kept tool result has its call."""
+    agents = {"PricingAgent": ParallelHandoffAgent(), "WarrantyAgent": None}
+    state = {"messages": [HumanMessage(content="How much is the sofa and is it under warranty?")], "handoffs": 0}
+    update = await graph.agent_node(state, "PricingAgent", agents, handoff=True)
+    call_ids = {call["id"] for message in update["messages"] if isinstance(message, AIMessage)
+                for call in message.tool_calls}
+    raw_ids = {call["id"] for message in update["messages"] if isinstance(message, AIMessage)
+               for call in message.additional_kwargs.get("tool_calls", [])}
+    result_ids = {message.tool_call_id for message in update["messages"] if isinstance(message, ToolMessage)}
+    return {
+        "next": update["next"],
+        "ok": update["next"] == "WarrantyAgent" and call_ids == raw_ids == result_ids == {"call_lookup"},
+    }
+
+
+supervisor_chain = graph.supervisor_chain
+
+
+async def main():
+    report = {"parallel_handoff": await check_parallel_handoff()}
+    report.update({"turns": len(load_queries()) * args.repeat, "misroute": args.misroute})
+    for policy in TERMINATION_POLICIES:
+        report[policy] = await run(policy)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    if not report["parallel_handoff"]["ok"]:
+        sys.exit("A parallel handoff left a tool result without its call.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+# benchmarks/throughput.py
+"""
+Concurrent-session throughput of the async call-center graph against a local
+fake OpenAI server (started automatically as a subprocess).
+
+For each concurrency level, that many sessions run one turn of the graph at the
+same time. Compare the results with the ceiling of the old threadpool-bound
+sync nodes, which can never have more than --threads sessions in flight.
+
+    python -m benchmarks.throughput --latency 0.5 --levels 10 40 100 200 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--latency", type=float, default=0.5, help="Fake server latency per LLM call in seconds.")
+parser.add_argument("--levels", type=int, nargs="+", default=[10, 40, 100, 200, 400], help="Concurrent sessions to test.")
+parser.add_argument("--threads", type=int, default=40, help="Threadpool size of the sync baseline (uvicorn/anyio default: 40).")
+parser.add_argument("--port", type=int, default=9010)
+args = parser.parse_args()
+
+# Configure the app before llm_config is imported: point it at the fake server and lift the in-process limits.
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+os.environ["OPENAI_API_KEY"] = "sk-fake-server"
+os.environ.setdefault("MAX_CONCURRENT_LLM_CALLS", str(max(args.levels) * 3))
+os.environ.setdefault("LLM_MAX_CONNECTIONS", str(max(args.levels) * 3))
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fake_openai_server import server_stats, start_fake_server
+from benchmarks.stub_llm import load_queries
+
+
+async def run_level(app, queries, sessions: int) -> dict:
+    before = server_stats(args.port)
+
+    async def one_session(i):
+        await app.ainvoke({"messages": [HumanMessage(content=queries[i % len(queries)])]}, {"recursion_limit": 15})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_session(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    after = server_stats(args.port)
+    return {
+        "sessions": sessions,
+        "seconds": round(elapsed, 3),
+        "sessions_per_second": round(sessions / elapsed, 2),
+        "llm_calls_per_session": round((after["requests"] - before["requests"]) / sessions, 2),
+        "max_llm_calls_in_flight": after["max_in_flight"],
+    }
+
+
+async def main():
+    import graph
+
+    queries = load_queries()
+    await graph.app.ainvoke({"messages": [HumanMessage(content=queries[0])]})  # warm up connections
+    results = [await run_level(graph.app, queries, sessions) for sessions in sorted(args.levels)]
+    # A blocking node holds a worker thread for the whole session, so the threadpool caps
+    # throughput at threads / session duration (measured at the lowest concurrency level).
+    session_seconds = results[0]["seconds"]
+    report = {
+        "latency": args.latency,
+        "threads": args.threads,
+        "threadpool_bound_sessions_per_second": round(args.threads / session_seconds, 2),
+        "levels": results,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    fake_server = start_fake_server(args.port, args.latency)
+    try:
+        asyncio.run(main())
+    finally:
+        fake_server.terminate()
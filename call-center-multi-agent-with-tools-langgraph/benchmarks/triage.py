@@ -0,0 +1,112 @@
+# benchmarks/triage.py
+"""
+Compares the fused triage call against the three separate classifier chains:
+latency, LLM round trips and prompt tokens per query (messages plus output
+schema), and with --live how often the two modes agree.
+
+Runs offline against the stub LLM by default. The stub classifies with the same
+keyword rules in both modes, so routing agreement is only reported with --live,
+which uses gpt-4o (requires OPENAI_API_KEY; token counts are then not reported).
+
+    python -m benchmarks.triage --latency 0.4 --repeat 3
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from langchain_core.messages import HumanMessage
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--live", action="store_true", help="Use the real gpt-4o model instead of the stub.")
+parser.add_argument("--latency", type=float, default=0.4, help="Stub round-trip latency in seconds.")
+parser.add_argument("--per-token", type=float, default=0.01, help="Stub latency per output token in seconds.")
+parser.add_argument("--repeat", type=int, default=1, help="Number of passes over the query corpus.")
+args = parser.parse_args()
+
+from benchmarks.stub_llm import install_stub_llm, load_queries
+
+stub = None if args.live else install_stub_llm(latency=args.latency, seconds_per_output_token=args.per_token)
+
+from supervise import topic_check_chain, filter_chain, supervisor_chain, triage_chain
+
+
+def outcome(decision: str, query_type: str, route: str) -> str:
+    """The graph-level outcome of a classification, in the order the graph applies the checks."""
+    if decision == "off_topic":
+        return "off_topic"
+    if query_type == "multi_question":
+        return "multi_question"
+    return route
+
+
+async def run_separate(inputs):
+    topic, multi, route = await asyncio.gather(
+        topic_check_chain.ainvoke(inputs), filter_chain.ainvoke(inputs), supervisor_chain.ainvoke(inputs)
+    )
+    return topic.decision, multi.decision, route.next
+
+
+async def run_fused(inputs):
+    result = await triage_chain.ainvoke(inputs)
+    return result.decision, result.query_type, result.next
+
+
+async def measure(runner, inputs):
+    before = dict(stub.stats) if stub else {}
+    start = time.perf_counter()
+    fields = await runner(inputs)
+    elapsed = time.perf_counter() - start
+    usage = {key: stub.stats[key] - before[key] for key in before}
+    return fields, elapsed, usage
+
+
+async def main():
+    queries = load_queries() * args.repeat
+    samples = {"separate": [], "fused": []}
+    field_agreement = [0, 0, 0]
+    outcome_agreement = 0
+
+    for query in queries:
+        inputs = {"messages": [HumanMessage(content=query)]}
+        separate = await measure(run_separate, inputs)
+        fused = await measure(run_fused, inputs)
+        samples["separate"].append(separate)
+        samples["fused"].append(fused)
+        for i in range(3):
+            field_agreement[i] += separate[0][i] == fused[0][i]
+        outcome_agreement += outcome(*separate[0]) == outcome(*fused[0])
+
+    total = len(queries)
+    report = {
+        "queries": total,
+        "llm": "gpt-4o" if args.live else f"stub (latency={args.latency}s, per_token={args.per_token}s)",
+    }
+    if args.live:
+        report["agreement"] = {
+            "outcome": outcome_agreement / total,
+            "decision": field_agreement[0] / total,
+            "query_type": field_agreement[1] / total,
+            "route": field_agreement[2] / total,
+        }
+    for mode, runs in samples.items():
+        latencies = sorted(elapsed for _, elapsed, _ in runs)
+        report[mode] = {
+            "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+            "latency_max_ms": round(latencies[-1] * 1000, 1),
+        }
+        if stub:
+            report[mode]["llm_calls_per_query"] = sum(usage["calls"] for _, _, usage in runs) / total
+            report[mode]["prompt_tokens_per_query"] = sum(usage["prompt_tokens"] for _, _, usage in runs) / total
+    if stub:
+        report["prompt_token_ratio"] = round(
+            report["separate"]["prompt_tokens_per_query"] / report["fused"]["prompt_tokens_per_query"], 2
+        )
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,269 @@
+# catalog.py
+import csv
+import os
+import re
+import sqlite3
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from config import CATALOG_PATH
+
+# --- Product Record ---
+class Product(NamedTuple):
+    sku: str
+    name: str
+    category: str
+    width_cm: float
+    depth_cm: float
+    height_cm: float
+    origin: str
+    price: float
+    discount_pct: float
+    discount_name: str
+    warranty_years: int
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that never identify a product; they are neither indexed nor spell-corrected.
+STOPWORDS = frozenset((
+    "a", "an", "the", "is", "are", "it", "its", "of", "for", "on", "in", "to", "my", "your", "our", "and", "or",
+    "what", "how", "where", "which", "does", "do", "can", "any", "there", "this", "that", "with", "from", "about",
+    "much", "price", "priced", "cost", "costs", "discount", "discounts", "sale", "deal", "promotion", "promo",
+    "warranty", "guarantee", "claim", "invoice", "made", "material", "materials", "origin", "size", "dimensions",
+    "wide", "deep", "tall", "high", "big", "long", "right", "now", "please", "tell", "need", "want", "have",
+))
+
+# Candidate lists longer than this are reported as ambiguous instead of being narrowed further.
+MAX_SCAN = 512
+# Longest product name or alias, in tokens, looked for verbatim in a query.
+MAX_NAME_TOKENS = 8
+# Minimum trigram similarity for a misspelled word to be corrected to a catalog word.
+FUZZY_THRESHOLD = 0.4
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+def trigrams(token: str) -> set:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# --- Catalog ---
+class ProductCatalog:
+    """
+    Columnar, read-only product store with three lookup paths, tried in order:
+    exact name / alias / SKU phrases found in the query, an inverted token index
+    intersected rarest token first, and trigram spelling correction for words the
+    index does not know. Build a new instance to change the data; never mutate one.
+    """
+
+    def __init__(self, rows: Iterable[Mapping]):
+        # Columns: one list or typed array per field, indexed by row id.
+        self.skus: List[str] = []
+        self.names: List[str] = []
+        self.categories: List[str] = []
+        self.origins: List[str] = []
+        self.discount_names: List[str] = []
+        self.widths = array("f")
+        self.depths = array("f")
+        self.heights = array("f")
+        self.prices = array("d")
+        self.discount_pcts = array("f")
+        self.warranty_years = array("H")
+        self.name_token_counts = array("B")
+
+        self.exact: Dict[str, int] = {}
+        postings = defaultdict(list)
+        for row_id, row in enumerate(rows):
+            name = row["name"].strip()
+            self.skus.append(row["sku"].strip())
+            self.names.append(name)
+            # Categories, origins and discount names repeat across many rows; interning stores each once.
+            self.categories.append(sys.intern(row.get("category") or ""))
+            self.origins.append(sys.intern(row.get("origin") or ""))
+            self.discount_names.append(sys.intern(row.get("discount_name") or ""))
+            self.widths.append(float(row.get("width_cm") or 0))
+            self.depths.append(float(row.get("depth_cm") or 0))
+            self.heights.append(float(row.get("height_cm") or 0))
+            self.prices.append(float(row.get("price") or 0))
+            self.discount_pcts.append(float(row.get("discount_pct") or 0))
+            self.warranty_years.append(int(row.get("warranty_years") or 0))
+
+            name_tokens = [t for t in dict.fromkeys(tokenize(name)) if t not in STOPWORDS]
+            self.name_token_counts.append(min(len(name_tokens), 255))
+            for token in name_tokens:
+                postings[token].append(row_id)
+            aliases = [alias for alias in (row.get("aliases") or "").split(";") if alias.strip()]
+            for phrase in (name, self.skus[-1], *aliases):
+                self.exact.setdefault(normalize(phrase), row_id)
+
+        # Row ids are appended in order, so every posting list is already sorted.
+        self.postings: Dict[str, array] = {token: array("I", ids) for token, ids in postings.items()}
+
+        # Trigram index over the alphabetic vocabulary, for spelling correction.
+        self.vocabulary = [token for token in self.postings if token.isalpha() and len(token) >= 3]
+        self.vocabulary_trigrams = [trigrams(token) for token in self.vocabulary]
+        trigram_index = defaultdict(list)
+        for vocab_id, grams in enumerate(self.vocabulary_trigrams):
+            for gram in grams:
+                trigram_index[gram].append(vocab_id)
+        self.trigram_index = dict(trigram_index)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def product(self, row_id: int) -> Product:
+        return Product(
+            sku=self.skus[row_id],
+            name=self.names[row_id],
+            category=self.categories[row_id],
+            width_cm=self.widths[row_id],
+            depth_cm=self.depths[row_id],
+            height_cm=self.heights[row_id],
+            origin=self.origins[row_id],
+            price=self.prices[row_id],
+            discount_pct=self.discount_pcts[row_id],
+            discount_name=self.discount_names[row_id],
+            warranty_years=self.warranty_years[row_id],
+        )
+
+    # --- Lookup Paths ---
+    def exact_mentions(self, tokens: List[str]) -> List[int]:
+        """Rows whose name, alias or SKU appears verbatim in the tokens, longest phrase first."""
+        found = []
+        covered = [False] * len(tokens)
+        for size in range(min(MAX_NAME_TOKENS, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                if any(covered[start:start + size]):
+                    continue
+                row_id = self.exact.get(" ".join(tokens[start:start + size]))
+                if row_id is not None:
+                    covered[start:start + size] = [True] * size
+                    if row_id not in found:
+                        found.append(row_id)
+        return found
+
+    def correct_spelling(self, token: str) -> Optional[str]:
+        """The catalog word most similar to an unknown word, if any is similar enough."""
+        grams = trigrams(token)
+        overlaps = defaultdict(int)
+        for gram in grams:
+            for vocab_id in self.trigram_index.get(gram, ()):
+                overlaps[vocab_id] += 1
+        best, best_score = None, FUZZY_THRESHOLD
+        for vocab_id, overlap in overlaps.items():
+            score = overlap / (len(grams) + len(self.vocabulary_trigrams[vocab_id]) - overlap)
+            if score >= best_score:
+                best, best_score = self.vocabulary[vocab_id], score
+        return best
+
+    def index_candidates(self, tokens: List[str]) -> tuple:
+        """
+        Intersects the posting lists of the query's catalog words, rarest first,
+        skipping any word that would leave no candidate. Returns (candidate row ids,
+        number of words matched by every candidate).
+        """
+        terms = []
+        for token in dict.fromkeys(tokens):
+            if token in STOPWORDS:
+                continue
+            if token in self.postings:
+                terms.append(token)
+            elif len(token) >= 4 and token.isalpha():
+                corrected = self.correct_spelling(token)
+                if corrected is not None:
+                    terms.append(corrected)
+        terms = sorted(dict.fromkeys(terms), key=lambda term: len(self.postings[term]))
+        if not terms:
+            return [], 0
+
+        candidates = self.postings[terms[0]]
+        matched = 1
+        for term in terms[1:]:
+            if len(candidates) > MAX_SCAN:
+                break
+            posting = self.postings[term]
+            narrowed = [row_id for row_id in candidates if _contains(posting, row_id)]
+            if narrowed:
+                candidates = narrowed
+                matched += 1
+        return candidates, matched
+
+    # --- Public Lookups ---
+    def resolve(self, query: str) -> Optional[Product]:
+        """
+        The single product the query refers to, or None when it names no product,
+        several products, or matches several products equally well.
+        """
+        tokens = tokenize(query)
+        mentions = self.exact_mentions(tokens)
+        if mentions:
+            return self.product(mentions[0]) if len(mentions) == 1 else None
+
+        candidates, matched = self.index_candidates(tokens)
+        if not candidates or len(candidates) > MAX_SCAN:
+            return None
+        fewest = min(self.name_token_counts[row_id] for row_id in candidates)
+        best = [row_id for row_id in candidates if self.name_token_counts[row_id] == fewest]
+        # The matched words must cover at least half of the product's name.
+        if len(best) != 1 or 2 * matched < fewest:
+            return None
+        return self.product(best[0])
+
+    def search(self, query: str, limit: int = 5) -> List[Product]:
+        """Up to `limit` products matching the query, best match first, e.g. for suggestions."""
+        tokens = tokenize(query)
+        rows = self.exact_mentions(tokens)
+        if len(rows) < limit:
+            candidates, _matched = self.index_candidates(tokens)
+            ranked = sorted(candidates[:MAX_SCAN], key=lambda row_id: self.name_token_counts[row_id])
+            rows += [row_id for row_id in ranked if row_id not in rows]
+        return [self.product(row_id) for row_id in rows[:limit]]
+
+def _contains(sorted_ids: array, row_id: int) -> bool:
+    i = bisect_left(sorted_ids, row_id)
+    return i < len(sorted_ids) and sorted_ids[i] == row_id
+
+# --- Loading ---
+def load_catalog(path: str = CATALOG_PATH) -> ProductCatalog:
+    """Loads a catalog from a CSV file or from the "products" table of a SQLite database."""
+    if os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            return ProductCatalog(dict(row) for row in conn.execute("SELECT * FROM products"))
+        finally:
+            conn.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        return ProductCatalog(csv.DictReader(f))
+
+# --- Shared Instance ---
+_catalog: Optional[ProductCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> ProductCatalog:
+    """The catalog currently in use, loaded from CATALOG_PATH on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
+
+def reload_catalog(path: str = CATALOG_PATH) -> ProductCatalog:
+    """
+    Builds a new catalog from path and swaps it in. Lookups already running keep
+    the catalog they started with, and a failed load leaves the current one in use.
+    """
+    global _catalog
+    catalog = load_catalog(path)
+    with _catalog_lock:
+        _catalog = catalog
+    print(f"---CATALOG: Loaded {len(catalog)} products from {path}.---")
+    return catalog
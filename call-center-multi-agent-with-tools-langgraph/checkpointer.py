@@ -0,0 +1,92 @@
+# checkpointer.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from config import (
+    CHECKPOINTER,
+    CHECKPOINTERS,
+    CHECKPOINT_DB_PATH,
+    SESSION_TTL_SECONDS,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+)
+
+# --- Checkpointer Factory ---
+@asynccontextmanager
+async def open_checkpointer(backend: str = CHECKPOINTER):
+    """
+    Opens the checkpointer that stores conversation state per session (thread) id.
+    "memory" keeps it in this process; "sqlite" persists it to CHECKPOINT_DB_PATH.
+    """
+    if backend not in CHECKPOINTERS:
+        raise ValueError(f"Unknown checkpointer '{backend}'. Expected one of: {', '.join(CHECKPOINTERS)}.")
+    if backend == "memory":
+        yield MemorySaver()
+        return
+
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_DB_PATH) as checkpointer:
+        await checkpointer.setup()
+        yield checkpointer
+
+# --- Session Eviction ---
+class SessionSweeper:
+    """
+    Tracks when each session was last used and deletes the checkpoints of
+    sessions that have been idle for longer than the TTL.
+    """
+
+    def __init__(self, checkpointer, ttl_seconds: float = SESSION_TTL_SECONDS,
+                 interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS):
+        self.checkpointer = checkpointer
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.last_seen = {}
+        # Held by touch() and around each deletion, so a session used again is never deleted.
+        self.lock = asyncio.Lock()
+
+    async def touch(self, thread_id: str):
+        """Marks a session as active now (waiting for its deletion if one is in progress)."""
+        async with self.lock:
+            self.last_seen[thread_id] = time.monotonic()
+
+    async def adopt_existing_sessions(self):
+        """
+        Starts the TTL clock for sessions already stored on disk by a previous
+        process, so they are evicted too instead of living forever.
+        """
+        conn = getattr(self.checkpointer, "conn", None)
+        if conn is None:
+            return
+        async with conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+            async for (thread_id,) in cursor:
+                self.last_seen.setdefault(thread_id, time.monotonic())
+
+    async def sweep(self) -> int:
+        """Deletes every expired session and returns how many were removed."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        candidates = [thread_id for thread_id, seen in self.last_seen.items() if seen < cutoff]
+        evicted = 0
+        for thread_id in candidates:
+            async with self.lock:
+                # The session may have been used again since the candidates were collected.
+                if self.last_seen.get(thread_id, 0) >= cutoff:
+                    continue
+                await self.checkpointer.adelete_thread(thread_id)
+                self.last_seen.pop(thread_id, None)
+                evicted += 1
+        if evicted:
+            print(f"---SESSIONS: Evicted {evicted} idle session(s); {len(self.last_seen)} active.---")
+        return evicted
+
+    async def run(self):
+        """Sweeps periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"---SESSIONS: Sweep failed: {e}---")
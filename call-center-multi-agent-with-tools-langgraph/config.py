@@ -0,0 +1,84 @@
+# config.py
+import os
+from dotenv import load_dotenv
+
+# --- Environment Setup ---
+# Load environment variables from a .env file
+load_dotenv()
+
+# --- Guard Stage ---
+# Controls how the topic check, the multi-question filter and the supervisor routing are run:
+#   "sequential"      - one LLM call after another (topic_checker -> filter -> supervisor).
+#   "parallel"        - all three calls at once; the first rejection short-circuits the turn.
+#   "parallel_cancel" - like "parallel", but the calls still in flight are cancelled on rejection.
+GUARD_MODE = os.getenv("GUARD_MODE", "parallel")
+GUARD_MODES = ("sequential", "parallel", "parallel_cancel")
+# Graph nodes that reply with a fixed rejection message instead of an answer (whichever modes are in use).
+REJECTION_NODES = frozenset({"topic_checker", "filter", "guard", "triage"})
+
+# --- Classifier Mode ---
+# "separate" - topic check, filter and supervisor are three structured-output calls (run as per GUARD_MODE).
+# "fused"    - a single triage call returns all three decisions at once; GUARD_MODE is not used.
+CLASSIFIER_MODE = os.getenv("CLASSIFIER_MODE", "separate")
+CLASSIFIER_MODES = ("separate", "fused")
+
+# --- Sessions ---
+# Conversation state is checkpointed per session_id, either in process memory or in a local SQLite file.
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory")
+CHECKPOINTERS = ("memory", "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
+# Sessions idle for longer than this are deleted from the checkpointer by a background sweeper.
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+
+# --- History Window ---
+# Token budget for the conversation history sent to the classifiers and agents (0 disables the window).
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+# What happens to turns that fall out of the window:
+#   "trim"      - they are dropped.
+#   "summarize" - they are folded into a rolling summary that is sent along with the window.
+HISTORY_MODE = os.getenv("HISTORY_MODE", "summarize")
+HISTORY_MODES = ("trim", "summarize")
+
+# --- Fast Path ---
+# Answer unambiguous catalog questions (e.g. "How much is the sofa?") by calling the tool directly,
+# without any LLM call. Everything else still goes through the guards, supervisor and agents.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+
+# --- Product Catalog ---
+# Source of the product data behind every tool: a CSV file, or a SQLite database (.db/.sqlite) with a
+# "products" table of the same columns. It is loaded once and can be reloaded with POST /catalog/reload.
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(os.path.dirname(__file__), "data", "products.csv"))
+
+# --- Semantic Cache ---
+# Replays the answer to a previously seen first-turn question instead of running the graph. A question
+# matches a cached one when it normalizes to the same text, or when their embeddings' cosine similarity
+# reaches the threshold and both mention the same products and numbers (invoice ids, sizes, ...).
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+# How long an answer stays cached, by the route that produced it; routes not listed are never cached.
+# Prices and discounts change more often than specifications and policies.
+SEMANTIC_CACHE_TTL_SECONDS = {
+    "fast_path": 3600,
+    "ProductDetailAgent": 3600,
+    "PricingAgent": 300,
+    "WarrantyAgent": 3600,
+    "rejection": 86400,
+}
+
+# --- Tracing ---
+# Every graph node execution is timed and attributed its LLM calls, tokens and tool calls. The totals are
+# served at GET /metrics; with TRACE_LOG_ENABLED each execution is also logged to stderr as a JSON line.
+TRACE_LOG_ENABLED = os.getenv("TRACE_LOG_ENABLED", "true").lower() == "true"
+
+# --- Termination Policy ---
+# What happens after an agent answers:
+#   "supervisor" - the agent hands back to the supervisor node, which ends the turn (one extra hop).
+#   "direct"     - the turn ends as soon as the agent answers.
+#   "signal"     - agents may call a transfer_to_agent tool to hand the question to another agent;
+#                  an answer without a handoff ends the turn. Only handoffs cost extra hops.
+TERMINATION_POLICY = os.getenv("TERMINATION_POLICY", "direct")
+TERMINATION_POLICIES = ("supervisor", "direct", "signal")
+# Handoffs allowed per turn in "signal" mode, so agents cannot pass a question back and forth forever.
+MAX_HANDOFFS = int(os.getenv("MAX_HANDOFFS", "2"))
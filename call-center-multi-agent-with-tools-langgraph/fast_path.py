@@ -0,0 +1,114 @@
+# fast_path.py
+import re
+import time
+from typing import Optional
+
+from catalog import get_catalog
+from tools import (
+    get_space_details,
+    get_product_origin,
+    get_price_details,
+    get_available_discounts,
+    get_warranty_policy,
+)
+
+# --- Intent Vocabulary ---
+# Intent name -> (tool, phrases that signal the intent)
+INTENTS = {
+    # "how much" alone also asks for weight, space or quantity; only its price forms count.
+    "price": (get_price_details, ("price", "priced", "cost", "costs", "how much is", "how much are", "how much for")),
+    "discount": (get_available_discounts, ("discount", "discounts", "sale", "promotion", "promotions", "promo", "deal")),
+    "dimensions": (get_space_details, (
+        "dimension", "dimensions", "size", "how big", "how wide", "how deep", "how tall", "how high",
+        "width", "depth", "height", "measurements",
+    )),
+    "origin": (get_product_origin, ("made", "origin", "material", "materials", "manufactured")),
+    "warranty": (get_warranty_policy, ("warranty", "guarantee")),
+}
+
+# Phrases that need a conversation (claims, invoices, comparisons), so the agents must handle them.
+AGENT_ONLY_PHRASES = ("claim", "invoice", "file", "broken", "repair", "return", "refund", "compare", "difference", "better", "recommend")
+# Attributes no fast-path tool answers; a price or size match on these questions would answer the wrong thing.
+UNANSWERED_PHRASES = (
+    "weigh", "weighs", "weight", "heavy", "space", "room", "long", "many", "fit", "fits", "capacity", "seat", "seats",
+)
+
+def _phrase_pattern(phrases):
+    return re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+
+INTENT_PATTERNS = {intent: _phrase_pattern(phrases) for intent, (_tool, phrases) in INTENTS.items()}
+AGENT_ONLY_PATTERN = _phrase_pattern(AGENT_ONLY_PHRASES + UNANSWERED_PHRASES)
+MULTI_QUESTION_PATTERN = re.compile(r"\?.*\?|\b(and|also|plus)\b.*\b(what|how|where|is|are|does|do|can)\b")
+
+MAX_FAST_PATH_WORDS = 15
+
+# --- Matcher ---
+def match_catalog_question(query: str) -> Optional[tuple]:
+    """
+    Returns (intent, product name) when the query is unambiguously a single catalog
+    lookup: exactly one catalog product, exactly one intent, one question and nothing
+    that needs an agent. Returns None for everything else.
+    """
+    text = query.lower()
+    if len(text.split()) > MAX_FAST_PATH_WORDS or AGENT_ONLY_PATTERN.search(text) or MULTI_QUESTION_PATTERN.search(text):
+        return None
+    intents = [intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(text)]
+    if len(intents) != 1:
+        return None
+    product = get_catalog().resolve(query)
+    if product is None:
+        return None
+    return intents[0], product.name
+
+def answer_catalog_question(intent: str, product_name: str) -> str:
+    """Calls the intent's tool directly; the tools already answer in full sentences."""
+    tool = INTENTS[intent][0]
+    return tool.invoke(product_name)
+
+# --- Metrics ---
+class FastPathStats:
+    """Hit rate and latency of the fast path."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.max_hit_seconds = 0.0
+        self.miss_seconds = 0.0
+        self.hits_by_intent = {intent: 0 for intent in INTENTS}
+
+    def record_hit(self, intent: str, seconds: float):
+        self.hits += 1
+        self.hits_by_intent[intent] += 1
+        self.hit_seconds += seconds
+        self.max_hit_seconds = max(self.max_hit_seconds, seconds)
+
+    def record_miss(self, seconds: float):
+        self.misses += 1
+        self.miss_seconds += seconds
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "avg_hit_latency_ms": 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+            "max_hit_latency_ms": 1000 * self.max_hit_seconds,
+            "avg_miss_overhead_ms": 1000 * self.miss_seconds / self.misses if self.misses else 0.0,
+            "hits_by_intent": dict(self.hits_by_intent),
+        }
+
+fast_path_stats = FastPathStats()
+
+def try_fast_path(query: str) -> Optional[str]:
+    """Answers a high-confidence catalog question directly, or returns None to fall back to the agents."""
+    start = time.perf_counter()
+    match = match_catalog_question(query)
+    if match is None:
+        fast_path_stats.record_miss(time.perf_counter() - start)
+        return None
+    intent, product_name = match
+    answer = answer_catalog_question(intent, product_name)
+    fast_path_stats.record_hit(intent, time.perf_counter() - start)
+    return answer
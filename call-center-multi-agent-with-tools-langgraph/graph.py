@@ -1,68 +1,337 @@
 # graph.py
-from typing import List, Annotated, TypedDict
+import asyncio
+from typing import List, Annotated, Optional, TypedDict
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langgraph.graph.message import add_messages
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, AIMessageChunk, ToolMessage, RemoveMessage
 
-from agent import agent_runnables
-from supervise import topic_check_chain, filter_chain, supervisor_chain
+from agent import agent_runnables, create_agents, HANDOFF_TOOL_NAME
+from config import (
+    GUARD_MODE, GUARD_MODES, REJECTION_NODES, CLASSIFIER_MODE, CLASSIFIER_MODES,
+    HISTORY_TOKEN_BUDGET, HISTORY_MODE, HISTORY_MODES, FAST_PATH_ENABLED,
+    TERMINATION_POLICY, TERMINATION_POLICIES, MAX_HANDOFFS,
+)
+from fast_path import try_fast_path
+from tracing import traced
+from history import split_history, with_summary, summarize
+from supervise import topic_check_chain, filter_chain, supervisor_chain, triage_chain
 
 # --- Graph State Definition ---
 class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], lambda x, y: x + y]
+    # add_messages merges by message id: re-sent messages replace instead of duplicating,
+    # and RemoveMessage entries drop turns that left the history window.
+    messages: Annotated[List[BaseMessage], add_messages]
     next: str
+    summary: str
+    # Agent-to-agent handoffs in the current turn (termination policy "signal")
+    handoffs: int
+
+def conversation(state: AgentState) -> List[BaseMessage]:
+    """The messages sent to the LLM: the rolling summary (if any) followed by the history window."""
+    return with_summary(state["messages"], state.get("summary", ""))
+
+# --- Guard Decisions ---
+OFF_TOPIC_MESSAGE = "I can only assist with questions about our products. Please ask a relevant question."
+MULTI_QUESTION_MESSAGE = "I can only handle one question at a time. Please ask your questions separately."
+HANDOFF_LIMIT_MESSAGE = "I'm sorry, I couldn't find the right specialist for that question. Could you rephrase it?"
+
+def topic_rejection(result):
+    """Returns the rejection message for an off-topic classification, or None if the query is on-topic."""
+    if result.decision == "off_topic":
+        return AIMessage(content=OFF_TOPIC_MESSAGE)
+    return None
+
+def filter_rejection(result):
+    """Returns the rejection message for a multi-question classification, or None for a single question."""
+    if result.decision == "multi_question":
+        return AIMessage(content=MULTI_QUESTION_MESSAGE)
+    return None
+
+def route_decision(result):
+    """Maps the supervisor's routing result to the graph's 'next' value."""
+    if result.next == "FINISH":
+        return "END"
+    return result.next
+
+# --- Reply Nodes ---
+# The agents and the fast path answer the user. The guard nodes only reply with a fixed
+# rejection message, returned whole; their own LLM calls are classifications, not replies.
+ANSWER_NODES = frozenset({*agent_runnables.keys(), "fast_path"})
+
+def is_reply(message: BaseMessage, node: Optional[str]) -> bool:
+    """Whether a message from the graph's "messages" stream, emitted by node, is part of the reply."""
+    if node in ANSWER_NODES:
+        return True
+    return node in REJECTION_NODES and not isinstance(message, AIMessageChunk)
 
 # --- Graph Node Definitions ---
-def topic_check_node(state: AgentState):
+async def topic_check_node(state: AgentState):
     print("---TOPIC CHECK: Analyzing query topic---")
-    result = topic_check_chain.invoke({"messages": state["messages"]})
-    if result.decision == "off_topic":
+    result = await topic_check_chain.ainvoke({"messages": conversation(state)})
+    rejection_message = topic_rejection(result)
+    if rejection_message:
         print("---TOPIC CHECK: Detected off-topic question. Ending conversation.---")
-        rejection_message = AIMessage(content="I can only assist with questions about our products. Please ask a relevant question.")
         return {"messages": [rejection_message], "next": "END"}
     print("---TOPIC CHECK: Query is on-topic. Proceeding to filter.---")
     return {"next": "filter"}
 
-def filter_node(state: AgentState):
+async def filter_node(state: AgentState):
     print("---FILTER: Analyzing for multiple questions---")
-    result = filter_chain.invoke({"messages": state["messages"]})
-    if result.decision == "multi_question":
+    result = await filter_chain.ainvoke({"messages": conversation(state)})
+    rejection_message = filter_rejection(result)
+    if rejection_message:
         print("---FILTER: Detected multiple questions. Ending conversation.---")
-        rejection_message = AIMessage(content="I can only handle one question at a time. Please ask your questions separately.")
         return {"messages": [rejection_message], "next": "END"}
     print("---FILTER: Single question detected. Proceeding to supervisor.---")
     return {"next": "supervisor"}
 
-def supervisor_node(state: AgentState):
+async def supervisor_node(state: AgentState):
     print("---SUPERVISOR: Deciding next action---")
     if not isinstance(state['messages'][-1], HumanMessage):
         return {"next": "END"}
-    result = supervisor_chain.invoke({"messages": state["messages"]})
-    if result.next == "FINISH":
+    result = await supervisor_chain.ainvoke({"messages": conversation(state)})
+    next_step = route_decision(result)
+    if next_step == "END":
         print("---SUPERVISOR: Conversation is finished.---")
         return {"next": "END"}
-    print(f"---SUPERVISOR: Routing to {result.next}---")
-    return {"next": result.next}
+    print(f"---SUPERVISOR: Routing to {next_step}---")
+    return {"next": next_step}
 
-def agent_node(state: AgentState, agent_name: str):
-    result = agent_runnables[agent_name].invoke(state)
-    return {"messages": result["messages"]}
+async def guard_node(state: AgentState, cancel_on_reject: bool = False):
+    """
+    Runs the topic check, the multi-question filter and the supervisor routing concurrently.
+    The supervisor call is speculative: its route is only used once both guards have accepted
+    the query. The first guard rejection ends the turn without waiting for the other calls.
+    """
+    print("---GUARD: Running topic check, filter and supervisor concurrently---")
+    if not isinstance(state['messages'][-1], HumanMessage):
+        return {"next": "END"}
+
+    inputs = {"messages": conversation(state)}
+    tasks = {
+        asyncio.create_task(topic_check_chain.ainvoke(inputs)): topic_rejection,
+        asyncio.create_task(filter_chain.ainvoke(inputs)): filter_rejection,
+    }
+    supervisor_task = asyncio.create_task(supervisor_chain.ainvoke(inputs))
+    pending = set(tasks) | {supervisor_task}
+
+    try:
+        while tasks.keys() & pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is supervisor_task:
+                    continue
+                rejection_message = tasks[task](task.result())
+                if rejection_message:
+                    print(f"---GUARD: Rejected: {rejection_message.content}---")
+                    return {"messages": [rejection_message], "next": "END"}
+        next_step = route_decision(await supervisor_task)
+    finally:
+        if cancel_on_reject:
+            for task in pending:
+                task.cancel()
+        # Consume every call's outcome, including finished ones whose result was never read,
+        # so their errors are not reported as unhandled.
+        for task in set(tasks) | {supervisor_task}:
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    if next_step == "END":
+        print("---GUARD: Conversation is finished.---")
+        return {"next": "END"}
+    print(f"---GUARD: Routing to {next_step}---")
+    return {"next": next_step}
+
+async def triage_node(state: AgentState):
+    """
+    Makes a single fused triage call that returns the topic decision, the
+    single/multi-question decision and the route at once.
+    """
+    print("---TRIAGE: Classifying and routing query---")
+    if not isinstance(state['messages'][-1], HumanMessage):
+        return {"next": "END"}
+    result = await triage_chain.ainvoke({"messages": conversation(state)})
+    if result.decision == "off_topic":
+        print("---TRIAGE: Detected off-topic question. Ending conversation.---")
+        return {"messages": [AIMessage(content=OFF_TOPIC_MESSAGE)], "next": "END"}
+    if result.query_type == "multi_question":
+        print("---TRIAGE: Detected multiple questions. Ending conversation.---")
+        return {"messages": [AIMessage(content=MULTI_QUESTION_MESSAGE)], "next": "END"}
+    next_step = route_decision(result)
+    if next_step == "END":
+        print("---TRIAGE: Conversation is finished.---")
+        return {"next": "END"}
+    print(f"---TRIAGE: Routing to {next_step}---")
+    return {"next": next_step}
+
+def without_handoffs(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    The messages with every handoff call taken out. Only the handoff entry is removed from
+    an AIMessage's tool calls, together with its ToolMessage, so the results of tools called
+    in parallel with it keep their call; an AIMessage left with neither calls nor text is dropped.
+    """
+    handoff_ids = set()
+    kept = []
+    for message in messages:
+        if isinstance(message, AIMessage) and any(call["name"] == HANDOFF_TOOL_NAME for call in message.tool_calls):
+            handoff_ids.update(call["id"] for call in message.tool_calls if call["name"] == HANDOFF_TOOL_NAME)
+            tool_calls = [call for call in message.tool_calls if call["name"] != HANDOFF_TOOL_NAME]
+            if not tool_calls and not message.content:
+                continue
+            # The provider's raw tool calls are sent instead of tool_calls when those are empty.
+            additional_kwargs = dict(message.additional_kwargs)
+            raw_calls = [call for call in additional_kwargs.pop("tool_calls", []) if call.get("id") not in handoff_ids]
+            if raw_calls:
+                additional_kwargs["tool_calls"] = raw_calls
+            message = message.model_copy(update={"tool_calls": tool_calls, "additional_kwargs": additional_kwargs})
+        elif isinstance(message, ToolMessage) and message.tool_call_id in handoff_ids:
+            continue
+        kept.append(message)
+    return kept
+
+def handoff_target(messages: List[BaseMessage]) -> Optional[str]:
+    """The agent named in a handoff call that ended the agent's run, if it ended with one."""
+    last_ai = next((message for message in reversed(messages) if isinstance(message, AIMessage)), None)
+    if last_ai is None:
+        return None
+    for call in last_ai.tool_calls:
+        if call["name"] == HANDOFF_TOOL_NAME:
+            return call["args"].get("agent")
+    return None
+
+async def agent_node(state: AgentState, agent_name: str, agents: dict = agent_runnables, handoff: bool = False):
+    """
+    Runs one agent on the conversation. With handoff, the agent's own output decides
+    what happens next: a handoff call routes the question to the named agent, and
+    anything else is the final answer that ends the turn.
+    """
+    # ainvoke keeps the agent's LLM calls on the event loop, so their tokens reach the messages stream
+    messages = conversation(state)
+    result = await agents[agent_name].ainvoke({"messages": messages})
+    # The agent returns the whole conversation; only append the messages it added.
+    new_messages = result["messages"][len(messages):]
+    if not handoff:
+        return {"messages": new_messages}
+
+    target = handoff_target(new_messages)
+    if target is None:
+        return {"messages": new_messages, "next": "END", "handoffs": 0}
+    # A handoff is control flow, not conversation: drop the call and its result, keeping
+    # whatever the agent looked up alongside it for the next agent.
+    kept = without_handoffs(new_messages)
+    handoffs = state.get("handoffs", 0) + 1
+    if handoffs > MAX_HANDOFFS or target not in agents:
+        print(f"---{agent_name}: Handoff to {target} refused after {handoffs - 1} handoff(s).---")
+        return {"messages": kept + [AIMessage(content=HANDOFF_LIMIT_MESSAGE)], "next": "END", "handoffs": 0}
+    print(f"---{agent_name}: Handing off to {target}---")
+    return {"messages": kept, "next": target, "handoffs": handoffs}
+
+def make_agent_node(agent_name: str, agents: dict = agent_runnables, handoff: bool = False):
+    """Binds agent_node to a single agent for registration in the graph."""
+    async def run_agent(state: AgentState):
+        return await agent_node(state, agent_name, agents, handoff)
+    return run_agent
+
+def fast_path_node(state: AgentState):
+    """Answers unambiguous catalog questions straight from the tools, skipping every LLM call."""
+    last_message = state["messages"][-1]
+    answer = try_fast_path(str(last_message.content)) if isinstance(last_message, HumanMessage) else None
+    if answer is None:
+        return {"next": "classify"}
+    print("---FAST PATH: Answered catalog question directly.---")
+    return {"messages": [AIMessage(content=answer)], "next": "END"}
+
+async def compact_history_node(state: AgentState, token_budget: int, mode: str):
+    """
+    Keeps the stored history within the token budget. Turns that no longer fit are
+    removed from the state and, in "summarize" mode, folded into the rolling summary.
+    """
+    older, _recent = split_history(state["messages"], token_budget)
+    if not older:
+        return {}
+    print(f"---HISTORY: Compacting {len(older)} message(s) out of the window ({mode})---")
+    update = {"messages": [RemoveMessage(id=message.id) for message in older]}
+    if mode == "summarize":
+        update["summary"] = await summarize(state.get("summary", ""), older)
+    return update
 
 # --- Graph Construction ---
-graph = StateGraph(AgentState)
+def build_graph(guard_mode: str = GUARD_MODE, classifier_mode: str = CLASSIFIER_MODE, checkpointer=None,
+                history_token_budget: int = HISTORY_TOKEN_BUDGET, history_mode: str = HISTORY_MODE,
+                fast_path: bool = FAST_PATH_ENABLED, termination_policy: str = TERMINATION_POLICY):
+    """
+    Builds the call-center graph. classifier_mode picks between the fused triage call and the
+    three separate classifier chains, which are run according to guard_mode (see config.py).
+    With a checkpointer, conversation state is kept per thread_id across turns, and each turn
+    starts by compacting the history to history_token_budget tokens (0 keeps everything).
+    With fast_path, unambiguous catalog questions are answered before any classifier runs.
+    termination_policy decides what follows an agent's answer (see config.py).
+    Every node is traced (see tracing.py).
+    """
+    if guard_mode not in GUARD_MODES:
+        raise ValueError(f"Unknown guard mode '{guard_mode}'. Expected one of: {', '.join(GUARD_MODES)}.")
+    if classifier_mode not in CLASSIFIER_MODES:
+        raise ValueError(f"Unknown classifier mode '{classifier_mode}'. Expected one of: {', '.join(CLASSIFIER_MODES)}.")
+    if history_mode not in HISTORY_MODES:
+        raise ValueError(f"Unknown history mode '{history_mode}'. Expected one of: {', '.join(HISTORY_MODES)}.")
+    if termination_policy not in TERMINATION_POLICIES:
+        raise ValueError(
+            f"Unknown termination policy '{termination_policy}'. Expected one of: {', '.join(TERMINATION_POLICIES)}."
+        )
+    handoff = termination_policy == "signal"
+    agents = create_agents(handoff=True) if handoff else agent_runnables
+    routes = {**{agent: agent for agent in agent_runnables.keys()}, "END": END}
+
+    graph = StateGraph(AgentState)
+    graph.add_node("supervisor", traced("supervisor", supervisor_node))
+    for agent_name in agent_runnables.keys():
+        graph.add_node(agent_name, traced(agent_name, make_agent_node(agent_name, agents, handoff)))
+
+    if classifier_mode == "fused":
+        graph.add_node("triage", traced("triage", triage_node))
+        classifier_entry = "triage"
+        graph.add_conditional_edges("triage", lambda state: state["next"], routes)
+    elif guard_mode == "sequential":
+        graph.add_node("topic_checker", traced("topic_checker", topic_check_node))
+        graph.add_node("filter", traced("filter", filter_node))
+        classifier_entry = "topic_checker"
+        graph.add_conditional_edges("topic_checker", lambda state: state["next"], {"filter": "filter", "END": END})
+        graph.add_conditional_edges("filter", lambda state: state["next"], {"supervisor": "supervisor", "END": END})
+    else:
+        cancel_on_reject = guard_mode == "parallel_cancel"
+
+        async def guard(state: AgentState):
+            return await guard_node(state, cancel_on_reject=cancel_on_reject)
+
+        graph.add_node("guard", traced("guard", guard))
+        classifier_entry = "guard"
+        graph.add_conditional_edges("guard", lambda state: state["next"], routes)
+
+    entry = classifier_entry
+    if fast_path:
+        graph.add_node("fast_path", traced("fast_path", fast_path_node))
+        graph.add_conditional_edges("fast_path", lambda state: state["next"], {"classify": classifier_entry, "END": END})
+        entry = "fast_path"
+    if history_token_budget > 0:
+        async def compact_history(state: AgentState):
+            return await compact_history_node(state, history_token_budget, history_mode)
+
+        graph.add_node("compact_history", traced("compact_history", compact_history))
+        graph.add_edge("compact_history", entry)
+        entry = "compact_history"
+    graph.set_entry_point(entry)
 
-graph.add_node("topic_checker", topic_check_node)
-graph.add_node("filter", filter_node)
-graph.add_node("supervisor", supervisor_node)
-for agent_name in agent_runnables.keys():
-    graph.add_node(agent_name, lambda state, name=agent_name: agent_node(state, name))
+    graph.add_conditional_edges("supervisor", lambda state: state["next"], routes)
+    for agent_name in agent_runnables.keys():
+        if termination_policy == "supervisor":
+            graph.add_edge(agent_name, "supervisor")
+        elif termination_policy == "direct":
+            graph.add_edge(agent_name, END)
+        else:
+            graph.add_conditional_edges(agent_name, lambda state: state["next"], routes)
 
-graph.set_entry_point("topic_checker")
-graph.add_conditional_edges("topic_checker", lambda state: state["next"], {"filter": "filter", "END": END})
-graph.add_conditional_edges("filter", lambda state: state["next"], {"supervisor": "supervisor", "END": END})
-graph.add_conditional_edges("supervisor", lambda state: state["next"], {**{agent: agent for agent in agent_runnables.keys()}, "END": END})
-for agent_name in agent_runnables.keys():
-    graph.add_edge(agent_name, "supervisor")
+    return graph.compile(checkpointer=checkpointer)
 
 # --- Compile the graph ---
-app = graph.compile()
-print("Graph compiled successfully!")
\ No newline at end of file
+app = build_graph()
+print(f"Graph compiled successfully! (classifier mode: {CLASSIFIER_MODE}, guard mode: {GUARD_MODE}, "
+      f"termination policy: {TERMINATION_POLICY})")
@@ -0,0 +1,59 @@
+# history.py
+from typing import List, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langgraph.constants import TAG_NOSTREAM
+
+from llm_config import llm
+
+# --- History Window ---
+def split_history(messages: List[BaseMessage], token_budget: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Splits the conversation into (older, recent) where recent is the longest tail
+    that fits the token budget and starts at a user turn. The latest user turn is
+    always kept, even when it alone exceeds the budget.
+    """
+    recent = trim_messages(
+        messages,
+        max_tokens=token_budget,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+        allow_partial=False,
+    )
+    if not recent:
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        recent = messages[last_human:]
+    kept_ids = {message.id for message in recent}
+    older = [message for message in messages if message.id not in kept_ids]
+    return older, recent
+
+def with_summary(messages: List[BaseMessage], summary: str) -> List[BaseMessage]:
+    """Prepends the rolling summary of earlier turns, if there is one."""
+    if not summary:
+        return messages
+    return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] + messages
+
+# --- Rolling Summary ---
+summary_system_message = (
+    "You maintain a running summary of a customer support conversation about furniture products. "
+    "Extend the existing summary with the new messages. Keep every fact the agents may need later "
+    "(product names, invoice IDs, what was already answered) and stay under 120 words."
+)
+summary_chain = (
+    ChatPromptTemplate.from_messages([
+        ("system", summary_system_message),
+        ("human", "Existing summary:\n{summary}"),
+        MessagesPlaceholder(variable_name="messages"),
+        ("human", "Write the updated summary."),
+    ])
+    # nostream keeps the summary out of the token stream sent to the user
+    | llm.with_config(tags=[TAG_NOSTREAM])
+    | StrOutputParser()
+)
+
+async def summarize(summary: str, messages: List[BaseMessage]) -> str:
+    """Folds messages that left the window into the rolling summary."""
+    return await summary_chain.ainvoke({"summary": summary or "(none)", "messages": messages})
@@ -0,0 +1,339 @@
+# llm_client.py
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import time
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import openai
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+from pydantic import Field
+
+# --- Adaptive Rate Limiting ---
+class AdaptiveRateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute budget shared by every LLM call.
+
+    Calls wait their turn (first come, first served) for budget instead of being sent
+    into a 429. The allowed rate adapts AIMD-style: each 429 halves it, down to
+    min_fraction of the quota, and pauses sending for the server's retry-after; each
+    successful call adds recovery_step back. A limit of 0 disables that bucket, so
+    with both at 0 the limiter only reacts to 429s.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, burst_seconds: float = 1.0,
+                 min_fraction: float = 0.1, recovery_step: float = 0.02):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # The buckets hold at most this many seconds' worth of quota: OpenAI enforces quotas over short
+        # periods, so a burst that spends a whole minute's quota at once is still refused.
+        self.burst_seconds = burst_seconds
+        self.min_fraction = min_fraction
+        self.recovery_step = recovery_step
+        self.fraction = 1.0
+        self.request_level = self.capacity(requests_per_minute)
+        self.token_level = self.capacity(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "rate_limited": 0}
+
+    def capacity(self, per_minute: int) -> float:
+        return per_minute * self.fraction * self.burst_seconds / 60
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.request_level = min(self.capacity(self.requests_per_minute),
+                                 self.request_level + elapsed * self.requests_per_minute * self.fraction / 60)
+        self.token_level = min(self.capacity(self.tokens_per_minute),
+                               self.token_level + elapsed * self.tokens_per_minute * self.fraction / 60)
+
+    def shortfall_seconds(self, tokens: int) -> float:
+        """How long until both buckets can cover the call (0 if they already can)."""
+        delay = 0.0
+        for level, per_minute, amount in ((self.request_level, self.requests_per_minute, 1),
+                                          (self.token_level, self.tokens_per_minute, tokens)):
+            if not per_minute:
+                continue
+            # A call larger than the bucket only needs a full bucket; the rest is paid off as debt.
+            needed = min(amount, self.capacity(per_minute))
+            if level < needed:
+                delay = max(delay, (needed - level) / (per_minute * self.fraction / 60))
+        return delay
+
+    async def acquire(self, tokens: int) -> float:
+        """Waits until the call fits the budget, spends it and returns the seconds waited."""
+        started = time.monotonic()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                delay = max(self.paused_until - now, self.shortfall_seconds(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self.requests_per_minute:
+                self.request_level -= 1
+            if self.tokens_per_minute:
+                self.token_level -= tokens
+        waited = time.monotonic() - started
+        self.stats["acquired"] += 1
+        if waited > 0.001:
+            self.stats["waited"] += 1
+            self.stats["wait_seconds"] += waited
+        return waited
+
+    def settle(self, estimated_tokens: int, used_tokens: int):
+        """Corrects the token bucket once a call's real usage is known."""
+        if self.tokens_per_minute:
+            self.token_level = min(self.capacity(self.tokens_per_minute),
+                                   self.token_level + estimated_tokens - used_tokens)
+
+    def on_success(self):
+        self.fraction = min(1.0, self.fraction + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: float):
+        self.stats["rate_limited"] += 1
+        self.fraction = max(self.min_fraction, self.fraction / 2)
+        self.request_level = min(self.request_level, self.capacity(self.requests_per_minute))
+        self.token_level = min(self.token_level, self.capacity(self.tokens_per_minute))
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "wait_seconds": round(self.stats["wait_seconds"], 3),
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "rate_fraction": round(self.fraction, 3),
+        }
+
+def retry_after_seconds(error: openai.APIStatusError, default: float = 1.0) -> float:
+    """The wait a 429 response asks for (OpenAI sends retry-after-ms and/or retry-after)."""
+    headers = error.response.headers if getattr(error, "response", None) is not None else {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return default
+
+# --- Request Coalescing ---
+class Flight:
+    """One in-flight call and everything it has produced so far."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    @property
+    def abandoned(self) -> bool:
+        """The caller that made the call went away (cancelled or stopped reading) before it finished."""
+        return isinstance(self.error, (asyncio.CancelledError, GeneratorExit))
+
+    def publish(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+class SingleFlight:
+    """
+    Lets concurrent callers with the same key share one in-flight call: the first
+    caller makes it, later callers get a copy of everything it produces, streamed
+    chunk by chunk as it arrives. If the first caller goes away before the call
+    finishes, a waiting caller that has not received anything yet makes its own call.
+    """
+
+    def __init__(self):
+        self.flights: Dict[str, Flight] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    async def call(self, key: str, fn: Callable):
+        async def once():
+            yield await fn()
+
+        # Read the stream to the end (rather than returning from inside the loop) so the flight is closed now.
+        result = None
+        async for result in self.stream(key, once):
+            pass
+        return result
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator]) -> AsyncIterator:
+        flight = self.flights.get(key)
+        if flight is None:
+            async for item in self.lead(key, open_stream):
+                yield item
+            return
+
+        self.stats["coalesced"] += 1
+        position = 0
+        while True:
+            changed = flight.changed
+            while position < len(flight.items):
+                # Callers annotate what they receive (message ids, ...), so each gets its own copy.
+                yield copy.deepcopy(flight.items[position])
+                position += 1
+            if flight.done:
+                break
+            await changed.wait()
+        if flight.error is None:
+            return
+        if not flight.abandoned:
+            raise flight.error
+        if position:
+            raise RuntimeError("The shared LLM call was abandoned mid-stream by the caller that made it.")
+        async for item in self.stream(key, open_stream):
+            yield item
+
+    async def lead(self, key: str, open_stream: Callable[[], AsyncIterator]) -> AsyncIterator:
+        flight = self.flights[key] = Flight()
+        self.stats["calls"] += 1
+        try:
+            async for item in open_stream():
+                flight.items.append(copy.deepcopy(item))
+                flight.publish()
+                yield item
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.done = True
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            flight.publish()
+
+# --- Shared Client ---
+# Errors worth another attempt besides 429s; the OpenAI SDK's own retries are turned off
+# (max_retries=0) so that every attempt goes through the rate limiter.
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.InternalServerError)
+
+def usage_tokens(usage: Optional[dict]) -> Optional[int]:
+    if not usage:
+        return None
+    return usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+class SharedChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI for a process-wide client shared by every chain and agent. Its async
+    calls (the only ones the graph makes) are:
+      - coalesced: byte-identical requests in flight at the same time are sent once,
+      - rate limited against the org's RPM/TPM quota, queuing instead of hitting 429s,
+      - retried on 429 (after the server's retry-after) and on transient errors,
+      - bounded by a semaphore, so a burst of sessions queues inside the process.
+    """
+
+    call_semaphore: Optional[asyncio.Semaphore] = Field(default=None, exclude=True)
+    quota: Optional[AdaptiveRateLimiter] = Field(default=None, exclude=True)
+    coalescer: Optional[SingleFlight] = Field(default=None, exclude=True)
+    retry_attempts: int = 3
+    # Completion tokens reserved for a call that does not set max_tokens, until its real usage is known.
+    expected_completion_tokens: int = 256
+
+    def request_key(self, messages, stop, kwargs) -> Tuple[str, int]:
+        """Hash of the exact request body, and an estimate of the tokens it will use."""
+        payload = self._get_request_payload(messages, stop=stop, **kwargs)
+        body = json.dumps(payload, sort_keys=True, default=str)
+        completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or self.expected_completion_tokens
+        return hashlib.sha256(body.encode()).hexdigest(), len(body) // 4 + completion
+
+    async def attempts(self, estimate: int) -> AsyncIterator[int]:
+        """Yields attempt numbers, each after the call has been admitted by the rate limiter."""
+        for attempt in range(self.retry_attempts + 1):
+            if self.quota is not None:
+                await self.quota.acquire(estimate)
+            yield attempt
+
+    async def handle_failure(self, error: Exception, attempt: int, estimate: int):
+        """Re-raises errors that should not be retried; otherwise waits before the next attempt."""
+        if attempt == self.retry_attempts:
+            raise error
+        if self.quota is not None:
+            self.quota.settle(estimate, 0)
+        if isinstance(error, openai.RateLimitError):
+            if error.code == "insufficient_quota":
+                # Out of credit, not over the rate: waiting will not help.
+                raise error
+            delay = retry_after_seconds(error)
+            if self.quota is not None:
+                # The limiter holds every queued call back until the pause is over.
+                self.quota.on_rate_limited(delay)
+                return
+        elif isinstance(error, TRANSIENT_ERRORS):
+            delay = 0.5 * 2 ** attempt
+        else:
+            raise error
+        await asyncio.sleep(delay * random.uniform(1.0, 1.25))
+
+    def record_success(self, estimate: int, used: Optional[int]):
+        if self.quota is not None:
+            self.quota.settle(estimate, estimate if used is None else used)
+            self.quota.on_success()
+
+    async def send(self, estimate: int, generate: Callable) -> ChatResult:
+        async for attempt in self.attempts(estimate):
+            try:
+                async with self.call_semaphore or nullcontext():
+                    result = await generate()
+            except (openai.RateLimitError, *TRANSIENT_ERRORS) as e:
+                await self.handle_failure(e, attempt, estimate)
+                continue
+            used = usage_tokens((result.llm_output or {}).get("token_usage"))
+            self.record_success(estimate, used)
+            return result
+
+    async def send_stream(self, estimate: int, open_stream: Callable) -> AsyncIterator[ChatGenerationChunk]:
+        async for attempt in self.attempts(estimate):
+            yielded = False
+            used = None
+            try:
+                async with self.call_semaphore or nullcontext():
+                    async for chunk in open_stream():
+                        yielded = True
+                        used = usage_tokens(getattr(chunk.message, "usage_metadata", None)) or used
+                        yield chunk
+            except (openai.RateLimitError, *TRANSIENT_ERRORS) as e:
+                if yielded:
+                    # The caller already has part of the answer; a retry would repeat it.
+                    raise
+                await self.handle_failure(e, attempt, estimate)
+                continue
+            self.record_success(estimate, used)
+            return
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.streaming:
+            # ChatOpenAI delegates to _astream, which is coalesced and limited itself.
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        key, estimate = self.request_key(messages, stop, kwargs)
+
+        def generate():
+            return ChatOpenAI._agenerate(self, messages, stop, run_manager, **kwargs)
+
+        if self.coalescer is None:
+            return await self.send(estimate, generate)
+        return await self.coalescer.call(key, lambda: self.send(estimate, generate))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        key, estimate = self.request_key(messages, stop, {**kwargs, "stream": True})
+
+        def open_stream():
+            return ChatOpenAI._astream(self, messages, stop, run_manager, **kwargs)
+
+        if self.coalescer is None:
+            stream = self.send_stream(estimate, open_stream)
+        else:
+            stream = self.coalescer.stream(key, lambda: self.send_stream(estimate, open_stream))
+        async for chunk in stream:
+            yield chunk
+
+    def stats_snapshot(self) -> dict:
+        return {
+            "coalescing": dict(self.coalescer.stats) if self.coalescer is not None else None,
+            "rate_limit": self.quota.snapshot() if self.quota is not None else None,
+        }
@@ -1,27 +1,133 @@
 # llm_config.py
 import os
+import asyncio
+import httpx
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_openai import OpenAIEmbeddings
+
+from llm_client import AdaptiveRateLimiter, SharedChatOpenAI, SingleFlight
 
 # --- Environment Setup ---
 # Load environment variables from a .env file
 load_dotenv()
 
-# Check if the API key is available. 
+# Check if the API key is available.
 # This is a good practice to avoid errors.
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise ValueError("OPENAI_API_KEY not found in environment variables.")
 
+# --- Concurrency Limits ---
+# Size of the HTTP connection pool shared by every chain and agent.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+# Maximum number of LLM calls in flight across all sessions; further calls wait for a free slot.
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "64"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+LLM_CALL_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+
+# --- Shared Client Behaviour ---
+# Multiplex the LLM calls over a few HTTP/2 connections (needs the h2 package: pip install "httpx[http2]").
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+# How long an idle pooled connection is kept open for the next call.
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+# Send byte-identical requests that are in flight at the same time only once and share the answer.
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+# The org's quota for the model; calls queue client-side rather than exceed it (0 = no client-side limit).
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+# Attempts after the first one for 429s and transient connection/server errors.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# --- HTTP Clients ---
+# One keep-alive connection pool per client type, reused by every LLM call in the process.
+# HTTP/2 is preferred when h2 is installed. Otherwise the aiohttp transport (pip install
+# "openai[aiohttp]") spends far less CPU per request than httpx's default HTTP/1.1 pool once
+# hundreds of requests are in flight; fall back to plain httpx without either.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from openai import DefaultAioHttpClient
+except ImportError:
+    DefaultAioHttpClient = None
+
+pool_limits = httpx.Limits(
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+    keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+)
+pool_timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0)
+use_http2 = LLM_HTTP2 and HTTP2_AVAILABLE
+
+def aiohttp_client():
+    """
+    The aiohttp-backed client on the same pool limits, or None if aiohttp is not installed
+    or its transport would not use them (its connector takes the connection limit and the
+    keep-alive time from `limits`; an idle-connection count has no aiohttp equivalent).
+    """
+    if DefaultAioHttpClient is None:
+        return None
+    try:
+        client = DefaultAioHttpClient(limits=pool_limits, timeout=pool_timeout)
+    except RuntimeError:
+        # openai without the aiohttp extra
+        return None
+    limits = getattr(getattr(client, "_transport", None), "limits", None)
+    if getattr(limits, "max_connections", None) != LLM_MAX_CONNECTIONS or \
+            getattr(limits, "keepalive_expiry", None) != LLM_KEEPALIVE_SECONDS:
+        return None
+    return client
+
+if use_http2:
+    http_async_client = httpx.AsyncClient(limits=pool_limits, timeout=pool_timeout, http2=True)
+    http_transport = "httpx-http2"
+else:
+    http_async_client = aiohttp_client()
+    http_transport = "aiohttp"
+    if http_async_client is None:
+        http_async_client = httpx.AsyncClient(limits=pool_limits, timeout=pool_timeout)
+        http_transport = "httpx-http1.1"
+http_client = httpx.Client(limits=pool_limits, timeout=pool_timeout, http2=use_http2)
+print(f"LLM HTTP transport: {http_transport} (max {LLM_MAX_CONNECTIONS} connections, "
+      f"{LLM_KEEPALIVE_SECONDS:g}s keep-alive)")
+
 # --- LLM Initialization ---
 # Initialize the language model with a temperature of 0 for deterministic outputs.
 try:
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+    llm = SharedChatOpenAI(
+        model="gpt-4o",
+        temperature=0,
+        # Report token usage on streamed responses too, so tracing and the rate limiter can use it.
+        stream_usage=True,
+        http_async_client=http_async_client,
+        http_client=http_client,
+        # Retries are made by SharedChatOpenAI, so that each attempt waits for the rate limiter.
+        max_retries=0,
+        retry_attempts=LLM_MAX_RETRIES,
+        call_semaphore=LLM_CALL_SEMAPHORE,
+        quota=AdaptiveRateLimiter(LLM_RPM_LIMIT, LLM_TPM_LIMIT),
+        coalescer=SingleFlight() if LLM_COALESCE_ENABLED else None,
+    )
     print("ChatOpenAI model initialized successfully!")
-    
+
+    # Embeddings for the semantic response cache, sharing the same connection pools.
+    embeddings = OpenAIEmbeddings(
+        model=EMBEDDING_MODEL,
+        # Cached questions are far below the model's context length, so skip tokenizing
+        # them client-side (tiktoken) just to check it.
+        check_embedding_ctx_length=False,
+        http_async_client=http_async_client,
+        http_client=http_client,
+    )
+
     # You can now use the 'llm' object to make calls, for example:
-    # response = llm.invoke("Hello, how are you?")
+    # response = await llm.ainvoke("Hello, how are you?")
     # print(response.content)
 
 except Exception as e:
-    print(f"An error occurred during model initialization: {e}")
\ No newline at end of file
+    print(f"An error occurred during model initialization: {e}")
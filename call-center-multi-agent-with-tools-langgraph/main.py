@@ -1,18 +1,51 @@
 # main.py
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from langchain_core.messages import HumanMessage, AIMessage
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 
-from graph import app
+from catalog import get_catalog, reload_catalog
+from checkpointer import open_checkpointer, SessionSweeper
+from config import SEMANTIC_CACHE_ENABLED
+from fast_path import fast_path_stats
+from graph import build_graph, is_reply
+import llm_config
+from metrics import REGISTRY
+from semantic_cache import SemanticCache
+from tracing import log_event
+
+# --- Application Lifespan ---
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    """
+    Loads the product catalog, opens the session checkpointer, compiles the graph
+    on it and runs the idle-session sweeper.
+    """
+    await asyncio.to_thread(get_catalog)
+    async with open_checkpointer() as checkpointer:
+        api.state.graph = build_graph(checkpointer=checkpointer)
+        api.state.semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+        api.state.sweeper = SessionSweeper(checkpointer)
+        await api.state.sweeper.adopt_existing_sessions()
+        sweeper_task = asyncio.create_task(api.state.sweeper.run())
+        try:
+            yield
+        finally:
+            sweeper_task.cancel()
 
 # Initialize the FastAPI app
 api = FastAPI(
     title="Multi-Agent Chatbot API",
     description="An API for interacting with a multi-agent chatbot built with LangGraph.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 origins = ["*"]
 
@@ -24,36 +57,203 @@ api.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Metrics ---
+request_duration = REGISTRY.histogram("chat_request_duration_seconds", "Duration of /chat responses, by outcome.")
+first_token_latency = REGISTRY.histogram("chat_time_to_first_token_seconds", "Time from request to the first token event.")
+
+def llm_client_stats() -> dict:
+    """
+    The shared LLM client's HTTP transport, and its coalescing and rate-limit counters
+    (None for a part that is off).
+    """
+    snapshot = getattr(llm_config.llm, "stats_snapshot", None)
+    stats = snapshot() if snapshot is not None else {"coalescing": None, "rate_limit": None}
+    return {"transport": getattr(llm_config, "http_transport", None), **stats}
+
+def collect_component_metrics():
+    """Folds the fast path, semantic cache, LLM client and session counters into /metrics."""
+    families = [
+        ("fast_path_hits_total", "counter", "Questions answered by the catalog fast path.",
+         [({"intent": intent}, count) for intent, count in fast_path_stats.hits_by_intent.items()]),
+        ("fast_path_misses_total", "counter", "Questions the fast path passed on to the classifiers.",
+         [({}, fast_path_stats.misses)]),
+    ]
+    cache = getattr(api.state, "semantic_cache", None)
+    if cache is not None:
+        families.append(("semantic_cache_events_total", "counter", "Semantic cache lookups and maintenance, by event.",
+                         [({"event": event}, count) for event, count in cache.stats.items()]))
+        families.append(("semantic_cache_entries", "gauge", "Answers currently cached.", [({}, len(cache.entries))]))
+    llm_stats = llm_client_stats()
+    if llm_stats["coalescing"] is not None:
+        families.append(("llm_calls_coalesced_total", "counter", "LLM calls answered by an identical call already in flight.",
+                         [({}, llm_stats["coalescing"]["coalesced"])]))
+    if llm_stats["rate_limit"] is not None:
+        rate_limit = llm_stats["rate_limit"]
+        families.append(("llm_rate_limit_waits_total", "counter", "LLM calls that queued for the RPM/TPM budget.",
+                         [({}, rate_limit["waited"])]))
+        families.append(("llm_rate_limit_wait_seconds_total", "counter", "Time LLM calls spent queued for the RPM/TPM budget.",
+                         [({}, rate_limit["wait_seconds"])]))
+        families.append(("llm_rate_limited_total", "counter", "429 responses received from the LLM API.",
+                         [({}, rate_limit["rate_limited"])]))
+        families.append(("llm_rate_fraction", "gauge", "Share of the configured quota the rate limiter currently allows.",
+                         [({}, rate_limit["rate_fraction"])]))
+    sweeper = getattr(api.state, "sweeper", None)
+    if sweeper is not None:
+        families.append(("sessions_active", "gauge", "Sessions tracked by the idle-session sweeper.",
+                         [({}, len(sweeper.last_seen))]))
+    return families
+
+REGISTRY.add_collector(collect_component_metrics)
+
 # --- Pydantic Models for API ---
 class ChatRequest(BaseModel):
     """Request model for the chat endpoint."""
     query: str
-    # In a real app, you might include a session_id to manage conversation history
-    # session_id: str 
+    session_id: Optional[str] = Field(
+        None, description="Conversation id. Reuse it to continue a conversation; a new one is created if omitted."
+    )
+
+# --- Server-Sent Events ---
+def format_sse(data: str, event: str = None) -> str:
+    """
+    Frames a payload as a single Server-Sent Event. Every line of a multi-line
+    payload gets its own 'data:' field; clients join them back with newlines.
+    """
+    lines = [f"event: {event}"] if event else []
+    data = data.replace("\r\n", "\n").replace("\r", "\n")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+def record_request(session_id: str, outcome: str, started: float, first_token_at: float = None):
+    duration = time.perf_counter() - started
+    request_duration.observe(duration, outcome=outcome)
+    log_event({
+        "event": "request",
+        "thread_id": session_id,
+        "outcome": outcome,
+        "duration_ms": round(1000 * duration, 2),
+        "first_token_ms": round(1000 * (first_token_at - started), 2) if first_token_at is not None else None,
+    })
 
 # --- API Endpoint ---
 @api.post("/chat")
 async def chat_endpoint(request: ChatRequest):
     """
     Endpoint to stream responses from the LangGraph agent.
+    Emits a 'session' event with the conversation id, a 'token' event per generated
+    text fragment and a terminal 'end' event.
+    The first question of a session may be answered from the semantic cache, which
+    replays the same token events the original answer was streamed with.
     """
+    session_id = request.session_id or str(uuid.uuid4())
+    await api.state.sweeper.touch(session_id)
+    graph_app = api.state.graph
+    cache = api.state.semantic_cache
+
     async def event_stream():
-        # The input to the graph is a dictionary with a 'messages' key
+        # Only the new message is sent; earlier turns are restored from the session's checkpoint
         inputs = {"messages": [HumanMessage(content=request.query)]}
-        
-        # Stream events from the graph
-        async for event in app.astream(inputs, {"recursion_limit": 15}):
-            for node_name, node_output in event.items():
-                # We are interested in the final messages from the nodes
-                if "messages" in node_output:
-                    # The 'messages' key contains a list; we get the last message
-                    last_message = node_output["messages"][-1]
-                    if isinstance(last_message, AIMessage):
-                        # Yield the content of the AI's response
-                        yield f"data: {last_message.content}\n\n"
+        config = {"recursion_limit": 15, "configurable": {"thread_id": session_id}}
+        last_message_id = None
+        started = time.perf_counter()
+        yield format_sse(session_id, event="session")
+
+        # Only the first turn of a session can be cached: its answer depends on the question alone.
+        lookup = None
+        if cache is not None:
+            snapshot = await graph_app.aget_state(config)
+            if snapshot.values.get("messages"):
+                cache.record_follow_up()
+            else:
+                lookup = await cache.lookup(request.query)
+        if lookup is not None and lookup.entry is not None:
+            first_token_at = time.perf_counter()
+            first_token_latency.observe(first_token_at - started)
+            for frame in lookup.entry.frames:
+                yield frame
+            # Record the exchange so the session continues as if the graph had answered it.
+            await graph_app.aupdate_state(
+                config,
+                {"messages": [HumanMessage(content=request.query), AIMessage(content=lookup.entry.answer)], "next": "END"},
+                as_node="supervisor",
+            )
+            record_request(session_id, "cache_hit", started, first_token_at)
+            yield format_sse("[DONE]", event="end")
+            return
+
+        frames, answer, answer_node, failed = [], [], None, False
+        first_token_at = None
+        try:
+            # Stream LLM tokens as they are generated; subgraphs=True includes the tokens of the
+            # ReAct agents' own LLM calls. Messages returned by nodes without an LLM call
+            # (e.g. guard rejections) arrive here as a single whole message.
+            stream = graph_app.astream(inputs, config, stream_mode="messages", subgraphs=True)
+            async for namespace, (message, metadata) in stream:
+                if not isinstance(message, (AIMessage, AIMessageChunk)) or not isinstance(message.content, str):
+                    continue
+                if not message.content:
+                    # Tool-call chunks carry no user-facing text.
+                    continue
+                # Tokens of the ReAct agents come from their subgraph; the namespace names the agent node.
+                node = namespace[0].split(":")[0] if namespace else metadata.get("langgraph_node")
+                if not is_reply(message, node):
+                    # Classifier outputs are routing decisions, never shown to the user or cached.
+                    continue
+                if last_message_id is not None and message.id != last_message_id:
+                    frames.append(format_sse("\n\n", event="token"))
+                    answer.append("\n\n")
+                    yield frames[-1]
+                last_message_id = message.id
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    first_token_latency.observe(first_token_at - started)
+                answer_node = node
+                frames.append(format_sse(message.content, event="token"))
+                answer.append(message.content)
+                yield frames[-1]
+        except Exception as e:
+            failed = True
+            yield format_sse(f"An error occurred: {e}", event="error")
+        if lookup is not None and not failed:
+            cache.store(lookup, frames, "".join(answer), answer_node)
+        record_request(session_id, "error" if failed else "graph", started, first_token_at)
+        yield format_sse("[DONE]", event="end")
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
+@api.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Per-node latency, LLM calls, tokens and tool calls, plus request and cache metrics, in Prometheus format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@api.get("/stats/fast-path")
+async def fast_path_stats_endpoint():
+    """Hit rate and latency of the catalog fast path."""
+    return fast_path_stats.snapshot()
+
+@api.get("/stats/semantic-cache")
+async def semantic_cache_stats_endpoint():
+    """Hit/miss counters and size of the semantic response cache."""
+    cache = api.state.semantic_cache
+    return cache.snapshot() if cache is not None else {"enabled": False}
+
+@api.get("/stats/llm-client")
+async def llm_client_stats_endpoint():
+    """Request coalescing and client-side rate limiting of the shared LLM client."""
+    return llm_client_stats()
+
+@api.post("/catalog/reload")
+async def reload_catalog_endpoint():
+    """
+    Reloads the product catalog from CATALOG_PATH without restarting the server.
+    Requests in flight finish on the old catalog; if loading fails, it stays in use.
+    """
+    try:
+        catalog = await asyncio.to_thread(reload_catalog)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Catalog reload failed: {e}")
+    return {"products": len(catalog)}
+
 # To run this API, save it as main.py and run:
 # uvicorn main:api --reload
 
@@ -0,0 +1,182 @@
+# semantic_cache.py
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from catalog import get_catalog, normalize, tokenize
+from config import (
+    REJECTION_NODES,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL_SECONDS,
+)
+from llm_config import embeddings
+
+def cache_route(node: str) -> str:
+    """The route an answer is cached under (which sets its TTL), from the node that produced it."""
+    return "rejection" if node in REJECTION_NODES else node
+
+def query_signature(query: str) -> tuple:
+    """
+    The products and numbers a question mentions. "How much is the sofa?" and
+    "How much is the desk?" embed almost identically, so only questions with the
+    same signature may share an answer.
+    """
+    catalog = get_catalog()
+    tokens = tokenize(query)
+    row_ids = catalog.exact_mentions(tokens)
+    skus = [catalog.skus[row_id] for row_id in row_ids]
+    if not skus:
+        product = catalog.resolve(query)
+        skus = [product.sku] if product else []
+    numbers = [token for token in tokens if any(ch.isdigit() for ch in token)]
+    return tuple(sorted(skus)), tuple(sorted(numbers))
+
+class CacheEntry:
+    def __init__(self, key: str, signature: tuple, vector: Optional[np.ndarray], frames: List[str],
+                 answer: str, route: str, expires_at: float):
+        self.key = key
+        self.signature = signature
+        self.vector = vector
+        self.frames = frames
+        self.answer = answer
+        self.route = route
+        self.expires_at = expires_at
+
+class CacheLookup:
+    """The result of a lookup: the matching entry, or what is needed to store the answer."""
+
+    def __init__(self, key: str, signature: tuple, vector: Optional[np.ndarray] = None,
+                 entry: Optional[CacheEntry] = None):
+        self.key = key
+        self.signature = signature
+        self.vector = vector
+        self.entry = entry
+
+# --- Cache ---
+class SemanticCache:
+    """
+    LRU cache of first-turn answers, stored as the SSE frames that were streamed.
+    Lookups try the normalized question text first and only embed the question on
+    an exact miss; the semantic tier compares it against cached questions with the
+    same signature. Entries expire after the TTL of the route that answered them.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 ttl_seconds: Dict[str, float] = SEMANTIC_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # signature -> keys of the entries with an embedding, and their stacked unit vectors (rebuilt lazily)
+        self.buckets: Dict[tuple, List[str]] = {}
+        self.matrices: Dict[tuple, np.ndarray] = {}
+        self.stats = {
+            "exact_hits": 0, "semantic_hits": 0, "misses": 0, "follow_up_turns": 0, "uncacheable_routes": 0,
+            "stores": 0, "evictions": 0, "expirations": 0, "embedding_errors": 0,
+        }
+
+    # --- Lookup ---
+    def record_follow_up(self):
+        """Counts a turn that bypassed the cache because its answer depends on earlier turns."""
+        self.stats["follow_up_turns"] += 1
+
+    async def lookup(self, query: str) -> CacheLookup:
+        key = normalize(query)
+        lookup = CacheLookup(key, query_signature(query))
+        entry = self._live_entry(key)
+        if entry is not None:
+            self.stats["exact_hits"] += 1
+            lookup.entry = entry
+            return lookup
+
+        try:
+            lookup.vector = _unit(await embeddings.aembed_query(query))
+        except Exception as e:
+            # The cache is an optimization; without an embedding the turn simply runs the graph.
+            self.stats["embedding_errors"] += 1
+            print(f"---SEMANTIC CACHE: Embedding failed: {e}---")
+            self.stats["misses"] += 1
+            return lookup
+
+        entry = self._nearest(lookup.signature, lookup.vector)
+        if entry is not None:
+            self.stats["semantic_hits"] += 1
+            lookup.entry = entry
+        else:
+            self.stats["misses"] += 1
+        return lookup
+
+    def _live_entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, signature: tuple, vector: np.ndarray) -> Optional[CacheEntry]:
+        keys = self.buckets.get(signature)
+        if not keys:
+            return None
+        matrix = self.matrices.get(signature)
+        if matrix is None:
+            matrix = self.matrices[signature] = np.stack([self.entries[key].vector for key in keys])
+        similarities = matrix @ vector
+        matches = np.flatnonzero(similarities >= self.threshold)
+        # Most similar first; an expired match is dropped and the next one tried.
+        for key in [keys[i] for i in matches[np.argsort(-similarities[matches], kind="stable")]]:
+            entry = self._live_entry(key)
+            if entry is not None:
+                return entry
+        return None
+
+    # --- Store ---
+    def store(self, lookup: CacheLookup, frames: List[str], answer: str, node: str):
+        """Caches a streamed answer, unless its route is not cacheable."""
+        route = cache_route(node)
+        ttl = self.ttl_seconds.get(route)
+        if not ttl or not frames:
+            self.stats["uncacheable_routes"] += 1
+            return
+        if lookup.key in self.entries:
+            self._remove(lookup.key)
+        self.entries[lookup.key] = CacheEntry(
+            lookup.key, lookup.signature, lookup.vector, frames, answer, route, time.monotonic() + ttl
+        )
+        if lookup.vector is not None:
+            self.buckets.setdefault(lookup.signature, []).append(lookup.key)
+            self.matrices.pop(lookup.signature, None)
+        self.stats["stores"] += 1
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        if entry.vector is not None:
+            keys = self.buckets[entry.signature]
+            keys.remove(key)
+            if not keys:
+                del self.buckets[entry.signature]
+            self.matrices.pop(entry.signature, None)
+
+    def snapshot(self) -> dict:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+        }
+
+def _unit(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
@@ -2,6 +2,7 @@
 from typing import Literal
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langgraph.constants import TAG_NOSTREAM
 from llm_config import llm
 
 # --- Pydantic Models for Structured Output ---
@@ -28,6 +29,8 @@ class Router(BaseModel):
     )
 
 # --- LLM Chains for Supervision ---
+# The classifiers' JSON answers are control flow, not replies: TAG_NOSTREAM keeps their
+# tokens out of the graph's "messages" stream.
 
 # Chain for checking if the query is on-topic
 topic_check_system_message = (
@@ -38,7 +41,7 @@ topic_check_system_message = (
 )
 topic_check_chain = (
     ChatPromptTemplate.from_messages([("system", topic_check_system_message), MessagesPlaceholder(variable_name="messages")])
-    | llm.with_structured_output(schema=TopicClassifier)
+    | llm.with_structured_output(schema=TopicClassifier).with_config(tags=[TAG_NOSTREAM])
 )
 
 # Chain for checking for multiple questions
@@ -49,7 +52,7 @@ filter_system_message = (
 )
 filter_chain = (
     ChatPromptTemplate.from_messages([("system", filter_system_message), MessagesPlaceholder(variable_name="messages")])
-    | llm.with_structured_output(schema=QueryClassifier)
+    | llm.with_structured_output(schema=QueryClassifier).with_config(tags=[TAG_NOSTREAM])
 )
 
 # Chain for routing to the correct agent
@@ -62,5 +65,31 @@ supervisor_system_message = (
 )
 supervisor_chain = (
     ChatPromptTemplate.from_messages([("system", supervisor_system_message), MessagesPlaceholder(variable_name="messages")])
-    | llm.with_structured_output(schema=Router)
-)
\ No newline at end of file
+    | llm.with_structured_output(schema=Router).with_config(tags=[TAG_NOSTREAM])
+)
+
+# --- Fused Triage ---
+# A single structured-output call that answers all three questions above at once.
+# Used instead of the three chains when config.CLASSIFIER_MODE is "fused".
+
+class Triage(BaseModel):
+    """Classify the user's query and route it."""
+    decision: Literal["on_topic", "off_topic"] = Field(
+        ...,
+        description="'on_topic' for furniture products (sofas, desks, dimensions, price, warranty, origin), else 'off_topic'."
+    )
+    query_type: Literal["single_question", "multi_question"] = Field(
+        ...,
+        description="'multi_question' if the message asks more than one distinct question."
+    )
+    next: Literal["ProductDetailAgent", "PricingAgent", "WarrantyAgent", "FINISH"] = Field(
+        ...,
+        description="The agent for the request, or 'FINISH' if the user is just making conversation."
+    )
+
+# The field descriptions carry the rules, so the system message only sets the task.
+triage_system_message = "You triage the last user message for a furniture support team."
+triage_chain = (
+    ChatPromptTemplate.from_messages([("system", triage_system_message), MessagesPlaceholder(variable_name="messages")])
+    | llm.with_structured_output(schema=Triage).with_config(tags=[TAG_NOSTREAM])
+)
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# Run from the project directory: python -m pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# llm_config refuses to load without a key; no test calls the API.
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
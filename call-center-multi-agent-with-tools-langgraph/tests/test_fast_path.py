@@ -0,0 +1,26 @@
+# tests/test_fast_path.py
+import pytest
+
+from fast_path import match_catalog_question
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How much is the sofa?", ("price", "Grand Comfort Sofa")),
+    ("How much does the desk cost?", ("price", "Executive Desk")),
+    ("What are the dimensions of the sofa?", ("dimensions", "Grand Comfort Sofa")),
+    ("Where is the desk made?", ("origin", "Executive Desk")),
+])
+def test_catalog_lookups_are_answered(query, expected):
+    assert match_catalog_question(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "How much does the sofa weigh?",
+    "How much space does the desk take up?",
+    "How much weight can the desk hold?",
+    "How long is the sofa?",
+    "How many people fit on the sofa?",
+    "How much room do I need for the desk?",
+])
+def test_questions_no_tool_answers_go_to_the_llm(query):
+    assert match_catalog_question(query) is None
@@ -0,0 +1,39 @@
+# tests/test_guard.py
+import asyncio
+import gc
+from types import SimpleNamespace
+
+from langchain_core.messages import HumanMessage
+
+import graph
+
+
+class Chain:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    async def ainvoke(self, inputs):
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_a_rejection_leaves_no_unretrieved_task_errors(monkeypatch):
+    monkeypatch.setattr(graph, "topic_check_chain", Chain(SimpleNamespace(decision="off_topic")))
+    monkeypatch.setattr(graph, "filter_chain", Chain(SimpleNamespace(decision="single_question")))
+    monkeypatch.setattr(graph, "supervisor_chain", Chain(error=RuntimeError("supervisor failed")))
+    unhandled = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        result = await graph.guard_node({"messages": [HumanMessage(content="What's the weather?")]})
+        await asyncio.sleep(0)
+        gc.collect()
+        return result
+
+    result = asyncio.run(run())
+
+    assert result["next"] == "END"
+    assert result["messages"][0].content == graph.OFF_TOPIC_MESSAGE
+    assert unhandled == []
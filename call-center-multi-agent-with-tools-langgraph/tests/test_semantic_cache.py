@@ -0,0 +1,45 @@
+# tests/test_semantic_cache.py
+import asyncio
+
+import numpy as np
+
+import semantic_cache
+from semantic_cache import CacheLookup, SemanticCache
+
+
+class FixedEmbeddings:
+    def __init__(self, vector):
+        self.vector = vector
+
+    async def aembed_query(self, text):
+        return self.vector
+
+
+def cached(cache, key, vector, answer):
+    lookup = CacheLookup(key, ((), ()), np.asarray(vector, dtype=np.float32))
+    cache.store(lookup, [f"event: token\ndata: {answer}\n\n"], answer, "PricingAgent")
+    return cache.entries[key]
+
+
+def test_an_expired_best_match_falls_back_to_the_next_live_one(monkeypatch):
+    cache = SemanticCache(threshold=0.8, ttl_seconds={"PricingAgent": 3600})
+    nearest = cached(cache, "how much is it", [1.0, 0.0], "stale")
+    cached(cache, "what does it cost", [0.9, 0.436], "live")
+    nearest.expires_at = 0
+    monkeypatch.setattr(semantic_cache, "embeddings", FixedEmbeddings([1.0, 0.0]))
+    monkeypatch.setattr(semantic_cache, "query_signature", lambda query: ((), ()))
+
+    lookup = asyncio.run(cache.lookup("how much is this one"))
+
+    assert lookup.entry is not None and lookup.entry.answer == "live"
+    assert "how much is it" not in cache.entries
+    assert cache.stats["expirations"] == 1
+
+
+def test_no_match_above_the_threshold_is_a_miss(monkeypatch):
+    cache = SemanticCache(threshold=0.8, ttl_seconds={"PricingAgent": 3600})
+    cached(cache, "how much is it", [0.0, 1.0], "other")
+    monkeypatch.setattr(semantic_cache, "embeddings", FixedEmbeddings([1.0, 0.0]))
+    monkeypatch.setattr(semantic_cache, "query_signature", lambda query: ((), ()))
+
+    assert asyncio.run(cache.lookup("where is it made")).entry is None
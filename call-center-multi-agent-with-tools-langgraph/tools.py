@@ -1,55 +1,70 @@
 # tools.py
+from typing import Optional
 from langchain_core.tools import tool
 
+from catalog import Product, get_catalog
+
+# --- Product Lookup ---
+def find_product(query: str) -> Optional[Product]:
+    """Resolves the product a tool input refers to through the shared catalog."""
+    return get_catalog().resolve(query)
+
+def not_found(message: str, query: str) -> str:
+    """The tool's not-found message, with the closest catalog matches when there are any."""
+    suggestions = get_catalog().search(query, limit=3)
+    if suggestions:
+        message += " Did you mean: " + ", ".join(product.name for product in suggestions) + "?"
+    return message
+
 # --- Tool Definitions ---
 
 @tool
 def get_space_details(query: str) -> str:
     """Provides detailed specifications and dimensions of a product."""
     print(f"---TOOL: Getting space details for: {query}---")
-    if "sofa" in query.lower():
-        return "The Grand Comfort Sofa is 220cm wide, 95cm deep, and 80cm high."
-    elif "desk" in query.lower():
-        return "The Executive Desk is 150cm wide, 75cm deep, and 78cm high."
-    else:
-        return "Could not find space details for the specified product."
+    product = find_product(query)
+    if product is None:
+        return not_found("Could not find space details for the specified product.", query)
+    return f"The {product.name} is {product.width_cm:g}cm wide, {product.depth_cm:g}cm deep, and {product.height_cm:g}cm high."
 
 @tool
 def get_product_origin(query: str) -> str:
     """Provides information about the origin and materials of a product."""
     print(f"---TOOL: Getting origin details for: {query}---")
-    if "sofa" in query.lower():
-        return "The Grand Comfort Sofa is handcrafted in Italy using premium leather."
-    elif "desk" in query.lower():
-        return "The Executive Desk is made from sustainable American oak."
-    else:
-        return "Could not find origin details for the specified product."
+    product = find_product(query)
+    if product is None or not product.origin:
+        return not_found("Could not find origin details for the specified product.", query)
+    return f"The {product.name} is {product.origin}."
 
 @tool
 def get_price_details(product_name: str) -> str:
     """Provides the current price of a specific product."""
     print(f"---TOOL: Getting price for: {product_name}---")
-    if "sofa" in product_name.lower():
-        return "The Grand Comfort Sofa is priced at $1,500."
-    elif "desk" in product_name.lower():
-        return "The Executive Desk is priced at $800."
-    else:
-        return "Product not found. Please specify the product name."
+    product = find_product(product_name)
+    if product is None:
+        return not_found("Product not found. Please specify the product name.", product_name)
+    return f"The {product.name} is priced at ${product.price:,.0f}."
 
 @tool
 def get_available_discounts(product_name: str) -> str:
     """Checks for any available discounts or promotions for a product."""
     print(f"---TOOL: Checking discounts for: {product_name}---")
-    if "sofa" in product_name.lower():
-        return "There is a 10% summer sale discount on the Grand Comfort Sofa."
-    else:
-        return "There are currently no special discounts for the Executive Desk."
+    product = find_product(product_name)
+    if product is None:
+        return not_found("Product not found. Please specify the product name.", product_name)
+    if product.discount_pct > 0:
+        return f"There is a {product.discount_pct:g}% {product.discount_name or 'special'} discount on the {product.name}."
+    return f"There are currently no special discounts for the {product.name}."
 
 @tool
 def get_warranty_policy(product_name: str) -> str:
     """Provides the warranty policy details for a specific product."""
     print(f"---TOOL: Getting warranty policy for: {product_name}---")
-    return f"All our products, including the {product_name}, come with a 2-year standard warranty covering manufacturing defects."
+    product = find_product(product_name)
+    if product is None:
+        return f"All our products, including the {product_name}, come with a 2-year standard warranty covering manufacturing defects."
+    return (f"All our products, including the {product.name}, come with a {product.warranty_years}-year "
+            f"standard warranty covering manufacturing defects.")
 
 @tool
 def get_warranty_form(product_name: str, invoice_id: str) -> str:
@@ -61,7 +76,11 @@ def get_warranty_form(product_name: str, invoice_id: str) -> str:
     
     if not product_name or not invoice_id:
         return "The product name and invoice ID are both required to get the warranty form link. Please ask the user for the missing information."
-        
+
+    product = find_product(product_name)
+    if product is not None:
+        product_name = product.name
+
     return (f"To file a warranty claim for your {product_name} (Invoice #{invoice_id}), "
             f"please visit our website at example.com/warranty-claim?product={product_name.replace(' ', '+')}&invoice={invoice_id}")
 
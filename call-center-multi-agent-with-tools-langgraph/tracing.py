@@ -0,0 +1,146 @@
+# tracing.py
+import inspect
+import json
+import logging
+import sys
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tracers.context import register_configure_hook
+
+from config import TRACE_LOG_ENABLED
+from metrics import REGISTRY
+
+# --- Node Trace ---
+class NodeTrace:
+    """What one execution of a graph node cost."""
+
+    def __init__(self, node: str, thread_id: Optional[str]):
+        self.node = node
+        self.thread_id = thread_id
+        self.status = "ok"
+        self.duration_seconds = 0.0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls: List[str] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "event": "node",
+            "node": self.node,
+            "thread_id": self.thread_id,
+            "status": self.status,
+            "duration_ms": round(1000 * self.duration_seconds, 2),
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_calls": self.tool_calls,
+        }
+
+class NodeTraceHandler(BaseCallbackHandler):
+    """Counts the LLM calls, tokens and tool calls made while a node runs, including inside agent subgraphs."""
+
+    # Called on the event loop rather than in a thread pool: the handler only updates counters.
+    run_inline = True
+
+    def __init__(self, trace: NodeTrace):
+        self.trace = trace
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.trace.llm_calls += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.trace.llm_calls += 1
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.trace.prompt_tokens += usage.get("input_tokens", 0)
+                    self.trace.completion_tokens += usage.get("output_tokens", 0)
+                    return
+        # Models that do not fill usage_metadata may still report OpenAI-style token usage.
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        self.trace.prompt_tokens += token_usage.get("prompt_tokens", 0)
+        self.trace.completion_tokens += token_usage.get("completion_tokens", 0)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.trace.tool_calls.append(kwargs.get("name") or (serialized or {}).get("name", "unknown"))
+
+# Every LangChain run started while this is set reports to the node's handler.
+node_trace_handler: ContextVar[Optional[NodeTraceHandler]] = ContextVar("node_trace_handler", default=None)
+register_configure_hook(node_trace_handler, inheritable=True)
+
+# --- Export ---
+node_duration = REGISTRY.histogram("graph_node_duration_seconds", "Wall time of graph node executions.")
+node_llm_calls = REGISTRY.counter("graph_node_llm_calls_total", "LLM round trips made by graph nodes.")
+node_tokens = REGISTRY.counter("graph_node_tokens_total", "Prompt and completion tokens used by graph nodes.")
+node_tool_calls = REGISTRY.counter("graph_node_tool_calls_total", "Tool calls made by graph nodes.")
+
+trace_logger = logging.getLogger("call_center.trace")
+if TRACE_LOG_ENABLED and not trace_logger.handlers:
+    log_handler = logging.StreamHandler(sys.stderr)
+    log_handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(log_handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+
+# Callables that receive every finished NodeTrace, e.g. to aggregate traces in a benchmark.
+trace_sinks: List[Callable[[NodeTrace], None]] = []
+
+def log_event(record: dict):
+    """Writes one structured (JSON) log line."""
+    if TRACE_LOG_ENABLED:
+        trace_logger.info(json.dumps(record))
+
+def export(trace: NodeTrace):
+    node_duration.observe(trace.duration_seconds, node=trace.node, status=trace.status)
+    node_llm_calls.inc(trace.llm_calls, node=trace.node)
+    node_tokens.inc(trace.prompt_tokens, node=trace.node, type="prompt")
+    node_tokens.inc(trace.completion_tokens, node=trace.node, type="completion")
+    for tool_name in trace.tool_calls:
+        node_tool_calls.inc(node=trace.node, tool=tool_name)
+    log_event(trace.to_dict())
+    for sink in trace_sinks:
+        sink(trace)
+
+# --- Node Wrapper ---
+def traced(node: str, fn: Callable) -> Callable:
+    """Wraps a graph node so each execution is timed, attributed its LLM and tool usage, and exported."""
+
+    def start(config: RunnableConfig) -> tuple:
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        trace = NodeTrace(node, thread_id)
+        return trace, node_trace_handler.set(NodeTraceHandler(trace)), time.perf_counter()
+
+    def finish(trace: NodeTrace, token, started: float):
+        trace.duration_seconds = time.perf_counter() - started
+        node_trace_handler.reset(token)
+        export(trace)
+
+    if inspect.iscoroutinefunction(fn):
+        async def traced_node(state, config: RunnableConfig):
+            trace, token, started = start(config)
+            try:
+                return await fn(state)
+            except BaseException:
+                trace.status = "error"
+                raise
+            finally:
+                finish(trace, token, started)
+    else:
+        def traced_node(state, config: RunnableConfig):
+            trace, token, started = start(config)
+            try:
+                return fn(state)
+            except BaseException:
+                trace.status = "error"
+                raise
+            finally:
+                finish(trace, token, started)
+    return traced_node
@@ -0,0 +1,173 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL_NAME = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.environ.get("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_WAIT_MS = float(os.environ.get("EMBEDDING_BATCH_WAIT_MS", "2"))
+
+
+# Models whose tokenizer lowercases its input, so case never changes their embeddings
+UNCASED_MODELS = {"all-MiniLM-L6-v2", "all-MiniLM-L12-v2"}
+
+
+def is_uncased(model_name: str) -> bool:
+    return model_name.split("/")[-1] in UNCASED_MODELS
+
+
+def normalize_text(text: str, lowercase: bool = False) -> str:
+    """
+    Cache key for a text, which is also the text encoded. Runs of whitespace never change
+    an embedding; case only does not for an uncased model (lowercase=True).
+    """
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+
+class EmbeddingService:
+    """
+    The process's one copy of the embedding model, behind an LRU cache of query
+    embeddings keyed by normalized text.
+
+    Cache misses are queued to a worker thread that encodes everything waiting
+    (up to max_batch_size texts, after at most batch_wait_ms) in one forward pass.
+    Callers asking for a text that is already being encoded wait for that result
+    instead of queueing it again.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, cache_size: int = EMBEDDING_CACHE_SIZE,
+                 max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE, batch_wait_ms: float = EMBEDDING_BATCH_WAIT_MS,
+                 model=None):
+        self.model_name = model_name
+        self.lowercase = is_uncased(model_name)
+        self.cache_size = cache_size
+        self.max_batch_size = max_batch_size
+        self.batch_wait_seconds = batch_wait_ms / 1000
+        self._model = model
+        self.model_lock = threading.Lock()
+        # normalized text -> float32 vector (a tenth of the memory of a list of floats)
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.cache_lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.worker = None
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "batches": 0, "encoded": 0, "encode_seconds": 0.0}
+
+    @property
+    def model(self):
+        with self.model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            return self._model
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embeds texts in one forward pass, without the cache (e.g. documents being indexed)."""
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embeddings of query texts, from the cache or the next micro-batch."""
+        keys = [normalize_text(text, self.lowercase) for text in texts]
+        found, futures = {}, {}
+        with self.cache_lock:
+            for key in keys:
+                if key in found or key in futures:
+                    continue
+                vector = self.cache.get(key)
+                if vector is not None:
+                    self.cache.move_to_end(key)
+                    found[key] = vector
+                    self.stats["hits"] += 1
+                elif key in self.in_flight:
+                    futures[key] = self.in_flight[key]
+                    self.stats["coalesced"] += 1
+                else:
+                    futures[key] = self.in_flight[key] = Future()
+                    self.pending.put((key, futures[key]))
+                    self.stats["misses"] += 1
+            if futures and self.worker is None:
+                self.worker = threading.Thread(target=self.run_batches, name="embedding-batcher", daemon=True)
+                self.worker.start()
+        for key, future in futures.items():
+            found[key] = future.result()
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed([text])[0]
+
+    def next_batch(self) -> list[tuple[str, Future]]:
+        """Blocks for the first queued text, then takes whatever else arrives within batch_wait_seconds."""
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.batch_wait_seconds
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.pending.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def run_batches(self):
+        while True:
+            batch = self.next_batch()
+            started = time.perf_counter()
+            try:
+                vectors = self.encode([key for key, _ in batch])
+            except Exception as e:
+                with self.cache_lock:
+                    for key, _ in batch:
+                        self.in_flight.pop(key, None)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self.cache_lock:
+                self.stats["batches"] += 1
+                self.stats["encoded"] += len(batch)
+                self.stats["encode_seconds"] += time.perf_counter() - started
+                for (key, _), vector in zip(batch, vectors):
+                    self.cache[key] = vector
+                    self.cache.move_to_end(key)
+                    self.in_flight.pop(key, None)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def snapshot(self) -> dict:
+        with self.cache_lock:
+            stats = dict(self.stats)
+            cached = len(self.cache)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        encode_seconds = stats.pop("encode_seconds")
+        return {
+            **stats,
+            "model": self.model_name,
+            "cached_texts": cached,
+            "cache_size": self.cache_size,
+            # Lookups answered without encoding anything new (cache hits and waits on an encode in flight)
+            "hit_rate": round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else None,
+            "mean_batch_size": round(stats["encoded"] / stats["batches"], 2) if stats["batches"] else None,
+            "mean_encode_ms_per_text": round(1000 * encode_seconds / stats["encoded"], 2) if stats["encoded"] else None,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings backed by an EmbeddingService: queries are cached, documents are not."""
+
+    def __init__(self, service: EmbeddingService):
+        self.service = service
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.service.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.service.embed_query(text)
+
+
+EMBEDDING_SERVICE = EmbeddingService()
@@ -1,13 +1,13 @@
 import os
 import json
 import openai
-from sentence_transformers import SentenceTransformer
 from pymilvus import MilvusClient
 from dotenv import load_dotenv
 
+from embedding_service import EMBEDDING_SERVICE
+
 load_dotenv()
 
-EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
 DB_CLIENT = MilvusClient(
     uri=os.environ["ZILLIZ_URI"],
     token=os.environ["ZILLIZ_TOKEN"]
@@ -15,7 +15,7 @@ DB_CLIENT = MilvusClient(
 
 def get_top_k(question, collection):
 
-    question_vector = EMBEDDING_MODEL.encode(question).tolist()
+    question_vector = EMBEDDING_SERVICE.embed_query(question)
 
     search_results = DB_CLIENT.search(
         collection_name=collection,
@@ -0,0 +1 @@
+../EMBEDDING/local_index.py
\ No newline at end of file
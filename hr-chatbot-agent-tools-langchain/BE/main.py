@@ -1,10 +1,13 @@
 import os
+import json
+import uuid
 from dotenv import load_dotenv
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_react_agent
@@ -12,9 +15,11 @@ from langchain.memory import ConversationBufferMemory
 from langchain import hub
 
 from tools_simple_question import get_company_info
-from tools_rag import answer_leave_question, answer_salary_question, answer_resignation_question
+from tools_rag import answer_policy_question
 from tools_search import search_floor_item
 from tools_certificate import generate_certificate_of_employment
+from embedding_service import EMBEDDING_SERVICE
+from sessions import SESSION_STORE
 
 load_dotenv()
 OPENAI_API_KEY = os.environ.get("API_KEY")
@@ -37,9 +42,7 @@ app.add_middleware(
 
 tools = [
     get_company_info,
-    answer_leave_question,
-    answer_salary_question,
-    answer_resignation_question,
+    answer_policy_question,
     search_floor_item,
     generate_certificate_of_employment
 ]
@@ -63,33 +66,129 @@ agent_executor = AgentExecutor(
 
 class ChatRequest(BaseModel):
     prompt: str
-    chat_history: List[Dict[str, Any]] = Field(default_factory=list, description="A list of previous messages")
+    session_id: Optional[str] = Field(None, description="Conversation kept on the server; a new one is started if omitted")
+    chat_history: List[Dict[str, Any]] = Field(default_factory=list, description="A list of previous messages (without a session_id)")
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
 
 @app.get("/")
 def read_root():
     return {"status": "HR Chatbot backend is running"}
 
+@app.get("/stats/embeddings")
+def embedding_stats():
+    return EMBEDDING_SERVICE.snapshot()
+
+@app.get("/stats/sessions")
+def session_stats():
+    return SESSION_STORE.snapshot()
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    SESSION_STORE.delete(session_id)
+    return {"status": "deleted"}
+
+def build_chat_history(chat_history: List[Dict[str, Any]]) -> list:
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    for message in chat_history:
+        if message.get("role") == "user":
+            memory.chat_memory.add_user_message(message.get("content"))
+        elif message.get("role") == "assistant":
+            memory.chat_memory.add_ai_message(message.get("content"))
+    return memory.chat_memory.messages
+
+def get_chat_history(request: ChatRequest) -> list:
+    if request.session_id:
+        return SESSION_STORE.history(request.session_id)
+    return build_chat_history(request.chat_history)
+
 @app.post("/chat", response_model=ChatResponse)
 def handle_chat(request: ChatRequest):
+    session_id = request.session_id or str(uuid.uuid4())
     try:
-        memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        for message in request.chat_history:
-            if message.get("role") == "user":
-                memory.chat_memory.add_user_message(message.get("content"))
-            elif message.get("role") == "assistant":
-                memory.chat_memory.add_ai_message(message.get("content"))
-        
         response = agent_executor.invoke({
             "input": request.prompt,
-            "chat_history": memory.chat_memory.messages
+            "chat_history": get_chat_history(request)
         })
 
-        return ChatResponse(response=response.get('output', 'ขออภัยค่ะ พบข้อผิดพลาดบางอย่าง'))
+        answer = response.get('output', 'ขออภัยค่ะ พบข้อผิดพลาดบางอย่าง')
+        SESSION_STORE.append_turn(session_id, request.prompt, answer)
+        return ChatResponse(response=answer, session_id=session_id)
     except Exception as e:
-        return ChatResponse(response=f"An error occurred on the backend: {e}")
+        # Keep the session id, so the client goes on with the same conversation.
+        return ChatResponse(response=f"An error occurred on the backend: {e}", session_id=session_id)
     
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+class FinalAnswerFilter:
+    """
+    The ReAct model's output also carries its Thought/Action lines; this passes on
+    only the text after "Final Answer:", as the tokens arrive.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.emitted = None
+        self.started = False
+
+    def feed(self, token: str) -> str:
+        self.text += token
+        if self.emitted is None:
+            index = self.text.find(FINAL_ANSWER_MARKER)
+            if index < 0:
+                return ""
+            self.emitted = index + len(FINAL_ANSWER_MARKER)
+        new_text = self.text[self.emitted:]
+        self.emitted = len(self.text)
+        if not self.started:
+            new_text = new_text.lstrip()
+            self.started = bool(new_text)
+        return new_text
+
+def sse(event: str, data: str) -> str:
+    data = data.replace("\r\n", "\n").replace("\r", "\n")
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
+
+@app.post("/chat/stream")
+async def handle_chat_stream(request: ChatRequest):
+    """
+    Streams the agent's work as Server-Sent Events: first a 'session' event with the
+    session id (a new one if the request had none), a 'tool_start' event (JSON with
+    the tool and its input) whenever the agent calls a tool, 'token' events with the
+    final answer as the model writes it, a 'final' event with the whole answer,
+    then 'end' ('error' on failure).
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+
+    async def event_stream():
+        yield sse("session", session_id)
+        filters = {}
+        try:
+            async for event in agent_executor.astream_events({
+                "input": request.prompt,
+                "chat_history": get_chat_history(request)
+            }, version="v2"):
+                kind = event["event"]
+                if kind == "on_tool_start":
+                    tool_call = {"tool": event["name"], "input": event["data"].get("input")}
+                    yield sse("tool_start", json.dumps(tool_call, ensure_ascii=False, default=str))
+                elif kind == "on_chat_model_stream":
+                    answer_filter = filters.setdefault(event["run_id"], FinalAnswerFilter())
+                    token = answer_filter.feed(event["data"]["chunk"].content or "")
+                    if token:
+                        yield sse("token", token)
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    output = event["data"].get("output") or {}
+                    answer = output.get("output", "ขออภัยค่ะ พบข้อผิดพลาดบางอย่าง")
+                    SESSION_STORE.append_turn(session_id, request.prompt, answer)
+                    yield sse("final", answer)
+        except Exception as e:
+            yield sse("error", f"An error occurred on the backend: {e}")
+        yield sse("end", "[DONE]")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
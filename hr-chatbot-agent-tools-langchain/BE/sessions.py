@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import tiktoken
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Recent messages sent to the agent per turn, in tokens; older ones are folded into a rolling summary
+SESSION_HISTORY_TOKENS = int(os.environ.get("SESSION_HISTORY_TOKENS", "2000"))
+# A session idle for longer than this is dropped, and at most SESSION_MAX_SESSIONS are kept
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", "10000"))
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation between an employee and the company's HR assistant, "
+    "adding onto the previous summary and returning a new summary. Keep every detail the assistant "
+    "may need later: names, employee IDs, dates, destination countries, and the policies and answers "
+    "discussed. Write the summary in the language of the conversation.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New lines of conversation:\n{new_lines}\n\n"
+    "New summary:"
+)
+
+
+@lru_cache(maxsize=None)
+def get_encoding():
+    # gpt-4o's tokenizer, loaded (and downloaded on first use) when the first message is counted
+    return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(message: BaseMessage) -> int:
+    # 4 tokens of per-message overhead, as in OpenAI's chat format
+    return len(get_encoding().encode(str(message.content))) + 4
+
+
+class Session:
+    def __init__(self):
+        self.summary = ""
+        self.messages: list[BaseMessage] = []
+        self.tokens: list[int] = []
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.summarizing = False
+
+
+class SessionStore:
+    """
+    Conversations kept on the server, keyed by session id, so the client only sends
+    the new prompt.
+
+    Each session holds its most recent messages within a token budget plus a rolling
+    summary of everything older. When a turn pushes the session over the budget, the
+    oldest messages are folded into the summary by a small model in the background,
+    so the answer is not held up; the next turns carry a bit more history until it is done.
+    If the summary cannot be written, those messages are dropped instead, so a failing
+    summarizer never lets a session outgrow the budget.
+    Sessions idle for longer than ttl_seconds are dropped (least recently used first).
+    """
+
+    def __init__(self, summary_llm, history_tokens: int = SESSION_HISTORY_TOKENS,
+                 ttl_seconds: float = SESSION_TTL_SECONDS, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.summary_llm = summary_llm
+        self.history_tokens = history_tokens
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="session-summary")
+        self.stats = {"created": 0, "evicted": 0, "summaries": 0, "summary_failures": 0, "summarized_messages": 0,
+                      "trimmed_messages": 0}
+
+    def get(self, session_id: str) -> Session:
+        with self.lock:
+            now = time.monotonic()
+            while self.sessions:
+                oldest_id, oldest = next(iter(self.sessions.items()))
+                full = len(self.sessions) >= self.max_sessions and session_id not in self.sessions
+                if now - oldest.last_used <= self.ttl_seconds and not full:
+                    break
+                del self.sessions[oldest_id]
+                self.stats["evicted"] += 1
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = Session()
+                self.stats["created"] += 1
+            session.last_used = now
+            self.sessions.move_to_end(session_id)
+            return session
+
+    def history(self, session_id: str) -> list[BaseMessage]:
+        """The chat history for the agent: the summary of the older turns, then the recent messages."""
+        session = self.get(session_id)
+        with session.lock:
+            summary = [SystemMessage(content=f"Summary of the earlier conversation: {session.summary}")] \
+                if session.summary else []
+            return summary + list(session.messages)
+
+    def append_turn(self, session_id: str, prompt: str, answer: str):
+        session = self.get(session_id)
+        new_messages = [HumanMessage(content=prompt), AIMessage(content=answer)]
+        with session.lock:
+            session.messages.extend(new_messages)
+            session.tokens.extend(count_tokens(message) for message in new_messages)
+            if sum(session.tokens) > self.history_tokens and not session.summarizing:
+                session.summarizing = True
+                self.executor.submit(self.summarize, session)
+
+    def summarize(self, session: Session):
+        with session.lock:
+            # Fold the oldest turns (prompt and answer) until the rest fit the budget, keeping at least the last turn.
+            fold, remaining = 0, sum(session.tokens)
+            while remaining > self.history_tokens and fold + 2 < len(session.messages):
+                remaining -= session.tokens[fold] + session.tokens[fold + 1]
+                fold += 2
+            folded = session.messages[:fold]
+            summary = session.summary
+        try:
+            if folded:
+                new_lines = "\n".join(
+                    f"{'Employee' if message.type == 'human' else 'HR assistant'}: {message.content}"
+                    for message in folded
+                )
+                summary = self.summary_llm.invoke(
+                    SUMMARY_PROMPT.format(summary=summary or "(none)", new_lines=new_lines)
+                ).content.strip()
+            with self.lock:
+                self.stats["summaries"] += 1
+                self.stats["summarized_messages"] += fold
+        except Exception as e:
+            print(f"Session summary failed; dropping {fold} old message(s) instead: {e}")
+            # The previous summary stays; these turns are lost rather than the token budget.
+            with self.lock:
+                self.stats["summary_failures"] += 1
+                self.stats["trimmed_messages"] += fold
+        finally:
+            with session.lock:
+                # Turns appended meanwhile went to the end, so the folded messages are still the first ones.
+                session.summary = summary
+                del session.messages[:fold]
+                del session.tokens[:fold]
+                # Turns appended while this summary was written may have pushed the session over again.
+                if fold and sum(session.tokens) > self.history_tokens:
+                    self.executor.submit(self.summarize, session)
+                else:
+                    session.summarizing = False
+
+    def delete(self, session_id: str):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {**self.stats, "active_sessions": len(self.sessions), "history_tokens": self.history_tokens}
+
+
+SESSION_STORE = SessionStore(
+    ChatOpenAI(temperature=0, model_name="gpt-4o-mini", openai_api_key=os.environ.get("API_KEY"))
+)
@@ -0,0 +1,26 @@
+# tests/conftest.py
+# Run from the BE directory: python -m pytest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# No test calls the API or Zilliz; the policy tools load an empty local index instead.
+os.environ.setdefault("API_KEY", "sk-test")
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("LOCAL_INDEX_DIR", tempfile.mkdtemp())
+
+import numpy as np
+from langchain import hub
+from langchain_core.prompts import PromptTemplate
+
+import local_index
+
+for collection_name in ("leave_policy", "salary_policy", "resign_policy"):
+    local_index.build_index(os.environ["LOCAL_INDEX_DIR"], collection_name,
+                            [{"title": "", "page_number": 0, "page_content": ""}], np.ones((1, 4)))
+
+# main pulls hwchase17/react-chat from the LangChain hub at import; tests run offline.
+hub.pull = lambda owner_repo_commit, **kwargs: PromptTemplate.from_template(
+    "{tools}\n{tool_names}\n{chat_history}\n{input}\n{agent_scratchpad}"
+)
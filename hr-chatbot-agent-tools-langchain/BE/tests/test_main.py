@@ -0,0 +1,66 @@
+# tests/test_main.py
+from fastapi.testclient import TestClient
+
+import main
+import sessions
+
+
+class FakeAgent:
+    def __init__(self, answer):
+        self.answer = answer
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs)
+        return {"output": self.answer}
+
+    async def astream_events(self, inputs, version):
+        self.inputs.append(inputs)
+        yield {"event": "on_chain_end", "parent_ids": [], "data": {"output": {"output": self.answer}}}
+
+
+def read_events(body):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = frame.split("\n")
+        events.append((lines[0][len("event: "):], "\n".join(line[len("data: "):] for line in lines[1:])))
+    return events
+
+
+def test_stream_starts_a_session_and_sends_its_id_first(monkeypatch):
+    agent = FakeAgent("ลาพักร้อนได้ 10 วันค่ะ")
+    monkeypatch.setattr(main, "agent_executor", agent)
+    monkeypatch.setattr(sessions, "count_tokens", lambda message: len(str(message.content)))
+    client = TestClient(main.app)
+
+    first = read_events(client.post("/chat/stream", json={"prompt": "How many days of leave?"}).text)
+    event, session_id = first[0]
+    assert event == "session" and session_id
+    assert ("final", "ลาพักร้อนได้ 10 วันค่ะ") in first
+
+    second = read_events(client.post("/chat/stream", json={"prompt": "And sick leave?", "session_id": session_id}).text)
+    assert second[0] == ("session", session_id)
+    assert [message.content for message in agent.inputs[-1]["chat_history"]] == [
+        "How many days of leave?", "ลาพักร้อนได้ 10 วันค่ะ"
+    ]
+
+
+def test_streams_without_a_session_id_get_separate_sessions(monkeypatch):
+    monkeypatch.setattr(main, "agent_executor", FakeAgent("Hello"))
+    monkeypatch.setattr(sessions, "count_tokens", lambda message: len(str(message.content)))
+    client = TestClient(main.app)
+
+    ids = {read_events(client.post("/chat/stream", json={"prompt": "Hi"}).text)[0][1] for _ in range(2)}
+
+    assert len(ids) == 2
+
+
+def test_chat_echoes_the_session_id(monkeypatch):
+    monkeypatch.setattr(main, "agent_executor", FakeAgent("Hello"))
+    monkeypatch.setattr(sessions, "count_tokens", lambda message: len(str(message.content)))
+    client = TestClient(main.app)
+
+    created = client.post("/chat", json={"prompt": "Hi"}).json()["session_id"]
+    echoed = client.post("/chat", json={"prompt": "Hi again", "session_id": created}).json()["session_id"]
+
+    assert created and echoed == created
@@ -0,0 +1,25 @@
+# tests/test_sessions.py
+import sessions
+from sessions import SessionStore
+
+
+class FailingSummarizer:
+    def invoke(self, prompt):
+        raise TimeoutError("summary model timed out")
+
+
+def test_a_failed_summary_still_trims_the_session_to_the_budget(monkeypatch):
+    monkeypatch.setattr(sessions, "count_tokens", lambda message: 10)
+    store = SessionStore(FailingSummarizer(), history_tokens=25)
+    store.append_turn("s1", "How many days of leave?", "10 days.")
+    session = store.get("s1")
+    session.summary = "Asked about the probation period."
+
+    store.append_turn("s1", "And sick leave?", "30 days.")
+    store.executor.shutdown(wait=True)
+
+    assert [message.content for message in session.messages] == ["And sick leave?", "30 days."]
+    assert sum(session.tokens) <= store.history_tokens
+    assert session.summary == "Asked about the probation period."
+    assert not session.summarizing
+    assert store.stats["summary_failures"] == 1 and store.stats["trimmed_messages"] == 2
@@ -1,179 +1,156 @@
 import os
 import openai
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain.agents import tool
 from langchain_core.documents import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Zilliz
 from pydantic import BaseModel, Field
 
+from embedding_service import EMBEDDING_SERVICE, CachedEmbeddings
+from local_index import LocalVectorIndex
+
 load_dotenv()
 
 ZILLIZ_URI = os.environ.get("ZILLIZ_URI")
 ZILLIZ_TOKEN = os.environ.get("ZILLIZ_TOKEN")
 OPENAI_API_KEY = os.environ.get("API_KEY")
 CLIENT = openai.OpenAI(api_key=OPENAI_API_KEY)
-EMBEDDING_MODEL = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
-
-LEAVE_POLICY_VECTOR_STORE = Zilliz(
-    embedding_function=EMBEDDING_MODEL,
-    connection_args={"uri": ZILLIZ_URI, "token": ZILLIZ_TOKEN},
-    collection_name='leave_policy',
-    text_field="page_content"
-)
-
-SALARY_POLICY_VECTOR_STORE = Zilliz(
-    embedding_function=EMBEDDING_MODEL,
-    connection_args={"uri": ZILLIZ_URI, "token": ZILLIZ_TOKEN},
-    collection_name='salary_policy',
-    text_field="page_content"
-)
-
-RESIGN_POLICY_VECTOR_STORE = Zilliz(
-    embedding_function=EMBEDDING_MODEL,
-    connection_args={"uri": ZILLIZ_URI, "token": ZILLIZ_TOKEN},
-    collection_name='resign_policy',
-    text_field="page_content"
-)
-
-LEAVE_POLICY_RETRIEVER = LEAVE_POLICY_VECTOR_STORE.as_retriever(search_kwargs={"k": 5})
-SALARY_POLICY_RETRIEVER = SALARY_POLICY_VECTOR_STORE.as_retriever(search_kwargs={"k": 5})
-RESIGN_POLICY_RETRIEVER = RESIGN_POLICY_VECTOR_STORE.as_retriever(search_kwargs={"k": 5})
-
-class PolicyQuestionInput(BaseModel):
-    question: str = Field(description="The user's question about a specific HR policy.")
-
-@tool(args_schema=PolicyQuestionInput)
-def answer_leave_question(question: str) -> str:
+# Shared with every other retriever in the process: one model, cached query embeddings
+EMBEDDING_MODEL = CachedEmbeddings(EMBEDDING_SERVICE)
+
+# "zilliz" searches Zilliz Cloud; "local" searches the indexes EMBEDDING/embedding.py --backend local
+# wrote to LOCAL_INDEX_DIR, in-process ("exact" search, or "hnsw" for larger corpora)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "zilliz")
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", "./index")
+LOCAL_INDEX_TYPE = os.environ.get("LOCAL_INDEX_TYPE", "exact")
+
+# Policy name -> collection built by EMBEDDING/embedding.py
+POLICY_COLLECTIONS = {
+    "leave": "leave_policy",
+    "salary": "salary_policy",
+    "resignation": "resign_policy",
+}
+
+# Chunks searched per policy, and chunks kept across all policies for the answer
+TOP_K_PER_POLICY = 5
+TOP_K = 8
+
+
+class LocalPolicyStore:
+    """A local index with the search method PolicyQAEngine uses on the Zilliz stores."""
+
+    def __init__(self, index: LocalVectorIndex):
+        self.index = index
+
+    def similarity_search_with_score_by_vector(self, embedding: list[float], k: int = 4) -> list[tuple[Document, float]]:
+        return [
+            (Document(page_content=record["page_content"],
+                      metadata={"title": record["title"], "page_number": record["page_number"]}), distance)
+            for record, distance in self.index.search(embedding, k)[0]
+        ]
+
+
+def load_vector_store(collection_name: str):
+    if VECTOR_BACKEND == "local":
+        return LocalPolicyStore(LocalVectorIndex.load(LOCAL_INDEX_DIR, collection_name, LOCAL_INDEX_TYPE))
+    if VECTOR_BACKEND == "zilliz":
+        return Zilliz(
+            embedding_function=EMBEDDING_MODEL,
+            connection_args={"uri": ZILLIZ_URI, "token": ZILLIZ_TOKEN},
+            collection_name=collection_name,
+            text_field="page_content"
+        )
+    raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'. Expected 'zilliz' or 'local'.")
+
+
+class PolicyQAEngine:
     """
-    Answers an HR leave policy question. Use for any questions about
-    vacation, sick leave, holidays, etc.
+    Answers HR policy questions from all the policy collections at once: the question
+    is embedded once, every collection is searched in parallel with that vector, and
+    the best chunks across policies go into a single LLM call.
     """
-    print(f"\n---> [Tool Called] Searching for answer to: '{question}'")
-    
-    retrieved_docs: list[Document] = LEAVE_POLICY_RETRIEVER.invoke(question)
-    
-    knowledge = "\n\n---\n\n".join([doc.page_content for doc in retrieved_docs])
-    
-    print(f"---> [Context Retrieved] Found {len(retrieved_docs)} relevant document(s).")
-
-    system_prompt = (
-        "You are a professional HR assistant. Your role is to answer employee questions "
-        "about the company's leave policy. "
-        "Base your answer strictly on the context provided below. "
-        "If the answer is not found in the provided context, clearly state that "
-        "the information is not available in the policy documents and advise the user "
-        "to contact the HR department directly."
-    )
-
-    user_content = (
-        f"--- CONTEXT ---\n"
-        f"{knowledge}\n"
-        f"--- END CONTEXT ---\n\n"
-        f"Question: {question}\n"
-        f"Answer:"
-    )
-
-    print("---> [LLM] Sending request to generate final answer...")
-    response = CLIENT.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content}
-        ],
-        temperature=0.2,
-    )
-    
-    answer = response.choices[0].message.content
-    return answer.strip()
 
+    def __init__(self, collections: dict, top_k_per_policy: int = TOP_K_PER_POLICY, top_k: int = TOP_K):
+        self.vector_stores = {
+            policy: load_vector_store(collection_name) for policy, collection_name in collections.items()
+        }
+        self.top_k_per_policy = top_k_per_policy
+        self.top_k = top_k
+        self.executor = ThreadPoolExecutor(max_workers=len(collections), thread_name_prefix="policy-search")
+
+    def search(self, question: str) -> list[tuple[str, Document, float]]:
+        """(policy, chunk, distance) of the chunks closest to the question across all policies, closest first."""
+        question_vector = EMBEDDING_MODEL.embed_query(question)
+
+        def search_policy(policy: str) -> list[tuple[str, Document, float]]:
+            results = self.vector_stores[policy].similarity_search_with_score_by_vector(
+                question_vector, k=self.top_k_per_policy
+            )
+            return [(policy, doc, score) for doc, score in results]
+
+        hits = [hit for policy_hits in self.executor.map(search_policy, self.vector_stores) for hit in policy_hits]
+        # Both backends report squared L2 distances: a smaller distance is a closer match.
+        hits.sort(key=lambda hit: hit[2])
+        return hits[:self.top_k]
+
+    def answer(self, question: str) -> str:
+        print(f"\n---> [Tool Called] Searching all policies for answer to: '{question}'")
+
+        hits = self.search(question)
+
+        knowledge = "\n\n---\n\n".join(
+            f"[{policy} policy]\n{doc.page_content}" for policy, doc, _ in hits
+        )
+
+        print(f"---> [Context Retrieved] Found {len(hits)} relevant document(s) "
+              f"from {sorted({policy for policy, _, _ in hits})}.")
+
+        system_prompt = (
+            "You are a professional HR assistant. Your role is to answer employee questions "
+            "about the company's HR policies (leave, salary and resignation). "
+            "Each context excerpt is labelled with the policy it comes from; a question may "
+            "involve more than one policy. "
+            "Base your answer strictly on the context provided below. "
+            "If the answer is not found in the provided context, clearly state that "
+            "the information is not available in the policy documents and advise the user "
+            "to contact the HR department directly."
+        )
+
+        user_content = (
+            f"--- CONTEXT ---\n"
+            f"{knowledge}\n"
+            f"--- END CONTEXT ---\n\n"
+            f"Question: {question}\n"
+            f"Answer:"
+        )
+
+        print("---> [LLM] Sending request to generate final answer...")
+        response = CLIENT.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            temperature=0.2,
+        )
+
+        answer = response.choices[0].message.content
+        return answer.strip()
+
+
+POLICY_QA_ENGINE = PolicyQAEngine(POLICY_COLLECTIONS)
 
-@tool(args_schema=PolicyQuestionInput)
-def answer_salary_question(question: str) -> str:
-    """
-    Answers an HR salary policy question. Use for any questions about
-    compensation, payroll, bonuses, pay grades, etc.
-    """
-    print(f"\n---> [Tool Called] Searching for answer to: '{question}'")
-    
-    retrieved_docs: list[Document] = SALARY_POLICY_RETRIEVER.invoke(question)
-    
-    knowledge = "\n\n---\n\n".join([doc.page_content for doc in retrieved_docs])
-    
-    print(f"---> [Context Retrieved] Found {len(retrieved_docs)} relevant document(s).")
-
-    system_prompt = (
-        "You are a professional HR assistant. Your role is to answer employee questions "
-        "about the company's salary policy. "
-        "Base your answer strictly on the context provided below. "
-        "If the answer is not found in the provided context, clearly state that "
-        "the information is not available in the policy documents and advise the user "
-        "to contact the HR department directly."
-    )
-
-    user_content = (
-        f"--- CONTEXT ---\n"
-        f"{knowledge}\n"
-        f"--- END CONTEXT ---\n\n"
-        f"Question: {question}\n"
-        f"Answer:"
-    )
-
-    print("---> [LLM] Sending request to generate final answer...")
-    response = CLIENT.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content}
-        ],
-        temperature=0.2,
-    )
-    
-    answer = response.choices[0].message.content
-    return answer.strip()
-
+class PolicyQuestionInput(BaseModel):
+    question: str = Field(description="The user's full question about the company's HR policies.")
 
 @tool(args_schema=PolicyQuestionInput)
-def answer_resignation_question(question: str) -> str:
+def answer_policy_question(question: str) -> str:
     """
-
-    Answers an HR resignation policy question. Use for any questions about
-    notice periods, final pay, exit procedures, returning company property, etc.
+    Answers HR policy questions about leave (vacation, sick leave, holidays),
+    salary (compensation, payroll, bonuses, pay grades) and resignation (notice
+    periods, final pay, exit procedures, returning company property).
+    Searches all of these policies at once, so pass the whole question in a
+    single call, even when it involves more than one policy.
     """
-    print(f"\n---> [Tool Called] Searching for answer to: '{question}'")
-    
-    retrieved_docs: list[Document] = RESIGN_POLICY_RETRIEVER.invoke(question)
-    
-    knowledge = "\n\n---\n\n".join([doc.page_content for doc in retrieved_docs])
-    
-    print(f"---> [Context Retrieved] Found {len(retrieved_docs)} relevant document(s).")
-
-    system_prompt = (
-        "You are a professional HR assistant. Your role is to answer employee questions "
-        "about the company's resignation policy. "
-        "Base your answer strictly on the context provided below. "
-        "If the answer is not found in the provided context, clearly state that "
-        "the information is not available in the policy documents and advise the user "
-        "to contact the HR department directly."
-    )
-
-    user_content = (
-        f"--- CONTEXT ---\n"
-        f"{knowledge}\n"
-        f"--- END CONTEXT ---\n\n"
-        f"Question: {question}\n"
-        f"Answer:"
-    )
-
-    print("---> [LLM] Sending request to generate final answer...")
-    response = CLIENT.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content}
-        ],
-        temperature=0.2,
-    )
-    
-    answer = response.choices[0].message.content
-    return answer.strip()
\ No newline at end of file
+    return POLICY_QA_ENGINE.answer(question)
@@ -1,35 +1,45 @@
 import warnings
 warnings.filterwarnings("ignore")
 import os
-import json
+import argparse
 from dotenv import load_dotenv
 from functions import pdf_to_df, chunk_df, embedding_and_to_list, setup_milvus_collection, \
-insert_data_to_milvus, setup_milvus_collection, insert_data_to_milvus
+insert_data_to_milvus
+from local_index import build_index
 
 load_dotenv()
 ZILLIZ_URI = os.environ.get("ZILLIZ_URI")
 ZILLIZ_TOKEN = os.environ.get("ZILLIZ_TOKEN")
 
-leave_file_path = 'db/leave_policy.pdf'
-resign_file_path = 'db/resignment.pdf'
-salary_file_path = 'db/salary_policy.pdf'
+# (pdf path, title, collection)
+POLICY_DOCUMENTS = [
+    ('db/leave_policy.pdf', 'leave policy', 'leave_policy'),
+    ('db/resignment.pdf', 'resign policy', 'resign_policy'),
+    ('db/salary_policy.pdf', 'salary policy', 'salary_policy'),
+]
 
-leave_pdf = pdf_to_df(leave_file_path, 'leave policy')
-resign_pdf = pdf_to_df(resign_file_path, 'resign policy')
-salary_pdf = pdf_to_df(salary_file_path, 'salary policy')
+parser = argparse.ArgumentParser(description="Chunk and embed the policy PDFs into Zilliz collections or local indexes.")
+parser.add_argument("--backend", choices=["zilliz", "local"], default=os.environ.get("VECTOR_BACKEND", "zilliz"))
+parser.add_argument("--index-dir", default=os.environ.get("LOCAL_INDEX_DIR", "../BE/index"),
+                    help="Where local indexes are written (--backend local).")
+parser.add_argument("--hnsw", action="store_true", help="Also build an HNSW graph (needs hnswlib).")
+parser.add_argument("--document", nargs=3, action="append", metavar=("PDF", "TITLE", "COLLECTION"),
+                    help="Index these PDFs instead of the three policy documents, e.g. the RAG backend's "
+                         "hr_policy collection.")
+args = parser.parse_args()
 
-leave_pdf_chunked = chunk_df(leave_pdf)
-resign_pdf_chunked = chunk_df(resign_pdf)
-salary_pdf_chunked = chunk_df(salary_pdf)
+for pdf_path, title, collection_name in args.document or POLICY_DOCUMENTS:
+    pdf_chunked = chunk_df(pdf_to_df(pdf_path, title))
+    data = embedding_and_to_list(pdf_chunked)
 
-leave_data = embedding_and_to_list(leave_pdf_chunked)
-resign_data = embedding_and_to_list(resign_pdf_chunked)
-salary_data = embedding_and_to_list(salary_pdf_chunked)
-
-leave_collection = setup_milvus_collection(ZILLIZ_URI, ZILLIZ_TOKEN, 'leave_policy')
-resign_collection = setup_milvus_collection(ZILLIZ_URI, ZILLIZ_TOKEN, 'resign_policy')
-salary_collection = setup_milvus_collection(ZILLIZ_URI, ZILLIZ_TOKEN, 'salary_policy')
-
-insert_data_to_milvus(leave_collection, leave_data)
-insert_data_to_milvus(resign_collection, resign_data)
-insert_data_to_milvus(salary_collection, salary_data)
\ No newline at end of file
+    if args.backend == "local":
+        title_list, page_number_list, page_content_list, vector_list = data
+        records = [
+            {'title': t, 'page_number': int(p), 'page_content': c}
+            for t, p, c in zip(title_list, page_number_list, page_content_list)
+        ]
+        path = build_index(args.index_dir, collection_name, records, vector_list, hnsw=args.hnsw)
+        print(f"{collection_name}: {len(records)} chunks -> {path}")
+    else:
+        collection = setup_milvus_collection(ZILLIZ_URI, ZILLIZ_TOKEN, collection_name)
+        insert_data_to_milvus(collection, data)
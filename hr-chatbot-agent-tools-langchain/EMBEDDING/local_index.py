@@ -0,0 +1,105 @@
+"""
+Local vector index for the HR policy chunks, searched in-process instead of on
+Zilliz Cloud. The policy PDFs make a few hundred chunks, which an exact search
+over a memory-mapped matrix answers in microseconds; an HNSW graph (hnswlib,
+pip install hnswlib) is available for larger corpora.
+
+An index is a directory holding
+    vectors.npy    float32 matrix of L2-normalized embeddings, one row per chunk
+    records.jsonl  the chunk of each row (title, page_number, page_content)
+    hnsw.bin       the HNSW graph, when built with hnsw=True
+
+Distances are squared L2 between normalized vectors (2 - 2 * cosine similarity),
+the measure Milvus reports for an L2 index, so a smaller distance is a closer match.
+
+EMBEDDING/ builds indexes and each backend loads them. This file is the only copy:
+BE/local_index.py here and in hr-chatbot-rag-langchain are symlinks to it.
+"""
+import json
+import os
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.jsonl"
+HNSW_FILE = "hnsw.bin"
+INDEX_TYPES = ("exact", "hnsw")
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_index(index_dir: str, name: str, records: list[dict], vectors, hnsw: bool = False,
+                ef_construction: int = 200, m: int = 16) -> str:
+    """Writes the index `name` under `index_dir` and returns its directory."""
+    vectors = normalize(vectors)
+    if len(records) != len(vectors):
+        raise ValueError(f"{len(records)} records but {len(vectors)} vectors.")
+    path = os.path.join(index_dir, name)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, VECTORS_FILE), vectors)
+    with open(os.path.join(path, RECORDS_FILE), "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    hnsw_path = os.path.join(path, HNSW_FILE)
+    if hnsw:
+        import hnswlib
+        graph = hnswlib.Index(space="l2", dim=vectors.shape[1])
+        graph.init_index(max_elements=len(vectors), ef_construction=ef_construction, M=m)
+        graph.add_items(vectors, np.arange(len(vectors)))
+        graph.save_index(hnsw_path)
+    elif os.path.exists(hnsw_path):
+        os.remove(hnsw_path)  # built for the previous vectors
+    return path
+
+
+class LocalVectorIndex:
+    def __init__(self, vectors: np.ndarray, records: list[dict], hnsw_graph=None):
+        self.vectors = vectors
+        self.records = records
+        self.hnsw_graph = hnsw_graph
+
+    @classmethod
+    def load(cls, index_dir: str, name: str, index_type: str = "exact") -> "LocalVectorIndex":
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown local index type '{index_type}'. Expected 'exact' or 'hnsw'.")
+        path = os.path.join(index_dir, name)
+        # Memory-mapped: the pages are shared by every worker process and read on first use.
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, RECORDS_FILE), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+        hnsw_graph = None
+        if index_type == "hnsw":
+            import hnswlib
+            hnsw_graph = hnswlib.Index(space="l2", dim=vectors.shape[1])
+            hnsw_graph.load_index(os.path.join(path, HNSW_FILE), max_elements=len(vectors))
+        return cls(vectors, records, hnsw_graph)
+
+    def search(self, query_vectors, k: int) -> list[list[tuple[dict, float]]]:
+        """The k closest records to each query vector (one vector or a batch), closest first, with their distances."""
+        queries = normalize(np.atleast_2d(query_vectors))
+        k = min(k, len(self.records))
+        if k == 0:
+            return [[] for _ in queries]
+
+        if self.hnsw_graph is not None:
+            self.hnsw_graph.set_ef(max(k, 64))
+            labels, distances = self.hnsw_graph.knn_query(queries, k=k)
+        else:
+            # One matrix product scores every chunk against every query of the batch.
+            all_distances = 2 - 2 * (queries @ self.vectors.T)
+            labels = np.argpartition(all_distances, k - 1, axis=1)[:, :k]
+            distances = np.take_along_axis(all_distances, labels, axis=1)
+            order = np.argsort(distances, axis=1)
+            labels = np.take_along_axis(labels, order, axis=1)
+            distances = np.take_along_axis(distances, order, axis=1)
+
+        return [
+            [(self.records[label], float(distance)) for label, distance in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]
@@ -11,6 +11,24 @@ st.title("HR Policy Chatbot 🤖")
 st.caption("This chatbot can answer questions about company.")
 
 BACKEND_URL = "http://localhost:8000/chat"
+STREAM_URL = f"{BACKEND_URL}/stream"
+
+def read_events(response):
+    event, data = "message", []
+    for raw in response.iter_lines(chunk_size=None):
+        line = raw.decode("utf-8")
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].removeprefix(" "))
+        elif not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+
+# The backend keeps the conversation under the id it sends back, so each request carries only the new prompt
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
 
 if "messages" not in st.session_state:
     st.session_state.messages = [
@@ -29,21 +47,40 @@ if prompt := st.chat_input("Ask a question about leave, salary, or company info.
 
     api_payload = {
         "prompt": prompt,
-        "chat_history": st.session_state.messages[:-1]
+        "session_id": st.session_state.session_id
     }
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(BACKEND_URL, json=api_payload)
-                response.raise_for_status() 
-
-                assistant_response_data = response.json()
-                assistant_response = assistant_response_data.get("response", "Sorry, something went wrong.")
+        # Tool calls show up in the status box while the answer streams in below it
+        status = st.status("Thinking...")
+        message_placeholder = st.empty()
+        assistant_response = ""
+        try:
+            with requests.post(STREAM_URL, json=api_payload, stream=True) as response:
+                response.raise_for_status()
+                for event, data in read_events(response):
+                    if event == "session":
+                        st.session_state.session_id = data
+                    elif event == "tool_start":
+                        tool_call = json.loads(data)
+                        status.update(label=f"Using {tool_call['tool']}...")
+                        status.write(f"🔧 {tool_call['tool']}: {tool_call['input']}")
+                    elif event == "token":
+                        assistant_response += data
+                        message_placeholder.markdown(assistant_response + "▌")
+                    elif event == "final":
+                        # The whole answer, in case the model did not stream it in the usual format
+                        assistant_response = data
+                    elif event == "error":
+                        assistant_response += f"\n\n**Error:** {data}"
+                    elif event == "end":
+                        break
+            status.update(label="Done", state="complete", expanded=False)
 
-            except requests.exceptions.RequestException as e:
-                assistant_response = f"Could not connect to the backend: {e}"
+        except requests.exceptions.RequestException as e:
+            assistant_response = f"Could not connect to the backend: {e}"
+            status.update(label="Error", state="error", expanded=False)
 
-        st.markdown(assistant_response)
+        message_placeholder.markdown(assistant_response)
         assistant_message = {"role": "assistant", "content": assistant_response}
         st.session_state.messages.append(assistant_message)
\ No newline at end of file
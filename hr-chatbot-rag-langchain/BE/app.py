@@ -4,31 +4,64 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from pydantic import BaseModel
-from typing import Dict
+from typing import Any, Dict, List
 
 # Import necessary LangChain and vector store packages
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Zilliz
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from langchain_openai import ChatOpenAI
 from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
 
+from local_index import LocalVectorIndex
+
 # --- 1. Load Environment Variables and Initialize Constants ---
 load_dotenv()
 ZILLIZ_URI = os.environ.get("ZILLIZ_URI")
 ZILLIZ_TOKEN = os.environ.get("ZILLIZ_TOKEN")
 API_KEY = os.environ.get("API_KEY")
+# "zilliz" searches Zilliz Cloud; "local" searches an index built by
+# hr-chatbot-agent-tools-langchain/EMBEDDING/embedding.py --backend local --index-dir <this BE>/index
+#     --document <path to>/thai_leave_policy.pdf "leave policy" hr_policy
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "zilliz")
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", "./index")
+LOCAL_INDEX_TYPE = os.environ.get("LOCAL_INDEX_TYPE", "exact")
 
 # --- 2. Initialize Models and Vector Store ---
 EMBEDDING_MODEL = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
 LLM = ChatOpenAI(temperature=0.7, openai_api_key=API_KEY, model_name="gpt-3.5-turbo")
-vector_store = Zilliz(
-    embedding_function=EMBEDDING_MODEL,
-    connection_args={"uri": ZILLIZ_URI, "token": ZILLIZ_TOKEN},
-    collection_name='hr_policy',
-    text_field="page_content"  # <-- ADD THIS LINE
-)
-RETRIEVER = vector_store.as_retriever()
+
+class LocalIndexRetriever(BaseRetriever):
+    """Retrieves the closest chunks from a local index, in-process."""
+    index: Any
+    embeddings: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        hits = self.index.search(self.embeddings.embed_query(query), self.k)[0]
+        return [
+            Document(page_content=record["page_content"],
+                     metadata={"title": record["title"], "page_number": record["page_number"]})
+            for record, _ in hits
+        ]
+
+if VECTOR_BACKEND == "local":
+    RETRIEVER = LocalIndexRetriever(
+        index=LocalVectorIndex.load(LOCAL_INDEX_DIR, 'hr_policy', LOCAL_INDEX_TYPE),
+        embeddings=EMBEDDING_MODEL
+    )
+elif VECTOR_BACKEND == "zilliz":
+    vector_store = Zilliz(
+        embedding_function=EMBEDDING_MODEL,
+        connection_args={"uri": ZILLIZ_URI, "token": ZILLIZ_TOKEN},
+        collection_name='hr_policy',
+        text_field="page_content"  # <-- ADD THIS LINE
+    )
+    RETRIEVER = vector_store.as_retriever()
+else:
+    raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'. Expected 'zilliz' or 'local'.")
 
 # --- 3. Session Management ---
 session_memory_store: Dict[str, ConversationBufferMemory] = {}
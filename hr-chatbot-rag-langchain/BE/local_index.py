@@ -0,0 +1 @@
+../../hr-chatbot-agent-tools-langchain/EMBEDDING/local_index.py
\ No newline at end of file
@@ -6,6 +6,7 @@ import uuid
 
 # --- Configuration ---
 BACKEND_URL = "http://127.0.0.1:8000"  # URL of your FastAPI backend
+TENANT_ID = "dogbrain666"  # Brand whose catalog the backend answers from (catalogs/{TENANT_ID}.json)
 
 st.title("DOGBRAIN666 Product Support 🐾")
 st.caption("Your friendly neighborhood chatbot (with a separate backend!)")
@@ -18,17 +19,45 @@ if "thread_id" not in st.session_state:
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# Cursor of the page before the oldest loaded message (None: the whole thread is loaded)
+if "older_cursor" not in st.session_state:
+    st.session_state.older_cursor = None
 
 # --- Helper Functions ---
-def get_chat_history():
-    """Fetches chat history from the backend."""
+def stream_events(response):
+    """Yields the (event, data) pairs of a streamed /stream response as they arrive."""
+    event, data = "message", []
+    for raw in response.iter_lines(chunk_size=None):
+        field, _, value = raw.decode("utf-8").partition(":")
+        if field == "event":
+            event = value.strip()
+        elif field == "data":
+            data.append(value.removeprefix(" "))
+        elif not raw:
+            # A blank line ends the event
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+
+def get_chat_history(before: str = None):
+    """Fetches the newest page of chat history from the backend, or the page before the `before` cursor."""
     try:
-        response = requests.get(f"{BACKEND_URL}/history/{st.session_state.thread_id}")
+        response = requests.get(
+            f"{BACKEND_URL}/history/{st.session_state.thread_id}",
+            params={"tenant_id": TENANT_ID, **({"before": before} if before else {})},
+        )
+        if response.status_code == 404:
+            # Nothing saved for this thread yet
+            st.session_state.messages, st.session_state.older_cursor = [], None
+            return
         response.raise_for_status()
-        messages = response.json()
-        # Convert message dicts to AIMessage/HumanMessage objects if needed,
-        # but for display, dicts are fine.
-        st.session_state.messages = messages
+        page = response.json()
+        # Compact messages ({"id", "type", "content"}) are all the chat display needs.
+        if before and not page["reset"]:
+            st.session_state.messages = page["messages"] + st.session_state.messages
+        else:
+            st.session_state.messages = page["messages"]
+        st.session_state.older_cursor = page["older_cursor"]
     except requests.exceptions.RequestException as e:
         # Handle cases where the backend is not running
         st.error(f"Could not connect to the backend: {e}")
@@ -46,23 +75,31 @@ def send_message(message: str):
     with st.chat_message("user"):
         st.markdown(message)
         
-    # Send message to backend and get response
+    # Send message to backend and stream the response as it is generated
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(
-                    f"{BACKEND_URL}/invoke",
-                    json={"message": message, "thread_id": st.session_state.thread_id}
-                )
+        message_placeholder = st.empty()
+        bot_response = ""
+        try:
+            with requests.post(
+                f"{BACKEND_URL}/stream",
+                json={"message": message, "thread_id": st.session_state.thread_id, "tenant_id": TENANT_ID},
+                stream=True,
+            ) as response:
                 response.raise_for_status()
-                bot_response = response.json()["response"]
-                st.markdown(bot_response)
-                # Add assistant response to session state
-                st.session_state.messages.append({"type": "ai", "content": bot_response})
-            except requests.exceptions.RequestException as e:
-                error_message = f"Error communicating with the backend: {e}"
-                st.error(error_message)
-                st.session_state.messages.append({"type": "ai", "content": error_message})
+                for event, data in stream_events(response):
+                    if event == "token":
+                        bot_response += data
+                        message_placeholder.markdown(bot_response + "▌")
+                    elif event == "error":
+                        bot_response += f"\n\n**Error:** {data}"
+                    elif event == "end":
+                        break
+            message_placeholder.markdown(bot_response)
+        except requests.exceptions.RequestException as e:
+            bot_response = f"Error communicating with the backend: {e}"
+            message_placeholder.error(bot_response)
+        # Add assistant response to session state
+        st.session_state.messages.append({"type": "ai", "content": bot_response})
 
 
 # --- Main App Logic ---
@@ -71,6 +108,10 @@ def send_message(message: str):
 if not st.session_state.messages:
     get_chat_history()
 
+# Long threads are loaded a page at a time, newest first
+if st.session_state.older_cursor and st.button("Load earlier messages"):
+    get_chat_history(before=st.session_state.older_cursor)
+
 # Display chat messages from history
 for message in st.session_state.messages:
     role = "assistant" if message["type"] == "ai" else "user"
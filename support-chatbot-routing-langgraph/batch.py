@@ -0,0 +1,135 @@
+# batch.py
+
+"""
+Offline triage: runs exported support tickets through the classifier and
+answerer, many at a time, and writes one JSONL result per ticket as it finishes.
+
+Input lines are {"id": ..., "message": ...} (a ticket without an id gets its
+line number; ids must be unique). Output lines are
+{"id", "is_product", "response"}, or {"id", "error"} for a ticket that failed.
+Re-running with the same output file resumes: tickets that already have a
+result are skipped, failed ones are tried again.
+
+    python batch.py tickets.jsonl --output results.jsonl --concurrency 16 --tenant dogbrain666
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Iterable, List, Set
+
+from langchain_core.messages import HumanMessage
+
+from config import BATCH_CONCURRENCY, DEFAULT_TENANT
+from tenants import TenantGraphs
+
+# Graphs without a checkpointer: a ticket is a one-off question, not a conversation.
+batch_graphs = TenantGraphs(checkpointer=False)
+
+def parse_tickets(lines: Iterable[str]) -> List[dict]:
+    """
+    Tickets from JSONL lines; raises ValueError on a malformed line or a repeated id
+    (results and resumption are keyed by id, so a duplicate would be lost or skipped).
+    """
+    tickets = []
+    lines_by_id = {}
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            ticket = {"id": str(record.get("id", number)), "message": record["message"]}
+        except (json.JSONDecodeError, KeyError, AttributeError) as e:
+            raise ValueError(f"Line {number} is not a ticket ({{\"id\", \"message\"}}): {e}") from e
+        if ticket["id"] in lines_by_id:
+            raise ValueError(f"Line {number} repeats ticket id '{ticket['id']}' (first used on line {lines_by_id[ticket['id']]}).")
+        lines_by_id[ticket["id"]] = number
+        tickets.append(ticket)
+    return tickets
+
+async def run_batch(tickets: List[dict], concurrency: int = BATCH_CONCURRENCY,
+                    tenant_id: str = DEFAULT_TENANT) -> AsyncIterator[dict]:
+    """
+    Runs the tickets against `tenant_id`'s catalog. Yields each ticket's result as soon as it is finished (not in input order),
+    with at most `concurrency` tickets in flight. A failed ticket yields its
+    error instead of stopping the batch.
+    """
+    if not tickets:
+        return
+    graph = await batch_graphs.aget(tenant_id)
+    inputs = [{"messages": [HumanMessage(content=ticket["message"])]} for ticket in tickets]
+    async for index, output in graph.abatch_as_completed(
+        inputs, {"max_concurrency": concurrency}, return_exceptions=True
+    ):
+        ticket_id = tickets[index]["id"]
+        if isinstance(output, Exception):
+            yield {"id": ticket_id, "error": f"{type(output).__name__}: {output}"}
+        else:
+            yield {"id": ticket_id, "is_product": output["is_product"], "response": output["messages"][-1].content}
+
+# --- Resumption ---
+def completed_ids(path: str) -> Set[str]:
+    """Ids of the tickets with a result in the output file of an earlier run."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # the last line of a run that crashed mid-write
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+def ends_mid_line(path: str) -> bool:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+async def run_file(input_path: str, output_path: str, concurrency: int = BATCH_CONCURRENCY,
+                   resume: bool = True, tenant_id: str = DEFAULT_TENANT) -> dict:
+    """Runs the tickets of `input_path` that have no result in `output_path` yet, appending their results."""
+    with open(input_path, encoding="utf-8") as f:
+        tickets = parse_tickets(f)
+    done = completed_ids(output_path) if resume else set()
+    pending = [ticket for ticket in tickets if ticket["id"] not in done]
+    print(f"{len(tickets)} tickets, {len(tickets) - len(pending)} already done; "
+          f"running {len(pending)} with concurrency {concurrency}.")
+
+    summary = {"tickets": len(tickets), "skipped": len(tickets) - len(pending), "answered": 0, "failed": 0}
+    started = time.perf_counter()
+    # Each result is flushed as it is written, so a crash loses at most the tickets still in flight.
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        if resume and ends_mid_line(output_path):
+            out.write("\n")
+        async for result in run_batch(pending, concurrency, tenant_id):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            summary["failed" if "error" in result else "answered"] += 1
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 2)
+    summary["tickets_per_second"] = round(len(pending) / elapsed, 2) if pending and elapsed else None
+    return summary
+
+# --- CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Classify and answer a JSONL file of support tickets.")
+    parser.add_argument("input", help="JSONL file of {\"id\", \"message\"} tickets.")
+    parser.add_argument("--output", required=True, help="JSONL results file; appended to when resuming.")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Whose catalog answers the tickets.")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output file and run every ticket.")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_file(args.input, args.output, args.concurrency, resume=not args.no_resume,
+                                     tenant_id=args.tenant))
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/batch_throughput.py
+"""
+Tickets per second of batch triage (batch.py) at several concurrency settings,
+with a fake model that takes --latency seconds per call (two calls per ticket).
+
+Also checks resumption: a run whose output file was cut off mid-line (as if
+the process crashed) is re-run, and every ticket must end up with exactly one
+result. Then posts a small batch to POST /batch and checks the NDJSON reply.
+
+    python -m benchmarks.batch_throughput --tickets 64 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--tickets", type=int, default=64)
+parser.add_argument("--latency", type=float, default=0.1, help="Seconds per fake LLM call.")
+parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+args = parser.parse_args()
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["CHECKPOINTER"] = "memory"
+os.environ["TOPIC_LABEL_LOG_PATH"] = ""
+
+import graph
+from benchmarks.slow_llm import ANSWER, SlowFakeChatModel
+
+graph.llm = SlowFakeChatModel(latency=args.latency)
+
+import batch
+
+TICKETS = [{"id": f"T{i}", "message": f"Ticket {i}: how light is the Gamma Mouse?"} for i in range(args.tickets)]
+
+
+async def throughput(concurrency: int) -> float:
+    start = time.perf_counter()
+    results = [result async for result in batch.run_batch(TICKETS, concurrency)]
+    assert len(results) == len(TICKETS) and all(result["response"] == ANSWER for result in results)
+    return round(len(TICKETS) / (time.perf_counter() - start), 1)
+
+
+def check_resume(workdir: str) -> bool:
+    input_path, output_path = os.path.join(workdir, "tickets.jsonl"), os.path.join(workdir, "results.jsonl")
+    with open(input_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(ticket) + "\n" for ticket in TICKETS)
+    asyncio.run(batch.run_file(input_path, output_path, concurrency=16))
+    # Keep half the results and half of the next line, as a crash mid-write would.
+    with open(output_path, encoding="utf-8") as f:
+        lines = f.readlines()
+    half = len(lines) // 2
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.writelines(lines[:half])
+        f.write(lines[half][: len(lines[half]) // 2])
+    summary = asyncio.run(batch.run_file(input_path, output_path, concurrency=16))
+    ids = []
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                ids.append(json.loads(line)["id"])
+            except json.JSONDecodeError:
+                pass
+    return summary["skipped"] == half and sorted(ids) == sorted(ticket["id"] for ticket in TICKETS)
+
+
+def check_endpoint() -> bool:
+    from fastapi.testclient import TestClient
+    import main
+
+    body = "\n".join(json.dumps(ticket) for ticket in TICKETS[:8])
+    response = TestClient(main.app_fastapi).post("/batch", params={"concurrency": 8}, content=body)
+    results = [json.loads(line) for line in response.text.splitlines()]
+    return response.status_code == 200 and sorted(result["id"] for result in results) == sorted(
+        ticket["id"] for ticket in TICKETS[:8]
+    )
+
+
+if __name__ == "__main__":
+    report = {
+        "tickets": args.tickets,
+        "latency": args.latency,
+        "tickets_per_second": {str(c): asyncio.run(throughput(c)) for c in args.concurrency},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        report["resume_ok"] = check_resume(workdir)
+    report["endpoint_ok"] = check_endpoint()
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    sys.exit(0 if report["resume_ok"] and report["endpoint_ok"] else 1)
@@ -0,0 +1,129 @@
+# benchmarks/chain_overhead.py
+"""
+CPU time per support-bot turn spent outside the LLM call: prompt and chain
+construction, prompt formatting, output parsing and graph bookkeeping.
+
+The model is a zero-latency fake (classifier answers "True", then a canned
+answer), so everything measured is our own overhead. Compares nodes that build
+their prompt and chain on every call (as before) with the chains prebuilt by
+get_graph(), both as bare node calls and as full graph turns.
+
+    python -m benchmarks.chain_overhead --turns 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--turns", type=int, default=2000)
+args = parser.parse_args()
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langgraph.checkpoint.memory import MemorySaver
+
+import graph
+
+graph.llm = FakeListChatModel(responses=["True", "The DOGBRAIN666 Gamma Mouse weighs 55g."])
+QUESTION = "How light is the DOGBRAIN666 Gamma Mouse?"
+
+
+# --- The nodes as they were: prompt, catalog string and chain rebuilt on every call ---
+async def legacy_classify(state: dict) -> dict:
+    question = state["messages"][-1].content
+    prompt = ChatPromptTemplate.from_template(
+        """Determine if the user's question is about our company products.
+        Our company name is "DOGBRAIN666".
+        If yes, respond with 'True'. If no, respond with 'False'.
+        If the user is asking about a product but not ours, respond with 'False'.
+
+        User Question: "{question}"
+        Answer:"""
+    )
+    classification_chain = prompt | graph.llm | StrOutputParser()
+    response = (await classification_chain.ainvoke({"question": question})).strip()
+    return {"is_product": response.lower() == "true"}
+
+
+async def legacy_answer(state: dict) -> dict:
+    product_knowledge = """
+    DOGBRAIN666 Product Catalog:
+    1. DOGBRAIN666 Alpha Headset - Wireless gaming headset with 7.1 surround sound, 40hr battery, RGB lights.
+    2. DOGBRAIN666 Gamma Mouse - Ultra-light 55g gaming mouse with adjustable DPI up to 26,000.
+    3. DOGBRAIN666 Titan Keyboard - Mechanical keyboard with hot-swappable switches and customizable macros.
+    4. DOGBRAIN666 CloudPad - Game controller compatible with PC, mobile, and cloud gaming platforms.
+    """
+    prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         "You are a helpful product support assistant for DOGBRAIN666."
+         "Use ONLY the information below to answer the customer question, but use the conversation history for context."
+         "If the answer is not in the product details, politely say you don't have that information.\n\n"
+         "Product Details:\n{product_info}"),
+        ("placeholder", "{messages}")
+    ])
+    answer_chain = prompt | graph.llm
+    answer = await answer_chain.ainvoke({"product_info": product_knowledge, "messages": state["messages"]})
+    return {"messages": [answer]}
+
+
+async def cpu_microseconds_per_turn(turn) -> float:
+    for _ in range(min(50, args.turns)):
+        await turn()  # warm-up
+    start = time.process_time()
+    for _ in range(args.turns):
+        await turn()
+    return round(1e6 * (time.process_time() - start) / args.turns, 1)
+
+
+async def main():
+    state = {"messages": [HumanMessage(content=QUESTION)]}
+    classification_chain, answer_chain = graph.build_chains(graph.load_catalog())
+
+    async def legacy_nodes():
+        await legacy_classify(state)
+        await legacy_answer(state)
+
+    async def prebuilt_nodes():
+        await graph.classify_request_type(state, classification_chain)
+        await graph.answer_product_question(state, answer_chain)
+
+    # Full turns; each on a fresh thread so the history (and prompt) size stays the same.
+    app = graph.get_graph(checkpointer=MemorySaver())
+    turn_ids = iter(range(10**9))
+
+    async def graph_turn():
+        await app.ainvoke({"messages": [HumanMessage(content=QUESTION)]}, {"configurable": {"thread_id": str(next(turn_ids))}})
+
+    legacy = graph.StateGraph(graph.GraphState)
+    legacy.add_node("classify_request_type", legacy_classify)
+    legacy.add_node("answer_product_question", legacy_answer)
+    legacy.add_node("handle_off_topic", graph.handle_off_topic)
+    legacy.add_edge(graph.START, "classify_request_type")
+    legacy.add_conditional_edges("classify_request_type", graph.decide_to_continue_or_end)
+    legacy.add_edge("answer_product_question", graph.END)
+    legacy.add_edge("handle_off_topic", graph.END)
+    legacy_app = legacy.compile(checkpointer=MemorySaver())
+
+    async def legacy_turn():
+        await legacy_app.ainvoke({"messages": [HumanMessage(content=QUESTION)]}, {"configurable": {"thread_id": str(next(turn_ids))}})
+
+    report = {
+        "turns": args.turns,
+        "nodes_us_per_turn": {"per_call_chains": await cpu_microseconds_per_turn(legacy_nodes),
+                              "prebuilt_chains": await cpu_microseconds_per_turn(prebuilt_nodes)},
+        "graph_us_per_turn": {"per_call_chains": await cpu_microseconds_per_turn(legacy_turn),
+                              "prebuilt_chains": await cpu_microseconds_per_turn(graph_turn)},
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
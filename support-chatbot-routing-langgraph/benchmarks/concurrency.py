@@ -0,0 +1,127 @@
+# benchmarks/concurrency.py
+"""
+Checks that concurrent requests to the support-bot API overlap instead of
+queueing behind each other's LLM calls.
+
+Runs main:app_fastapi under uvicorn in this process with a fake model that
+takes --latency seconds per call (the classifier answers "True"; answers are
+streamed word by word). Fires --requests concurrent /invoke calls, then as many
+/stream calls, each on its own thread, with a /history call in the middle,
+and reports wall time against the serialized total. The check fails (exit
+status 1) if the wall time comes anywhere near the serialized time.
+
+    python -m benchmarks.concurrency --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Optional
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--requests", type=int, default=20)
+parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake LLM call.")
+parser.add_argument("--port", type=int, default=8031)
+args = parser.parse_args()
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["CHECKPOINTER"] = "memory"
+os.environ["TOPIC_LABEL_LOG_PATH"] = ""
+
+import httpx
+import uvicorn
+
+import graph
+from benchmarks.slow_llm import ANSWER, SlowFakeChatModel
+
+graph.llm = SlowFakeChatModel(latency=args.latency)
+
+import main  # builds the graph with the fake model
+
+
+def start_server() -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(main.app_fastapi, port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def invoke(client: httpx.AsyncClient) -> dict:
+    start = time.perf_counter()
+    response = await client.post("/invoke", json={"message": "How light is the Gamma Mouse?", "thread_id": str(uuid.uuid4())})
+    response.raise_for_status()
+    return {"seconds": time.perf_counter() - start, "ok": response.json()["response"] == ANSWER}
+
+
+async def stream(client: httpx.AsyncClient) -> dict:
+    start = time.perf_counter()
+    first_token: Optional[float] = None
+    text, event = "", None
+    async with client.stream("POST", "/stream", json={"message": "How light is the Gamma Mouse?", "thread_id": str(uuid.uuid4())}) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:") and event == "token":
+                first_token = first_token or time.perf_counter() - start
+                text += line[len("data: "):]
+    return {"seconds": time.perf_counter() - start, "first_token": first_token, "ok": text == ANSWER}
+
+
+async def history(client: httpx.AsyncClient) -> float:
+    await asyncio.sleep(args.latency / 2)
+    start = time.perf_counter()
+    response = await client.get(f"/history/{uuid.uuid4()}")
+    # An unknown thread is a 404; what matters is that the server answers while busy.
+    if response.status_code != 404:
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(kind, client: httpx.AsyncClient) -> dict:
+    start = time.perf_counter()
+    results, history_seconds = await asyncio.gather(
+        asyncio.gather(*(kind(client) for _ in range(args.requests))), history(client)
+    )
+    wall = time.perf_counter() - start
+    # Every turn makes two LLM calls (classify, then answer).
+    serialized = args.requests * 2 * args.latency
+    report = {
+        "requests": args.requests,
+        "wall_seconds": round(wall, 2),
+        "serialized_seconds": round(serialized, 2),
+        "max_request_seconds": round(max(result["seconds"] for result in results), 2),
+        "history_seconds_during_load": round(history_seconds, 3),
+        "correct_answers": sum(result["ok"] for result in results),
+    }
+    if kind is stream:
+        report["max_first_token_seconds"] = round(max(result["first_token"] for result in results), 2)
+    return report
+
+
+async def check() -> bool:
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None,
+                                 limits=httpx.Limits(max_connections=args.requests + 1)) as client:
+        report = {"invoke": await run(invoke, client), "stream": await run(stream, client)}
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    # Concurrent turns take about as long as one turn; serialized ones would take `requests` times as long.
+    return all(
+        part["wall_seconds"] < part["serialized_seconds"] / 4 and part["history_seconds_during_load"] < args.latency
+        and part["correct_answers"] == args.requests
+        for part in report.values()
+    )
+
+
+if __name__ == "__main__":
+    server = start_server()
+    try:
+        passed = asyncio.run(check())
+    finally:
+        server.should_exit = True
+    print("PASS: requests run concurrently." if passed else "FAIL: requests are serialized.")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,41 @@
+# benchmarks/slow_llm.py
+"""A fake chat model with a fixed latency per call, for the benchmarks that measure concurrency."""
+import asyncio
+import time
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ANSWER = "The DOGBRAIN666 Gamma Mouse weighs only 55g and has adjustable DPI up to 26,000."
+
+
+class SlowFakeChatModel(BaseChatModel):
+    """Answers after `latency` seconds; the classifier prompt gets "True", anything else ANSWER."""
+
+    latency: float
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        return "True" if "Determine if the user's question" in str(messages[0].content) else ANSWER
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        words = self.reply(messages).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,295 @@
+# checkpointer.py
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langgraph.checkpoint.base import CheckpointTuple, get_checkpoint_id, get_checkpoint_metadata
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from config import (
+    CHECKPOINTER,
+    CHECKPOINT_DB_PATH,
+    HOT_THREADS_MAX,
+    HOT_THREAD_TTL_SECONDS,
+    CHECKPOINTS_KEPT_PER_THREAD,
+    THREAD_RETENTION_SECONDS,
+)
+
+class TieredSqliteSaver(SqliteSaver):
+    """
+    Conversation checkpoints stored in a local SQLite database in WAL mode, so
+    several uvicorn workers can share one file, with the latest checkpoint of
+    recently used threads kept in memory.
+
+    The in-memory tier is an LRU of at most `hot_threads_max` threads; a thread
+    idle for longer than `hot_ttl_seconds` is dropped from it (it stays on disk).
+    Each cached checkpoint is checked against the database with a cheap index
+    lookup before it is used, so a thread updated by another worker is reloaded
+    instead of served stale.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, hot_threads_max: int = HOT_THREADS_MAX,
+                 hot_ttl_seconds: float = HOT_THREAD_TTL_SECONDS, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.hot_threads_max = hot_threads_max
+        self.hot_ttl_seconds = hot_ttl_seconds
+        # (thread_id, checkpoint_ns) -> (checkpoint_id, pending write count, CheckpointTuple, last used)
+        self.hot = OrderedDict()
+        self.hot_lock = threading.Lock()
+        self.stats = {"hot_hits": 0, "hot_misses": 0, "hot_evictions": 0, "compactions": 0}
+
+    @classmethod
+    def from_path(cls, path: str, **kwargs) -> "TieredSqliteSaver":
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        saver = cls(conn, **kwargs)
+        saver.setup()
+        return saver
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        self.conn.executescript(
+            """
+            PRAGMA auto_vacuum=INCREMENTAL;
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA busy_timeout=30000;
+            CREATE TABLE IF NOT EXISTS thread_activity (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        super().setup()
+
+    # --- Hot Tier ---
+    def hot_get(self, key: tuple):
+        with self.hot_lock:
+            now = time.monotonic()
+            while self.hot:
+                oldest_key, oldest = next(iter(self.hot.items()))
+                if now - oldest[3] <= self.hot_ttl_seconds:
+                    break
+                del self.hot[oldest_key]
+                self.stats["hot_evictions"] += 1
+            entry = self.hot.get(key)
+            if entry is not None:
+                self.hot[key] = (*entry[:3], now)
+                self.hot.move_to_end(key)
+            return entry
+
+    def hot_put(self, key: tuple, checkpoint_id: str, write_count: int, checkpoint_tuple: CheckpointTuple):
+        with self.hot_lock:
+            self.hot[key] = (checkpoint_id, write_count, checkpoint_tuple, time.monotonic())
+            self.hot.move_to_end(key)
+            while len(self.hot) > self.hot_threads_max:
+                self.hot.popitem(last=False)
+                self.stats["hot_evictions"] += 1
+
+    def hot_discard(self, thread_id: str):
+        with self.hot_lock:
+            for key in [key for key in self.hot if key[0] == thread_id]:
+                del self.hot[key]
+
+    def latest_version(self, thread_id: str, checkpoint_ns: str):
+        """(checkpoint_id, pending write count) of the thread's latest checkpoint on disk, or None."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                """
+                SELECT c.checkpoint_id,
+                       (SELECT COUNT(*) FROM writes w WHERE w.thread_id = c.thread_id
+                          AND w.checkpoint_ns = c.checkpoint_ns AND w.checkpoint_id = c.checkpoint_id)
+                FROM checkpoints c WHERE c.thread_id = ? AND c.checkpoint_ns = ?
+                ORDER BY c.checkpoint_id DESC LIMIT 1
+                """,
+                (thread_id, checkpoint_ns),
+            )
+            return cur.fetchone()
+
+    # --- Checkpointer API ---
+    def get_tuple(self, config):
+        if get_checkpoint_id(config):
+            # A specific (older) checkpoint, e.g. for time travel: always from disk.
+            return super().get_tuple(config)
+        thread_id = str(config["configurable"]["thread_id"])
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""))
+        version = self.latest_version(*key)
+        if version is None:
+            return None
+        entry = self.hot_get(key)
+        if entry is not None and entry[:2] == tuple(version):
+            self.stats["hot_hits"] += 1
+            return entry[2]
+        self.stats["hot_misses"] += 1
+        checkpoint_tuple = super().get_tuple(config)
+        if checkpoint_tuple is not None:
+            self.hot_put(key, checkpoint_tuple.config["configurable"]["checkpoint_id"],
+                         len(checkpoint_tuple.pending_writes or []), checkpoint_tuple)
+        return checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT INTO thread_activity (thread_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (thread_id, time.time()),
+            )
+        # Write-through: the next turn of this thread is served from memory.
+        parent_id = config["configurable"].get("checkpoint_id")
+        parent_config = (
+            {"configurable": {"thread_id": thread_id, "checkpoint_ns": config["configurable"]["checkpoint_ns"],
+                              "checkpoint_id": parent_id}}
+            if parent_id else None
+        )
+        checkpoint_tuple = CheckpointTuple(next_config, checkpoint, get_checkpoint_metadata(config, metadata),
+                                           parent_config, [])
+        self.hot_put((thread_id, config["configurable"]["checkpoint_ns"]), checkpoint["id"], 0, checkpoint_tuple)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        super().put_writes(config, writes, task_id, task_path)
+        # The cached tuple no longer has all the pending writes; the next read reloads it.
+        self.hot_discard(str(config["configurable"]["thread_id"]))
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+        self.hot_discard(str(thread_id))
+
+    # The graph may also run async (ainvoke/astream); SQLite calls run in a worker thread.
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        ):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- Migrations ---
+    def rename_threads(self, new_thread_id, schema_version: int) -> int:
+        """
+        Renames every stored thread for which `new_thread_id(thread_id)` returns another id,
+        in one transaction. The database is then marked with `schema_version`, and one already
+        at that version is left alone, so each worker can call this at start-up.
+        Returns the number of threads renamed.
+        """
+        with self.cursor() as cur:
+            # Take the write lock before reading the version, so only one worker migrates.
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.execute("PRAGMA user_version")
+                (version,) = cur.fetchone()
+                if version >= schema_version:
+                    return 0
+                cur.execute("SELECT thread_id FROM checkpoints UNION SELECT thread_id FROM writes "
+                            "UNION SELECT thread_id FROM thread_activity")
+                renames = []
+                for (thread_id,) in cur.fetchall():
+                    renamed = new_thread_id(thread_id)
+                    if renamed is not None and renamed != thread_id:
+                        renames.append((renamed, thread_id))
+                # Longest ids first: a new id may equal another thread's old id ("x" -> "t:x" while
+                # "t:x" -> "t:t:x"), which has to move out of the way first.
+                renames.sort(key=lambda rename: len(rename[1]), reverse=True)
+                for table in ("checkpoints", "writes", "thread_activity"):
+                    for renamed, thread_id in renames:
+                        cur.execute(f"UPDATE {table} SET thread_id = ? WHERE thread_id = ?", (renamed, thread_id))
+                cur.execute(f"PRAGMA user_version = {int(schema_version)}")
+            except BaseException:
+                self.conn.rollback()
+                raise
+        with self.hot_lock:
+            self.hot.clear()
+        return len(renames)
+
+    # --- Compaction ---
+    def compact(self, keep_per_thread: int = CHECKPOINTS_KEPT_PER_THREAD,
+                retention_seconds: float = THREAD_RETENTION_SECONDS) -> dict:
+        """
+        Bounds the database: deletes threads idle for longer than `retention_seconds`
+        (0 keeps them), keeps only the newest `keep_per_thread` checkpoints of the
+        others, and returns the freed pages to the file system.
+        """
+        expired = []
+        with self.cursor() as cur:
+            if retention_seconds:
+                cur.execute("SELECT thread_id FROM thread_activity WHERE updated_at < ?",
+                            (time.time() - retention_seconds,))
+                expired = [thread_id for (thread_id,) in cur.fetchall()]
+                for thread_id in expired:
+                    cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                    cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+                    cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+            cur.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS newest_first
+                        FROM checkpoints
+                    ) WHERE newest_first > ?
+                )
+                """,
+                (keep_per_thread,),
+            )
+            pruned_checkpoints = cur.rowcount
+            cur.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id
+                      AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            )
+            pruned_writes = cur.rowcount
+        with self.cursor(transaction=False) as cur:
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            cur.execute("PRAGMA incremental_vacuum")
+            cur.fetchall()
+        for thread_id in expired:
+            self.hot_discard(thread_id)
+        self.stats["compactions"] += 1
+        return {"expired_threads": len(expired), "pruned_checkpoints": pruned_checkpoints,
+                "pruned_writes": pruned_writes}
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "hot_threads": len(self.hot)}
+
+def create_checkpointer(backend: str = CHECKPOINTER):
+    """
+    The checkpointer that stores each thread's conversation: "sqlite" (the default)
+    persists it to CHECKPOINT_DB_PATH; "memory" keeps it in this process only.
+    """
+    if backend == "memory":
+        return MemorySaver()
+    if backend == "sqlite":
+        return TieredSqliteSaver.from_path(CHECKPOINT_DB_PATH)
+    raise ValueError(f"Unknown checkpointer '{backend}'. Expected 'sqlite' or 'memory'.")
+
+async def run_compaction(checkpointer: TieredSqliteSaver, interval_seconds: float):
+    """Compacts the checkpoint database periodically until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(checkpointer.compact)
+            print(f"Checkpoint compaction: {result}")
+        except Exception as e:
+            print(f"Checkpoint compaction failed: {e}")
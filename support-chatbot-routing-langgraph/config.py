@@ -21,4 +21,57 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 def setup_environment():
     """Sets the OpenAI API key as an environment variable for other modules."""
-    os.environ["OPENAI_API_KEY"] = get_openai_api_key()
\ No newline at end of file
+    os.environ["OPENAI_API_KEY"] = get_openai_api_key()
+
+# --- Conversation Store ---
+# "sqlite" persists every thread's conversation to a local SQLite file (WAL mode, so several uvicorn
+# workers on the same machine can share it); "memory" keeps it in this process only.
+CHECKPOINTER = os.getenv("CHECKPOINTER", "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
+
+# Recently used threads are also kept in memory: at most this many, each for this long after its last use.
+HOT_THREADS_MAX = int(os.getenv("HOT_THREADS_MAX", "1000"))
+HOT_THREAD_TTL_SECONDS = float(os.getenv("HOT_THREAD_TTL_SECONDS", "900"))
+
+# Messages kept per thread; older ones are dropped from the conversation (0 keeps them all).
+MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "40"))
+
+# A background job periodically deletes old checkpoints (only the newest ones of each thread are
+# needed to continue it) and threads idle for longer than the retention period (0 keeps them forever).
+COMPACTION_INTERVAL_SECONDS = float(os.getenv("COMPACTION_INTERVAL_SECONDS", "600"))
+CHECKPOINTS_KEPT_PER_THREAD = int(os.getenv("CHECKPOINTS_KEPT_PER_THREAD", "1"))
+THREAD_RETENTION_SECONDS = float(os.getenv("THREAD_RETENTION_SECONDS", str(30 * 24 * 3600)))
+
+# --- Product Catalog ---
+# The products the support bot answers about, loaded once when the graph is built.
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(os.path.dirname(__file__), "catalogs", "dogbrain666.json"))
+
+# --- Topic Classifier ---
+# Local on/off-topic classifier (topic_classifier.py) consulted before the LLM. Questions it scores
+# at least TOPIC_CONFIDENCE_THRESHOLD either way are routed without an LLM call; the rest fall back
+# to the LLM, whose answers are appended to TOPIC_LABEL_LOG_PATH as training labels ("" disables the
+# log). Without a trained model at TOPIC_CLASSIFIER_PATH every question goes to the LLM.
+TOPIC_CLASSIFIER_PATH = os.getenv("TOPIC_CLASSIFIER_PATH", os.path.join(os.path.dirname(__file__), "models", "topic_classifier.npz"))
+TOPIC_ENCODER_MODEL = os.getenv("TOPIC_ENCODER_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+TOPIC_CONFIDENCE_THRESHOLD = float(os.getenv("TOPIC_CONFIDENCE_THRESHOLD", "0.85"))
+TOPIC_LABEL_LOG_PATH = os.getenv("TOPIC_LABEL_LOG_PATH", "topic_labels.jsonl")
+# Encoder models kept in memory. Every tenant's classifier built on the same model shares one copy.
+TOPIC_ENCODERS_MAX = int(os.getenv("TOPIC_ENCODERS_MAX", "2"))
+
+# --- History API ---
+# Messages per /history page when the client does not ask for a size, and the largest page it may ask for.
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_PAGE_SIZE_MAX = int(os.getenv("HISTORY_PAGE_SIZE_MAX", "200"))
+
+# --- Batch Triage ---
+# Tickets run at once by batch.py and POST /batch (the endpoint accepts up to BATCH_MAX_CONCURRENCY per request).
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+
+# --- Tenants ---
+# Each brand (tenant) has its catalog at CATALOGS_DIR/{tenant_id}.json; requests without a tenant_id
+# go to DEFAULT_TENANT. Graphs are built when a tenant is first used, and at most MAX_ACTIVE_TENANTS
+# are kept (the least recently used is dropped).
+CATALOGS_DIR = os.getenv("CATALOGS_DIR", os.path.dirname(CATALOG_PATH))
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", os.path.splitext(os.path.basename(CATALOG_PATH))[0])
+MAX_ACTIVE_TENANTS = int(os.getenv("MAX_ACTIVE_TENANTS", "32"))
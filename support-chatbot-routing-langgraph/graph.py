@@ -1,43 +1,105 @@
 # graph.py
 
-from typing import TypedDict, Literal, Annotated, List
-from langchain_core.messages import BaseMessage, AIMessage
+import asyncio
+import json
+from functools import partial
+from typing import TypedDict, Literal, Annotated, List, Optional
+from langchain_core.messages import BaseMessage, AIMessage, SystemMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from config import setup_environment
+from config import setup_environment, MAX_HISTORY_MESSAGES, CATALOG_PATH, TOPIC_CLASSIFIER_PATH, TOPIC_LABEL_LOG_PATH
+from checkpointer import create_checkpointer
+from topic_classifier import TopicGate, load_topic_gate, log_label
 
 # Set up the environment with the API key
 setup_environment()
 
 llm = ChatOpenAI(model="gpt-4o", temperature=0)
 
+def add_messages_capped(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    add_messages, keeping only the last MAX_HISTORY_MESSAGES messages of the thread
+    so stored conversations (and the prompts built from them) stay bounded.
+    """
+    messages = add_messages(left, right)
+    if MAX_HISTORY_MESSAGES and len(messages) > MAX_HISTORY_MESSAGES:
+        messages = messages[-MAX_HISTORY_MESSAGES:]
+    return messages
+
 class GraphState(TypedDict):
     """
     Represents the state of our graph, including conversation memory.
     """
-    messages: Annotated[List[BaseMessage], add_messages]
+    messages: Annotated[List[BaseMessage], add_messages_capped]
     is_product: bool
 
-def classify_request_type(state: GraphState) -> dict:
-    """Classifies if the user's question is about products."""
-    question = state["messages"][-1].content
+# --- Product Catalog ---
+def load_catalog(path: str = CATALOG_PATH) -> dict:
+    """Reads the company name and product list from a JSON catalog file."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def format_product_knowledge(catalog: dict) -> str:
+    """Renders the catalog as the numbered product list given to the answering model."""
+    lines = [f"{catalog['company']} Product Catalog:"]
+    lines += [f"{i}. {product['name']} - {product['description']}" for i, product in enumerate(catalog["products"], 1)]
+    return "\n".join(lines)
 
-    prompt = ChatPromptTemplate.from_template(
-        """Determine if the user's question is about our company products.
-        Our company name is "DOGBRAIN666".
+# --- Chains ---
+CLASSIFY_PROMPT = """Determine if the user's question is about our company products.
+        Our company name is "{company}".
         If yes, respond with 'True'. If no, respond with 'False'.
         If the user is asking about a product but not ours, respond with 'False'.
 
         User Question: "{question}"
         Answer:"""
+
+def build_chains(catalog: dict) -> tuple:
+    """
+    Builds the classification and answer chains for a catalog once, when the graph is compiled.
+
+    The answer prompt starts with one static system message (instructions and the whole
+    catalog), followed by the conversation. That prefix is byte-identical on every turn of
+    every thread, so the provider's prompt cache (OpenAI caches prefixes of 1024+ tokens)
+    can reuse it as the catalog grows.
+    """
+    classification_prompt = ChatPromptTemplate.from_template(CLASSIFY_PROMPT).partial(company=catalog["company"])
+    classification_chain = classification_prompt | llm | StrOutputParser()
+
+    system_prefix = SystemMessage(
+        content=f"You are a helpful product support assistant for {catalog['company']}."
+        "Use ONLY the information below to answer the customer question, but use the conversation history for context."
+        "If the answer is not in the product details, politely say you don't have that information.\n\n"
+        f"Product Details:\n{format_product_knowledge(catalog)}"
     )
-    classification_chain = prompt | llm | StrOutputParser()
-    response = classification_chain.invoke({"question": question}).strip()
+    answer_prompt = ChatPromptTemplate.from_messages([
+        system_prefix,
+        MessagesPlaceholder("messages"),
+    ])
+    answer_chain = answer_prompt | llm
+    return classification_chain, answer_chain
+
+# --- Nodes ---
+async def classify_request_type(state: GraphState, classification_chain, topic_gate: Optional[TopicGate] = None,
+                                label_log_path: str = TOPIC_LABEL_LOG_PATH) -> dict:
+    """
+    Classifies if the user's question is about products: with the local topic
+    classifier when it is confident, otherwise with the LLM (whose answer is logged
+    as a training label for the classifier).
+    """
+    question = state["messages"][-1].content
+    if topic_gate is not None:
+        # The embedding model runs on the CPU; keep it off the event loop.
+        is_product = await asyncio.to_thread(topic_gate.decide, question)
+        if is_product is not None:
+            return {"is_product": is_product}
+    response = (await classification_chain.ainvoke({"question": question})).strip()
     is_product = response.lower() == "true"
+    # File I/O under a lock shared by every session; keep it off the event loop.
+    await asyncio.to_thread(log_label, question, is_product, label_log_path)
     return {"is_product": is_product}
 
 def decide_to_continue_or_end(state: GraphState) -> Literal["answer_product_question", "handle_off_topic"]:
@@ -47,49 +109,43 @@ def decide_to_continue_or_end(state: GraphState) -> Literal["answer_product_ques
     else:
         return "handle_off_topic"
 
-def answer_product_question(state: GraphState) -> dict:
-    """Answers customer questions about DOGBRAIN666 products."""
-    product_knowledge = """
-    DOGBRAIN666 Product Catalog:
-    1. DOGBRAIN666 Alpha Headset - Wireless gaming headset with 7.1 surround sound, 40hr battery, RGB lights.
-    2. DOGBRAIN666 Gamma Mouse - Ultra-light 55g gaming mouse with adjustable DPI up to 26,000.
-    3. DOGBRAIN666 Titan Keyboard - Mechanical keyboard with hot-swappable switches and customizable macros.
-    4. DOGBRAIN666 CloudPad - Game controller compatible with PC, mobile, and cloud gaming platforms.
-    """
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         "You are a helpful product support assistant for DOGBRAIN666."
-         "Use ONLY the information below to answer the customer question, but use the conversation history for context."
-         "If the answer is not in the product details, politely say you don't have that information.\n\n"
-         "Product Details:\n{product_info}"),
-        ("placeholder", "{messages}")
-    ])
-
-    answer_chain = prompt | llm
-    answer = answer_chain.invoke({
-        "product_info": product_knowledge,
-        "messages": state['messages']
-    })
+async def answer_product_question(state: GraphState, answer_chain) -> dict:
+    """Answers customer questions about the catalog's products."""
+    answer = await answer_chain.ainvoke({"messages": state["messages"]})
     return {"messages": [answer]}
 
-def handle_off_topic(state: GraphState) -> dict:
-    """Handles questions that are not about DOGBRAIN666 products."""
-    response = AIMessage(content="I'm sorry, I can only answer questions about DOGBRAIN666 products. How can I help you with our product line?")
+def handle_off_topic(state: GraphState, company: str) -> dict:
+    """Handles questions that are not about the company's products."""
+    response = AIMessage(content=f"I'm sorry, I can only answer questions about {company} products. How can I help you with our product line?")
     return {"messages": [response]}
 
-def get_graph():
-    """Defines and compiles the LangGraph application."""
+def get_graph(checkpointer=None, catalog_path: str = CATALOG_PATH, topic_classifier_path: str = TOPIC_CLASSIFIER_PATH,
+              label_log_path: str = TOPIC_LABEL_LOG_PATH, topic_gate: Optional[TopicGate] = None):
+    """
+    Defines and compiles the LangGraph application for the catalog at `catalog_path`.
+    Conversations are stored by `checkpointer`; by default the one selected by config.CHECKPOINTER
+    (False compiles the graph without one).
+    The trained local topic classifier at `topic_classifier_path` (if any; "" disables it), or the
+    already loaded `topic_gate`, screens questions before the LLM, and the LLM's answers are logged
+    to `label_log_path`.
+    """
+    catalog = load_catalog(catalog_path)
+    classification_chain, answer_chain = build_chains(catalog)
+    if topic_gate is None:
+        topic_gate = load_topic_gate(topic_classifier_path)
+
     graph = StateGraph(GraphState)
-    graph.add_node("classify_request_type", classify_request_type)
-    graph.add_node("answer_product_question", answer_product_question)
-    graph.add_node("handle_off_topic", handle_off_topic)
+    graph.add_node("classify_request_type", partial(classify_request_type, classification_chain=classification_chain,
+                                                    topic_gate=topic_gate, label_log_path=label_log_path))
+    graph.add_node("answer_product_question", partial(answer_product_question, answer_chain=answer_chain))
+    graph.add_node("handle_off_topic", partial(handle_off_topic, company=catalog["company"]))
 
     graph.add_edge(START, "classify_request_type")
     graph.add_conditional_edges("classify_request_type", decide_to_continue_or_end)
     graph.add_edge("answer_product_question", END)
     graph.add_edge("handle_off_topic", END)
 
-    memory = MemorySaver()
-    app = graph.compile(checkpointer=memory)
+    if checkpointer is None:
+        checkpointer = create_checkpointer()
+    app = graph.compile(checkpointer=checkpointer)
     return app
\ No newline at end of file
@@ -1,15 +1,51 @@
 # main.py
 
+import asyncio
+import json
+import re
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
-from graph import get_graph
-from config import OPENAI_API_KEY
+from langchain_core.messages import HumanMessage, AIMessageChunk, BaseMessage
+from checkpointer import TieredSqliteSaver, run_compaction
+from tenants import TenantGraphs, migrate_thread_keys, tenant_graph_settings, thread_key
+from batch import batch_graphs, parse_tickets, run_batch
+from config import (
+    OPENAI_API_KEY,
+    COMPACTION_INTERVAL_SECONDS,
+    HISTORY_PAGE_SIZE,
+    HISTORY_PAGE_SIZE_MAX,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_CONCURRENCY,
+    DEFAULT_TENANT,
+)
+
+# Compiled LangGraph apps by tenant, built on first use; all share one conversation store
+tenant_graphs = TenantGraphs()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Moves conversations stored under the old thread ids, then runs the checkpoint
+    compaction job in the background while the server is up.
+    """
+    migrated = await asyncio.to_thread(migrate_thread_keys, tenant_graphs.checkpointer)
+    if migrated:
+        print(f"Moved {migrated} default-tenant thread(s) to tenant-prefixed ids.")
+    compaction = None
+    if isinstance(tenant_graphs.checkpointer, TieredSqliteSaver) and COMPACTION_INTERVAL_SECONDS > 0:
+        compaction = asyncio.create_task(run_compaction(tenant_graphs.checkpointer, COMPACTION_INTERVAL_SECONDS))
+    yield
+    if compaction is not None:
+        compaction.cancel()
 
 # Create the FastAPI app
-app_fastapi = FastAPI()
+app_fastapi = FastAPI(lifespan=lifespan)
 
 # --- CORS Middleware Setup ---
 # This allows your Streamlit frontend (running on a different port)
@@ -28,13 +64,11 @@ app_fastapi.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Get the compiled LangGraph app
-langgraph_app = get_graph()
-
 class ChatRequest(BaseModel):
     """Request model for the chat endpoint."""
     message: str
     thread_id: str
+    tenant_id: str = DEFAULT_TENANT
 
 class ChatResponse(BaseModel):
     """Response model for the chat endpoint."""
@@ -45,6 +79,35 @@ async def read_root():
     """A simple hello world endpoint to check if the server is running."""
     return {"message": "Hello from the DOGBRAIN666 API!"}
 
+async def get_tenant_graph(tenant_id: str):
+    """The tenant's compiled graph, or a 404 for a tenant without a catalog."""
+    try:
+        return await tenant_graphs.aget(tenant_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app_fastapi.get("/stats/topic-classifier")
+async def topic_classifier_stats(tenant_id: str = DEFAULT_TENANT):
+    """
+    How many questions the tenant's local topic classifier routed, and how often it fell back
+    to the LLM. A tenant whose graph is not in memory is reported as not loaded; its classifier
+    is loaded with the graph, on the tenant's next question.
+    """
+    try:
+        tenant_graph_settings(tenant_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        topic_gate = tenant_graphs.topic_gate(tenant_id)
+    except KeyError:
+        return {"loaded": False}
+    return topic_gate.snapshot() if topic_gate is not None else {"enabled": False}
+
+@app_fastapi.get("/stats/tenants")
+async def tenant_stats():
+    """Which tenants have a compiled graph in memory, and how often one had to be built."""
+    return tenant_graphs.snapshot()
+
 @app_fastapi.post("/invoke", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """
@@ -54,27 +117,172 @@ async def chat_endpoint(request: ChatRequest):
     if not OPENAI_API_KEY or OPENAI_API_KEY == "YOUR_API_KEY_HERE":
         return ChatResponse(response="API Key not configured on the server.")
 
-    config = {"configurable": {"thread_id": request.thread_id}}
+    langgraph_app = await get_tenant_graph(request.tenant_id)
+    config = {"configurable": {"thread_id": thread_key(request.tenant_id, request.thread_id)}}
     
     messages = [HumanMessage(content=request.message)]
     
-    result = langgraph_app.invoke({"messages": messages}, config)
+    result = await langgraph_app.ainvoke({"messages": messages}, config)
     
     ai_response = result["messages"][-1].content
     
     return ChatResponse(response=ai_response)
 
-@app_fastapi.get("/history/{thread_id}")
-async def get_history(thread_id: str):
+# --- Streaming ---
+# Nodes whose messages are the bot's reply; the classifier's True/False output is not streamed.
+REPLY_NODES = ("answer_product_question", "handle_off_topic")
+
+def sse_event(event: str, data: str) -> str:
+    """An SSE frame of the given event type, with a data field per line of `data`."""
+    fields = [f"event: {event}"] + [f"data: {line}" for line in re.split(r"\r\n|\r|\n", data)]
+    return "\n".join(fields) + "\n\n"
+
+@app_fastapi.post("/stream")
+async def stream_endpoint(request: ChatRequest):
+    """
+    Streams the reply as Server-Sent Events: a 'token' event per text fragment of
+    the answer as the model generates it, then a terminal 'end' event ('error' on failure).
+    """
+    langgraph_app = await get_tenant_graph(request.tenant_id)
+
+    async def event_stream():
+        if not OPENAI_API_KEY or OPENAI_API_KEY == "YOUR_API_KEY_HERE":
+            yield sse_event("error", "API Key not configured on the server.")
+            yield sse_event("end", "[DONE]")
+            return
+        config = {"configurable": {"thread_id": thread_key(request.tenant_id, request.thread_id)}}
+        inputs = {"messages": [HumanMessage(content=request.message)]}
+        try:
+            async for message, metadata in langgraph_app.astream(inputs, config, stream_mode="messages"):
+                if metadata.get("langgraph_node") not in REPLY_NODES or not message.content:
+                    continue
+                # Model output arrives as chunks; a node's finished message (the off-topic reply) arrives whole.
+                if isinstance(message, AIMessageChunk) or message.type == "ai":
+                    yield sse_event("token", message.content)
+        except Exception as e:
+            yield sse_event("error", f"An error occurred: {e}")
+        yield sse_event("end", "[DONE]")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# --- Batch ---
+@app_fastapi.post("/batch")
+async def batch_endpoint(
+    request: Request,
+    concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=BATCH_MAX_CONCURRENCY),
+    tenant_id: str = DEFAULT_TENANT,
+):
+    """
+    Runs a JSONL body of tickets ({"id", "message"} per line) through the classifier
+    and answerer, `concurrency` at a time, and streams back one NDJSON result per
+    ticket as it finishes (not in input order). Tickets get no conversation thread.
+    A malformed line or a repeated ticket id rejects the whole batch (400).
+    To resume an interrupted batch, post the tickets that have no result yet.
+    """
+    if not OPENAI_API_KEY or OPENAI_API_KEY == "YOUR_API_KEY_HERE":
+        raise HTTPException(status_code=503, detail="API Key not configured on the server.")
+    try:
+        tickets = parse_tickets((await request.body()).decode("utf-8").splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        await batch_graphs.aget(tenant_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def result_lines():
+        async for result in run_batch(tickets, concurrency, tenant_id):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+# --- History ---
+class HistoryPage(BaseModel):
+    """
+    One page of a thread's messages, oldest first. Pass `older_cursor` as `before`
+    to page back, and the id of the last message you have as `after` to sync.
+    """
+    messages: List[dict]
+    older_cursor: Optional[str] = None  # None: this page starts at the beginning of the thread
+    newer_cursor: Optional[str] = None  # None: this page ends at the newest message
+    reset: bool = False  # the cursor is no longer in the thread (trimmed); this is the newest page instead
+
+def serialize_message(message: BaseMessage, compact: bool) -> dict:
+    """The compact form is all the chat UI renders; the full form is the LangChain message dump."""
+    if compact:
+        return {"id": message.id, "type": message.type, "content": message.content}
+    return message.model_dump()
+
+def paginate(messages: List[BaseMessage], limit: int, before: Optional[str], after: Optional[str]) -> dict:
+    """Slices one page out of the thread; only the page is serialized and sent."""
+    ids = [message.id for message in messages]
+    cursor = after or before
+    reset = cursor is not None and cursor not in ids
+    if after and not reset:
+        start = ids.index(after) + 1
+        end = min(start + limit, len(messages))
+    else:
+        end = ids.index(before) if before and not reset else len(messages)
+        start = max(end - limit, 0)
+    return {
+        "messages": messages[start:end],
+        "older_cursor": ids[start] if start > 0 else None,
+        "newer_cursor": ids[end - 1] if end < len(messages) and end > start else None,
+        "reset": reset,
+    }
+
+async def thread_version(config: dict) -> Optional[str]:
+    """
+    Identifies the thread's latest state, for the ETag. The SQLite store answers with
+    an index lookup, so an unchanged thread gets its 304 without loading the conversation.
+    """
+    checkpointer = tenant_graphs.checkpointer
+    if isinstance(checkpointer, TieredSqliteSaver):
+        version = await asyncio.to_thread(checkpointer.latest_version, config["configurable"]["thread_id"], "")
+        return "-".join(map(str, version)) if version else None
+    checkpoint_tuple = await checkpointer.aget_tuple(config)
+    if checkpoint_tuple is None:
+        return None
+    return f"{checkpoint_tuple.config['configurable']['checkpoint_id']}-{len(checkpoint_tuple.pending_writes or [])}"
+
+@app_fastapi.get("/history/{thread_id}", response_model=HistoryPage)
+async def get_history(
+    thread_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_SIZE_MAX),
+    before: Optional[str] = Query(None, description="Message id; returns the page of messages before it."),
+    after: Optional[str] = Query(None, description="Message id; returns the messages after it."),
+    compact: bool = Query(True, description="Only id, type and content of each message."),
+    tenant_id: str = DEFAULT_TENANT,
+):
     """
-    Endpoint to retrieve the conversation history for a given thread_id.
+    Endpoint to retrieve the conversation history for a given thread_id, a page at a time.
+    Without a cursor it returns the newest `limit` messages. The response carries an ETag;
+    send it back as If-None-Match to get a 304 while the thread is unchanged. A thread with
+    no saved state is a 404.
     """
-    config = {"configurable": {"thread_id": thread_id}}
+    langgraph_app = await get_tenant_graph(tenant_id)
+    config = {"configurable": {"thread_id": thread_key(tenant_id, thread_id)}}
+    if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
     try:
-        history = langgraph_app.get_state(config)
-        return history.values.get('messages', [])
-    except Exception:
-        return []
+        version = await thread_version(config)
+        etag = f'W/"{version}"'
+        if version is not None and etag not in if_none_match:
+            # The checkpoint holds the whole (capped) message list; the page is cut from it below.
+            history = await langgraph_app.aget_state(config)
+    except Exception as e:
+        print(f"Could not read the history of thread {thread_id}: {e}")
+        raise HTTPException(status_code=500, detail="Could not read the conversation store.")
+    if version is None:
+        raise HTTPException(status_code=404, detail=f"Unknown thread '{thread_id}'.")
+    if etag in if_none_match:
+        return Response(status_code=304, headers={"ETag": etag})
+    page = paginate(history.values.get('messages', []), limit, before, after)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    page["messages"] = [serialize_message(message, compact) for message in page["messages"]]
+    return HistoryPage(**page)
 
 
 if __name__ == "__main__":
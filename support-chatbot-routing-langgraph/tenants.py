@@ -0,0 +1,163 @@
+# tenants.py
+
+"""
+One support bot process for several brands. Each tenant has its own product
+catalog (catalogs/{tenant_id}.json), and optionally its own topic classifier,
+and gets its own compiled graph; all of them share one conversation store.
+"""
+
+import asyncio
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from checkpointer import TieredSqliteSaver, create_checkpointer
+from config import (
+    CATALOGS_DIR,
+    DEFAULT_TENANT,
+    MAX_ACTIVE_TENANTS,
+    TOPIC_CLASSIFIER_PATH,
+    TOPIC_LABEL_LOG_PATH,
+)
+from graph import get_graph
+from topic_classifier import load_topic_gate
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+def tenant_file(path: str, tenant_id: str) -> str:
+    """The tenant's copy of a per-tenant file: models/topic_classifier.npz -> models/topic_classifier.{tenant_id}.npz."""
+    if not path or tenant_id == DEFAULT_TENANT:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{tenant_id}{extension}"
+
+def tenant_graph_settings(tenant_id: str, catalogs_dir: str = CATALOGS_DIR) -> dict:
+    """get_graph() arguments for a tenant; raises LookupError for a tenant without a catalog."""
+    catalog_path = os.path.join(catalogs_dir, f"{tenant_id}.json")
+    if not TENANT_ID_PATTERN.match(tenant_id) or not os.path.isfile(catalog_path):
+        raise LookupError(f"Unknown tenant '{tenant_id}'.")
+    return {
+        "catalog_path": catalog_path,
+        # A classifier trained on one brand's questions would misroute another's.
+        "topic_classifier_path": tenant_file(TOPIC_CLASSIFIER_PATH, tenant_id),
+        "label_log_path": tenant_file(TOPIC_LABEL_LOG_PATH, tenant_id),
+    }
+
+def thread_key(tenant_id: str, thread_id: str) -> str:
+    """
+    The thread id stored in the checkpointer. Tenants share it, so every tenant's
+    threads, the default tenant's included, are prefixed with the tenant id. Tenant
+    ids contain no ':', so no thread id can reach into another tenant's threads.
+    """
+    return f"{tenant_id}:{thread_id}"
+
+# Checkpoint database version once the default tenant's threads are prefixed too.
+PREFIXED_THREADS_VERSION = 1
+
+def migrate_thread_keys(checkpointer, catalogs_dir: str = CATALOGS_DIR) -> int:
+    """
+    Moves the default tenant's threads, stored under their plain ids before every
+    tenant was prefixed, to their thread_key(). A stored id counts as another tenant's
+    when it starts with the id of a tenant (other than the default) that has a catalog.
+    Runs once per database; returns the number of threads moved.
+    """
+    if not isinstance(checkpointer, TieredSqliteSaver):
+        # Nothing outlives an in-memory store.
+        return 0
+
+    def new_thread_id(thread_id: str):
+        tenant_id, separator, _ = thread_id.partition(":")
+        if separator and tenant_id != DEFAULT_TENANT:
+            try:
+                tenant_graph_settings(tenant_id, catalogs_dir)
+                return None
+            except LookupError:
+                pass
+        return thread_key(DEFAULT_TENANT, thread_id)
+
+    return checkpointer.rename_threads(new_thread_id, PREFIXED_THREADS_VERSION)
+
+def file_version(path: str):
+    """(modification time, size) of a file, or None if there is none."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class TenantGraphs:
+    """
+    Compiled graphs by tenant, built the first time a tenant is used. At most
+    `max_tenants` are kept; loading another drops the least recently used one,
+    together with its topic classifier, so start-up time and memory follow the
+    active tenants rather than the catalog directory. A tenant whose classifier was
+    missing or failed to load is built again once the model file changes.
+    """
+
+    def __init__(self, checkpointer=None, catalogs_dir: str = CATALOGS_DIR, max_tenants: int = MAX_ACTIVE_TENANTS):
+        self.checkpointer = create_checkpointer() if checkpointer is None else checkpointer
+        self.catalogs_dir = catalogs_dir
+        self.max_tenants = max_tenants
+        self.graphs = OrderedDict()
+        # The topic gate each loaded tenant's graph was built with (None without a classifier).
+        self.topic_gates = {}
+        # For tenants built without a classifier: its path and file_version() at the time.
+        self.missing_classifiers = {}
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def cached(self, tenant_id: str):
+        with self.lock:
+            graph = self.graphs.get(tenant_id)
+            missing = self.missing_classifiers.get(tenant_id)
+            if graph is not None and missing is not None and file_version(missing[0]) != missing[1]:
+                # The classifier has been added or replaced since: build the tenant again.
+                return None
+            if graph is not None:
+                self.graphs.move_to_end(tenant_id)
+                self.stats["hits"] += 1
+            return graph
+
+    def get(self, tenant_id: str):
+        """The tenant's compiled graph; raises LookupError for an unknown tenant."""
+        graph = self.cached(tenant_id)
+        if graph is not None:
+            return graph
+        # Built outside the lock so one tenant's cold start does not hold up the others.
+        settings = tenant_graph_settings(tenant_id, self.catalogs_dir)
+        classifier_path = settings.pop("topic_classifier_path")
+        # Read before loading, so a file replaced during the load is picked up next time.
+        classifier_version = file_version(classifier_path) if classifier_path else None
+        topic_gate = load_topic_gate(classifier_path)
+        graph = get_graph(self.checkpointer, topic_classifier_path="", topic_gate=topic_gate, **settings)
+        with self.lock:
+            self.graphs[tenant_id] = graph
+            self.topic_gates[tenant_id] = topic_gate
+            if topic_gate is None and classifier_path:
+                self.missing_classifiers[tenant_id] = (classifier_path, classifier_version)
+            else:
+                self.missing_classifiers.pop(tenant_id, None)
+            self.graphs.move_to_end(tenant_id)
+            self.stats["loads"] += 1
+            while len(self.graphs) > self.max_tenants:
+                evicted, _ = self.graphs.popitem(last=False)
+                self.topic_gates.pop(evicted, None)
+                self.missing_classifiers.pop(evicted, None)
+                self.stats["evictions"] += 1
+        return graph
+
+    async def aget(self, tenant_id: str):
+        """get() for the event loop: a cold tenant is built (catalog read, classifier loaded) in a worker thread."""
+        graph = self.cached(tenant_id)
+        if graph is not None:
+            return graph
+        return await asyncio.to_thread(self.get, tenant_id)
+
+    def topic_gate(self, tenant_id: str):
+        """The loaded tenant's topic gate (None without a classifier); raises KeyError if the tenant is not loaded."""
+        with self.lock:
+            return self.topic_gates[tenant_id]
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "active_tenants": list(self.graphs), "max_tenants": self.max_tenants}
@@ -0,0 +1,11 @@
+# tests/conftest.py
+# Run from the project directory: python -m pytest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config refuses to load without a key; no test calls the API.
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite"))
+os.environ.setdefault("TOPIC_LABEL_LOG_PATH", os.path.join(tempfile.mkdtemp(), "topic_labels.jsonl"))
@@ -0,0 +1,40 @@
+# tests/test_batch.py
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from batch import parse_tickets
+
+
+def jsonl(*records):
+    return [json.dumps(record) for record in records]
+
+
+def test_tickets_keep_their_ids_and_default_to_the_line_number():
+    tickets = parse_tickets(jsonl({"id": "a", "message": "Is it waterproof?"}, {"message": "How heavy is it?"}))
+
+    assert tickets == [{"id": "a", "message": "Is it waterproof?"}, {"id": "2", "message": "How heavy is it?"}]
+
+
+def test_a_repeated_id_rejects_the_batch():
+    lines = jsonl({"id": "a", "message": "Is it waterproof?"}, {"id": "b", "message": "Hi"},
+                  {"id": "a", "message": "How heavy is it?"})
+
+    with pytest.raises(ValueError, match="Line 3 repeats ticket id 'a' .*line 1"):
+        parse_tickets(lines)
+
+
+def test_an_implicit_id_that_repeats_an_explicit_one_is_rejected():
+    with pytest.raises(ValueError, match="repeats ticket id '2'"):
+        parse_tickets(jsonl({"id": 2, "message": "Is it waterproof?"}, {"message": "How heavy is it?"}))
+
+
+def test_the_endpoint_answers_a_repeated_id_with_a_400():
+    body = "\n".join(jsonl({"id": "a", "message": "Is it waterproof?"}, {"id": "a", "message": "Hi"}))
+
+    response = TestClient(main.app_fastapi).post("/batch", content=body)
+
+    assert response.status_code == 400
+    assert "repeats ticket id 'a'" in response.json()["detail"]
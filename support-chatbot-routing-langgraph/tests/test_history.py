@@ -0,0 +1,48 @@
+# tests/test_history.py
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+
+import main
+from tenants import thread_key
+from config import DEFAULT_TENANT
+
+client = TestClient(main.app_fastapi)
+
+
+def test_an_unknown_thread_is_a_404():
+    response = client.get(f"/history/{uuid.uuid4()}")
+
+    assert response.status_code == 404
+
+
+def test_a_store_error_is_a_500(monkeypatch):
+    async def failing_thread_version(config):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(main, "thread_version", failing_thread_version)
+
+    response = client.get(f"/history/{uuid.uuid4()}")
+
+    assert response.status_code == 500
+
+
+def test_a_saved_thread_is_paged_newest_first():
+    thread_id = str(uuid.uuid4())
+    messages = [HumanMessage(content="Is the sofa leather?", id="1"), AIMessage(content="Yes.", id="2"),
+                HumanMessage(content="And the price?", id="3"), AIMessage(content="$899.", id="4")]
+
+    async def save():
+        graph = await main.get_tenant_graph(DEFAULT_TENANT)
+        config = {"configurable": {"thread_id": thread_key(DEFAULT_TENANT, thread_id)}}
+        await graph.aupdate_state(config, {"messages": messages})
+
+    asyncio.run(save())
+    response = client.get(f"/history/{thread_id}", params={"limit": 2})
+
+    assert response.status_code == 200
+    page = response.json()
+    assert [message["id"] for message in page["messages"]] == ["3", "4"]
+    assert page["older_cursor"] == "3"
@@ -0,0 +1,235 @@
+# topic_classifier.py
+
+"""
+Local on/off-topic classifier for the support bot: sentence-transformer
+embeddings with a logistic regression head, trained from labelled questions.
+
+It answers "is this question about our products?" in-process in a few
+milliseconds. The graph only asks the LLM when the classifier is not confident
+enough (see TopicGate), and logs the LLM's answers as new training labels.
+
+Needs the sentence-transformers package (pip install sentence-transformers).
+
+    python topic_classifier.py train --data data/topic_labels.jsonl topic_labels.jsonl
+    python topic_classifier.py eval --data data/topic_labels.jsonl --threshold 0.85
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    TOPIC_CLASSIFIER_PATH,
+    TOPIC_ENCODER_MODEL,
+    TOPIC_CONFIDENCE_THRESHOLD,
+    TOPIC_ENCODERS_MAX,
+    TOPIC_LABEL_LOG_PATH,
+)
+
+# --- Encoders ---
+@lru_cache(maxsize=TOPIC_ENCODERS_MAX)
+def load_encoder(model_name: str):
+    """
+    The sentence-transformer `model_name`, loaded once per process. It is most of a
+    classifier's memory, so every tenant's classifier on the same model shares it.
+    """
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+# --- Classifier ---
+class TopicClassifier:
+    """P(question is about our products) from a sentence embedding and a logistic head."""
+
+    def __init__(self, encoder_name: str, weights: np.ndarray, bias: float, encoder=None):
+        self.encoder_name = encoder_name
+        self.weights = weights
+        self.bias = bias
+        self._encoder = encoder
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = load_encoder(self.encoder_name)
+        return self._encoder
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.encoder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        return sigmoid(self.embed(texts) @ self.weights + self.bias)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, bias=self.bias, encoder_name=self.encoder_name)
+
+    @classmethod
+    def load(cls, path: str, encoder=None) -> "TopicClassifier":
+        with np.load(path) as saved:
+            return cls(str(saved["encoder_name"]), saved["weights"], float(saved["bias"]), encoder=encoder)
+
+def sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, l2: float = 1e-3, epochs: int = 2000,
+                 learning_rate: float = 1.0) -> Tuple[np.ndarray, float]:
+    """L2-regularized logistic regression by full-batch gradient descent (the data sets are small)."""
+    weights = np.zeros(X.shape[1], dtype=np.float64)
+    bias = 0.0
+    # Weigh both classes equally, whatever the label mix of the logs.
+    sample_weight = np.where(y == 1, 0.5 / max(y.mean(), 1e-9), 0.5 / max(1 - y.mean(), 1e-9))
+    for _ in range(epochs):
+        error = (sigmoid(X @ weights + bias) - y) * sample_weight
+        weights -= learning_rate * (X.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * error.mean()
+    return weights.astype(np.float32), float(bias)
+
+def train(examples: List[Tuple[str, bool]], encoder_name: str = TOPIC_ENCODER_MODEL, encoder=None) -> TopicClassifier:
+    classifier = TopicClassifier(encoder_name, np.zeros(0, dtype=np.float32), 0.0, encoder=encoder)
+    X = classifier.embed([text for text, _ in examples])
+    y = np.array([1.0 if label else 0.0 for _, label in examples])
+    classifier.weights, classifier.bias = fit_logistic(X, y)
+    return classifier
+
+def evaluate(classifier: TopicClassifier, examples: List[Tuple[str, bool]],
+             threshold: float = TOPIC_CONFIDENCE_THRESHOLD) -> dict:
+    """
+    How the classifier would route these questions: the share it decides alone,
+    its accuracy on those, and the share that would fall back to the LLM.
+    """
+    probabilities = classifier.predict_proba([text for text, _ in examples])
+    labels = np.array([label for _, label in examples])
+    predictions = probabilities >= 0.5
+    confident = np.maximum(probabilities, 1 - probabilities) >= threshold
+    off_topic = ~labels
+    return {
+        "examples": len(examples),
+        "threshold": threshold,
+        "accuracy": round(float((predictions == labels).mean()), 3),
+        "fallback_rate": round(float(1 - confident.mean()), 3),
+        "confident_accuracy": round(float((predictions == labels)[confident].mean()), 3) if confident.any() else None,
+        # The point of the classifier: off-topic questions rejected without any network call.
+        "off_topic_rejected_locally": round(float((confident & ~predictions)[off_topic].mean()), 3) if off_topic.any() else None,
+        # On-topic questions wrongly rejected without asking the LLM.
+        "on_topic_rejected_locally": round(float((confident & ~predictions)[labels].mean()), 3) if labels.any() else None,
+    }
+
+# --- Routing ---
+class TopicGate:
+    """
+    Routes a question with the classifier when it is confident (probability at
+    least `threshold` either way), and counts how often the LLM is still needed.
+    """
+
+    def __init__(self, classifier: TopicClassifier, threshold: float = TOPIC_CONFIDENCE_THRESHOLD):
+        self.classifier = classifier
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.stats = {"on_topic": 0, "off_topic": 0, "llm_fallbacks": 0, "classifier_seconds": 0.0}
+
+    def decide(self, question: str) -> Optional[bool]:
+        """True/False if the classifier is confident, None if the LLM should decide."""
+        started = time.perf_counter()
+        probability = float(self.classifier.predict_proba([question])[0])
+        with self.lock:
+            self.stats["classifier_seconds"] += time.perf_counter() - started
+            if probability >= self.threshold:
+                self.stats["on_topic"] += 1
+                return True
+            if probability <= 1 - self.threshold:
+                self.stats["off_topic"] += 1
+                return False
+            self.stats["llm_fallbacks"] += 1
+            return None
+
+    def snapshot(self) -> dict:
+        decisions = self.stats["on_topic"] + self.stats["off_topic"] + self.stats["llm_fallbacks"]
+        return {
+            **{key: value for key, value in self.stats.items() if key != "classifier_seconds"},
+            "threshold": self.threshold,
+            "fallback_rate": round(self.stats["llm_fallbacks"] / decisions, 3) if decisions else None,
+            "mean_classifier_ms": round(1000 * self.stats["classifier_seconds"] / decisions, 2) if decisions else None,
+        }
+
+def load_topic_gate(path: str = TOPIC_CLASSIFIER_PATH, threshold: float = TOPIC_CONFIDENCE_THRESHOLD) -> Optional[TopicGate]:
+    """
+    The gate for the trained classifier at `path`, or None (every question goes to the LLM).
+    Only the encoder is shared (see load_encoder); the caller owns the gate, so the
+    classifier head and its counters are freed with the graph that uses it.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        classifier = TopicClassifier.load(path)
+        classifier.embed(["warm-up"])  # load the encoder now rather than on the first question
+    except ImportError:
+        print("sentence-transformers is not installed; the topic classifier is disabled.")
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load the topic classifier at {path}; it is disabled until the file changes: {e}")
+        return None
+    return TopicGate(classifier, threshold)
+
+# --- Label Log ---
+label_log_lock = threading.Lock()
+
+def log_label(question: str, is_product: bool, path: str = TOPIC_LABEL_LOG_PATH):
+    """Appends an LLM-decided label to the training log (no-op if the path is empty)."""
+    if not path:
+        return
+    with label_log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"text": question, "label": is_product}, ensure_ascii=False) + "\n")
+
+def read_examples(paths: List[str]) -> List[Tuple[str, bool]]:
+    """Labelled questions from JSONL files of {"text": ..., "label": true/false}; later files win on duplicates."""
+    examples = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    examples[record["text"].strip()] = bool(record["label"])
+    return list(examples.items())
+
+# --- CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local topic classifier.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train_parser = subcommands.add_parser("train", help="Train on labelled questions and save the model.")
+    train_parser.add_argument("--data", nargs="+", required=True, help="JSONL label files (seed set, logs, ...).")
+    train_parser.add_argument("--output", default=TOPIC_CLASSIFIER_PATH)
+    train_parser.add_argument("--encoder", default=TOPIC_ENCODER_MODEL)
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Share of the examples kept for evaluation.")
+    train_parser.add_argument("--threshold", type=float, default=TOPIC_CONFIDENCE_THRESHOLD)
+    train_parser.add_argument("--seed", type=int, default=0)
+    eval_parser = subcommands.add_parser("eval", help="Evaluate a saved model.")
+    eval_parser.add_argument("--data", nargs="+", required=True)
+    eval_parser.add_argument("--model", default=TOPIC_CLASSIFIER_PATH)
+    eval_parser.add_argument("--threshold", type=float, default=TOPIC_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    examples = read_examples(args.data)
+    if args.command == "eval":
+        print(json.dumps(evaluate(TopicClassifier.load(args.model), examples, args.threshold), indent=2))
+        return
+
+    random.Random(args.seed).shuffle(examples)
+    held_out = int(len(examples) * args.holdout)
+    test, training = examples[:held_out], examples[held_out:]
+    classifier = train(training, args.encoder)
+    if test:
+        print(json.dumps({"holdout": evaluate(classifier, test, args.threshold)}, indent=2))
+    # The saved model is trained on everything.
+    classifier = train(examples, args.encoder, encoder=classifier.encoder)
+    classifier.save(args.output)
+    print(f"Saved the topic classifier ({len(examples)} examples) to {args.output}.")
+
+if __name__ == "__main__":
+    main()